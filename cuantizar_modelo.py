@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Genera variantes cuantizadas (float16 e int8) del modelo de emociones
+y opcionalmente una exportación ONNX para ejecutarlo sin TensorFlow
+Uso: python cuantizar_modelo.py [--modelo modelo/mejor_modelo_83.h5] [--videos media] [--onnx]
+
+Los frames de calibración y evaluación se toman de videos reales (recortes
+de los perros detectados por YOLO cuando está disponible). Al final se
+muestra la latencia y la coincidencia top-1 de cada variante contra el
+modelo float original para elegir el punto velocidad/precisión.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import logging
+import cv2
+import numpy as np
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+
+def collect_video_paths(sources):
+    """Expande archivos, carpetas y patrones glob a una lista de videos"""
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            for name in sorted(os.listdir(source)):
+                if name.lower().endswith(VIDEO_EXTENSIONS):
+                    paths.append(os.path.join(source, name))
+        else:
+            paths.extend(sorted(glob.glob(source)))
+    return paths
+
+def sample_frames(video_paths, total_samples, use_crops=True):
+    """
+    Extrae muestras repartidas uniformemente por los videos
+
+    Args:
+        video_paths (list): Videos de origen
+        total_samples (int): Número total de muestras
+        use_crops (bool): Recortar los perros con YOLO (como en el análisis real)
+
+    Returns:
+        np.ndarray: Lote float32 (N, 224, 224, 3) normalizado a [0, 1]
+    """
+    from utils.cam_utils import crop_dog_regions
+
+    yolo_handle = None
+    if use_crops:
+        try:
+            from utils.model_registry import acquire_yolo_detector
+            yolo_handle = acquire_yolo_detector(confidence_threshold=0.55)
+        except Exception as e:
+            logger.warning(f"⚠️ YOLO no disponible, se usarán frames completos: {e}")
+
+    per_video = max(1, total_samples // max(1, len(video_paths)))
+    samples = []
+
+    try:
+        for path in video_paths:
+            cap = cv2.VideoCapture(path)
+            frame_total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            if frame_total <= 0:
+                cap.release()
+                continue
+
+            for index in np.linspace(0, frame_total - 1, per_video).astype(int):
+                cap.set(cv2.CAP_PROP_POS_FRAMES, int(index))
+                ret, frame = cap.read()
+                if not ret:
+                    continue
+
+                images = [frame]
+                if yolo_handle is not None:
+                    detections = yolo_handle.instance.detect_dogs(frame, force=True)
+                    if detections:
+                        images = crop_dog_regions(frame, [d['bbox'] for d in detections])
+
+                for image in images:
+                    samples.append(cv2.resize(image, (224, 224)).astype(np.float32) / 255.0)
+            cap.release()
+            logger.info(f"🎞️ {os.path.basename(path)}: {len(samples)} muestras acumuladas")
+    finally:
+        if yolo_handle is not None:
+            yolo_handle.release()
+
+    return np.stack(samples[:total_samples]) if samples else np.empty((0, 224, 224, 3), np.float32)
+
+def convert_float16(keras_model, output_path):
+    """Cuantización de pesos a float16 (activaciones en float32)"""
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.target_spec.supported_types = [tf.float16]
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+    return output_path
+
+def convert_int8(keras_model, calibration, output_path):
+    """Cuantización int8 completa (pesos, activaciones, entrada y salida)"""
+    import tensorflow as tf
+
+    def representative_dataset():
+        for sample in calibration:
+            yield [sample[np.newaxis]]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.int8
+    converter.inference_output_type = tf.int8
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+    return output_path
+
+def export_onnx(keras_model, output_path, opset=13):
+    """Exporta el modelo a ONNX para ejecutarlo sin TensorFlow (onnxruntime o cv2.dnn)"""
+    import tensorflow as tf
+    import tf2onnx
+
+    input_signature = [tf.TensorSpec([None, 224, 224, 3], tf.float32, name='input')]
+    tf2onnx.convert.from_keras(keras_model, input_signature=input_signature,
+                               opset=opset, output_path=output_path)
+    return output_path
+
+def evaluate(model, samples, reference=None):
+    """
+    Mide latencia por muestra (lote de 1) y coincidencia con la referencia
+
+    Returns:
+        tuple: (predicciones, dict de métricas)
+    """
+    preds = []
+    latencies = []
+    for sample in samples:
+        start = time.perf_counter()
+        preds.append(np.asarray(model.predict_on_batch(sample[np.newaxis]))[0])
+        latencies.append((time.perf_counter() - start) * 1000)
+    preds = np.array(preds)
+
+    metrics = {
+        'latency_ms_mean': float(np.mean(latencies)),
+        'latency_ms_p95': float(np.percentile(latencies, 95)),
+    }
+    if reference is not None:
+        metrics['top1_agreement'] = float(np.mean(preds.argmax(1) == reference.argmax(1)))
+        metrics['max_abs_prob_diff'] = float(np.max(np.abs(preds - reference)))
+    return preds, metrics
+
+def main():
+    """Función principal para uso desde línea de comandos"""
+    parser = argparse.ArgumentParser(description="Cuantiza el modelo de emociones a TFLite float16/int8 y exporta a ONNX")
+    parser.add_argument('--modelo', default="modelo/mejor_modelo_83.h5", help="Modelo Keras de origen")
+    parser.add_argument('--videos', nargs='+', default=["media"], help="Videos, carpetas o patrones para calibrar")
+    parser.add_argument('--muestras', type=int, default=300, help="Muestras totales (mitad calibración, mitad evaluación)")
+    parser.add_argument('--salida', default=None, help="Carpeta de salida (por defecto la del modelo)")
+    parser.add_argument('--sin-recortes', action='store_true', help="Usar frames completos en lugar de recortes YOLO")
+    parser.add_argument('--onnx', action='store_true', help="Exportar también a ONNX (inferencia sin TensorFlow)")
+    parser.add_argument('--tolerancia', type=float, default=1e-4,
+                        help="Diferencia máxima de probabilidades aceptada para la exportación ONNX")
+    args = parser.parse_args()
+
+    video_paths = collect_video_paths(args.videos)
+    if not video_paths:
+        logger.error(f"❌ No se encontraron videos en: {args.videos}")
+        sys.exit(1)
+
+    logger.info(f"🎬 Extrayendo muestras de {len(video_paths)} video(s)...")
+    samples = sample_frames(video_paths, args.muestras, use_crops=not args.sin_recortes)
+    if len(samples) < 2:
+        logger.error("❌ No se pudieron extraer muestras suficientes")
+        sys.exit(1)
+
+    # Muestras alternadas: pares para calibrar, impares para evaluar
+    calibration, evaluation = samples[0::2], samples[1::2]
+    logger.info(f"📊 {len(calibration)} muestras de calibración, {len(evaluation)} de evaluación")
+
+    from tensorflow.keras.models import load_model
+    from utils.emotion_backends import load_emotion_model
+
+    keras_model = load_model(args.modelo)
+    output_dir = args.salida or os.path.dirname(args.modelo) or "."
+    os.makedirs(output_dir, exist_ok=True)
+    base_name = os.path.splitext(os.path.basename(args.modelo))[0]
+
+    variants = {
+        'float16': convert_float16(keras_model, os.path.join(output_dir, f"{base_name}_float16.tflite")),
+    }
+    logger.info(f"✅ Variante float16: {variants['float16']}")
+    variants['int8'] = convert_int8(keras_model, calibration, os.path.join(output_dir, f"{base_name}_int8.tflite"))
+    logger.info(f"✅ Variante int8: {variants['int8']}")
+    if args.onnx:
+        variants['onnx'] = export_onnx(keras_model, os.path.join(output_dir, f"{base_name}.onnx"))
+        logger.info(f"✅ Exportación ONNX: {variants['onnx']}")
+
+    # Evaluar contra el modelo float original
+    reference, reference_metrics = evaluate(keras_model, evaluation)
+    report = {
+        'model': args.modelo,
+        'samples': {'calibration': len(calibration), 'evaluation': len(evaluation)},
+        'variants': {'keras_float32': dict(reference_metrics, size_mb=os.path.getsize(args.modelo) / 1e6,
+                                           top1_agreement=1.0, path=args.modelo)}
+    }
+    for name, path in variants.items():
+        # Mismo cargador que EmotionDetector (backend según la extensión)
+        _, metrics = evaluate(load_emotion_model(path), evaluation, reference)
+        report['variants'][name] = dict(metrics, size_mb=os.path.getsize(path) / 1e6, path=path)
+
+    logger.info("\n📊 RESULTADOS (lote de 1, CPU):")
+    logger.info(f"   {'Variante':<15}{'Tamaño MB':>10}{'Media ms':>10}{'p95 ms':>10}{'Top-1':>9}")
+    for name, metrics in report['variants'].items():
+        logger.info(f"   {name:<15}{metrics['size_mb']:>10.1f}{metrics['latency_ms_mean']:>10.2f}"
+                    f"{metrics['latency_ms_p95']:>10.2f}{metrics['top1_agreement']:>9.1%}")
+
+    report_path = os.path.join(output_dir, f"{base_name}_cuantizacion.json")
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"\n💾 Reporte guardado en: {report_path}")
+    logger.info("💡 Para usar una variante: DOG_EMOTION_MODEL=<ruta .tflite/.onnx> python main.py")
+    
+    # La exportación ONNX debe ser equivalente al modelo original (no es una cuantización)
+    onnx_metrics = report['variants'].get('onnx')
+    if onnx_metrics and (onnx_metrics['top1_agreement'] < 1.0 or onnx_metrics['max_abs_prob_diff'] > args.tolerancia):
+        logger.error(f"❌ La exportación ONNX difiere del modelo original "
+                     f"(diferencia máxima {onnx_metrics['max_abs_prob_diff']:.2e})")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
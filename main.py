@@ -2,26 +2,23 @@ import cv2
 import os
 import time
 import logging
-from utils.cam_utils import EmotionDetector
+from utils.camera import find_camera, find_cameras, open_camera, parse_camera_source
+from utils.frame_pipeline import (CameraMonitorSink, CameraSource, FramePipeline, VideoFileSource,
+                                  VideoWriterSink, WindowSink)
+from utils.cam_utils import CAMERA_EMOTION_COLORS, draw_dog_emotions
 from utils.telegram_utils import TelegramBot
-from utils.yolo_dog_detector import YoloDogDetector
+from utils.model_registry import acquire_emotion_detector, acquire_yolo_detector, get_registry
+from utils.rate_controller import DEFAULT_TARGET_FPS
+from utils.motion_gate import MotionGate
+from utils.multi_camera import MultiCameraMonitor
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def find_available_camera():
-    """Encuentra la primera cámara disponible"""
-    for i in range(10):
-        cap = cv2.VideoCapture(i)
-        if cap.isOpened():
-            ret, frame = cap.read()
-            if ret and frame is not None:
-                logger.info(f"✅ Cámara {i} encontrada: {frame.shape[1]}x{frame.shape[0]}")
-                cap.release()
-                return i
-        cap.release()
-    return None
+# Cámaras del modo multicámara: índices, URLs o archivos separados por coma
+# (vacío = todas las cámaras locales detectadas)
+DEFAULT_CAMERAS = os.getenv('DOG_CAMERAS', '')
 
 def process_video_file(video_path, save_output=False, output_path=None):
     """
@@ -39,10 +36,11 @@ def process_video_file(video_path, save_output=False, output_path=None):
         logger.error(f"❌ El archivo de video no existe: {video_path}")
         return False
     
-    # Inicializar componentes
+    # Inicializar componentes (prestados por el registro, se cargan una sola vez)
     try:
         logger.info("🧠 Cargando modelo de IA...")
-        detector = EmotionDetector("modelo/mejor_modelo_83.h5")
+        emotion_handle = acquire_emotion_detector()
+        detector = emotion_handle.instance
         logger.info("✅ Modelo de emociones cargado exitosamente")
     except Exception as e:
         logger.error(f"❌ Error cargando modelo: {e}")
@@ -50,16 +48,20 @@ def process_video_file(video_path, save_output=False, output_path=None):
     
     try:
         logger.info("🐕 Inicializando detector YOLO optimizado...")
-        yolo_detector = YoloDogDetector(confidence_threshold=0.60)
+        yolo_handle = acquire_yolo_detector(confidence_threshold=0.60)
+        yolo_detector = yolo_handle.instance
         logger.info("✅ YOLOv8 cargado exitosamente")
     except Exception as e:
         logger.error(f"❌ Error cargando YOLO: {e}")
+        emotion_handle.release()
         return False
     
     # Abrir video
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
         logger.error(f"❌ No se puede abrir el video: {video_path}")
+        emotion_handle.release()
+        yolo_handle.release()
         return False
     
     # Obtener propiedades del video
@@ -79,8 +81,6 @@ def process_video_file(video_path, save_output=False, output_path=None):
     
     # Variables de control
     emotion_history = []
-    frame_count = 0
-    processed_frames = 0
     
     logger.info("\n🎮 CONTROLES:")
     logger.info("  Q o ESC: Salir")
@@ -88,102 +88,51 @@ def process_video_file(video_path, save_output=False, output_path=None):
     logger.info("  S: Capturar frame actual")
     logger.info("\n▶️ Iniciando procesamiento...\n")
     
-    paused = False
+    def annotate(item):
+        """Dibuja detecciones, emociones e información sobre el frame ya clasificado"""
+        dog_detections = item['detections']
+        frame = yolo_detector.draw_detections(item['frame'], dog_detections)
+        
+        if dog_detections:
+            # Actualizar historial (una entrada por perro)
+            for result in item['dog_emotions']:
+                emotion_history.append(result['emotion'])
+                if len(emotion_history) > 10:
+                    emotion_history.pop(0)
+            
+            # Mostrar la emoción de cada perro detectado
+            draw_dog_emotions(frame, item['dog_emotions'], colors=CAMERA_EMOTION_COLORS,
+                              text_format='EMOCION: {emotion} ({confidence:.2f})')
+        
+        else:
+            # Mensaje cuando no hay perros detectados
+            cv2.putText(frame, 'ESPERANDO DETECCION DE PERRO...', 
+                       (60, 80), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
+        
+        # Mostrar información en el frame
+        info_y = frame.shape[0] - 100
+        cv2.putText(frame, f"Frame: {item['index']}/{total_frames}", (10, info_y), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+        cv2.putText(frame, f'Perros detectados: {len(dog_detections)}', (10, info_y + 20), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+        cv2.putText(frame, f'Emociones: {len(emotion_history)}/10', (10, info_y + 40), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+        cv2.putText(frame, 'ESPACIO: pausar | Q: salir | S: capturar', 
+                   (10, info_y + 60), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
+        item['frame'] = frame
+    
+    # Detección → emociones → anotación → video de salida → ventana, con el motor común
+    source = VideoFileSource(cap, threaded=False, total_frames=total_frames)
+    sinks = [annotate]
+    if out is not None:
+        sinks.append(VideoWriterSink(out, threaded=False))
+    sinks.append(WindowSink('🎬 Procesador de Video - Dog Emotion Monitor', wait_ms=30,  # 30ms para video fluido
+                            pausable=True, capture_prefix='captura_frame'))
+    pipeline = FramePipeline(yolo_detector, detector, sinks)
     
     try:
-        while True:
-            if not paused:
-                ret, frame = cap.read()
-                if not ret:
-                    logger.info("🏁 Fin del video alcanzado")
-                    break
-                
-                frame_count += 1
-                processed_frames += 1
-                
-                # Mostrar progreso cada 30 frames
-                if frame_count % 30 == 0:
-                    progress = (frame_count / total_frames) * 100
-                    logger.info(f"📊 Progreso: {progress:.1f}% ({frame_count}/{total_frames})")
-            
-            # PASO 1: Detectar perros con YOLO
-            dog_detections = yolo_detector.detect_dogs(frame)
-            dogs_detected = yolo_detector.is_dog_detected(dog_detections)
-            
-            # PASO 2: Dibujar detecciones de YOLO
-            frame = yolo_detector.draw_detections(frame, dog_detections)
-            
-            # PASO 3: Analizar emociones si hay perros detectados
-            emotion_detected = None
-            emotion_prob = 0
-            
-            if dogs_detected:
-                try:
-                    emotion, prob, preds = detector.predict_emotion(frame)
-                    emotion_detected = emotion
-                    emotion_prob = prob
-                    
-                    # Actualizar historial
-                    emotion_history.append(emotion)
-                    if len(emotion_history) > 10:
-                        emotion_history.pop(0)
-                    
-                    # Determinar color según emoción
-                    color = (0, 255, 0)  # Verde por defecto
-                    if emotion in ['angry', 'sad']:
-                        color = (0, 0, 255)  # Rojo para emociones negativas
-                    elif emotion == 'happy':
-                        color = (0, 255, 255)  # Amarillo para feliz
-                    
-                    # Mostrar emoción cerca del perro detectado
-                    best_detection = yolo_detector.get_best_dog_region(dog_detections)
-                    if best_detection:
-                        x, y, w, h = best_detection
-                        emotion_text = f'EMOCION: {emotion.upper()} ({prob:.2f})'
-                        cv2.putText(frame, emotion_text, (x, y + h + 30), 
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
-                    
-                except Exception as e:
-                    logger.error(f"Error en análisis de emoción: {e}")
-            
-            else:
-                # Mensaje cuando no hay perros detectados
-                cv2.putText(frame, 'ESPERANDO DETECCION DE PERRO...', 
-                           (60, 80), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
-            
-            # Mostrar información en el frame
-            info_y = frame.shape[0] - 100
-            cv2.putText(frame, f'Frame: {frame_count}/{total_frames}', (10, info_y), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
-            cv2.putText(frame, f'Perros detectados: {len(dog_detections)}', (10, info_y + 20), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
-            cv2.putText(frame, f'Emociones: {len(emotion_history)}/10', (10, info_y + 40), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
-            
-            # Controles
-            status = "PAUSADO" if paused else "REPRODUCIENDO"
-            cv2.putText(frame, f'{status} | ESPACIO: pausar | Q: salir | S: capturar', 
-                       (10, info_y + 60), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
-            
-            # Mostrar frame
-            cv2.imshow('🎬 Procesador de Video - Dog Emotion Monitor', frame)
-            
-            # Guardar frame si se configuró
-            if out is not None:
-                out.write(frame)
-            
-            # Manejar teclas
-            key = cv2.waitKey(30) & 0xFF  # 30ms para video fluido
-            if key == ord('q') or key == 27:  # Q o ESC
-                logger.info("👋 Saliendo del procesamiento...")
-                break
-            elif key == ord(' '):  # ESPACIO para pausar/reanudar
-                paused = not paused
-                logger.info(f"⏸️ {'Pausado' if paused else '▶️ Reanudado'}")
-            elif key == ord('s'):  # S para capturar frame
-                capture_name = f"captura_frame_{frame_count:05d}.jpg"
-                cv2.imwrite(capture_name, frame)
-                logger.info(f"📸 Frame capturado: {capture_name}")
+        pipeline.run(source)
+        processed_frames = source.frame_count
         
         # Mostrar resumen final
         if emotion_history:
@@ -220,7 +169,7 @@ def process_video_file(video_path, save_output=False, output_path=None):
                 resumen_mensaje = f"""🎬 **ANÁLISIS DE VIDEO COMPLETADO**
 
 📁 **Video:** {video_name}
-🔍 **Detecciones totales:** {len(dog_detections) if 'dog_detections' in locals() else total_emotions}
+🔍 **Detecciones totales:** {total_emotions}
 
 🎯 **Emoción dominante:** {dominant_emotion[0].upper()}
 
@@ -270,10 +219,13 @@ def process_video_file(video_path, save_output=False, output_path=None):
         logger.error(f"❌ Error procesando video: {e}")
         return False
     finally:
-        cap.release()
-        if out is not None:
-            out.release()
-        cv2.destroyAllWindows()
+        try:
+            pipeline.close()  # Cierra la ventana y el video de salida
+        except Exception as e:
+            logger.error(f"❌ Error guardando el video procesado: {e}")
+        source.close()
+        emotion_handle.release()
+        yolo_handle.release()
         logger.info("🏁 Procesamiento de video terminado")
 
 def draw_enhanced_labels(frame, dog_detections, emotion_detected, emotion_prob, dogs_detected):
@@ -384,9 +336,10 @@ def main():
         print("1. � Solo bot de Telegram (recomendado)")
         print("2. �📹 Cámara en tiempo real desde consola")
         print("3. 🎬 Procesar archivo de video desde consola")
+        print("4. 🎥 Varias cámaras a la vez desde consola")
         
         try:
-            choice = input("\nSelecciona una opción (1, 2 o 3): ").strip()
+            choice = input("\nSelecciona una opción (1, 2, 3 o 4): ").strip()
             
             if choice == "1":
                 # Modo solo bot de Telegram
@@ -422,6 +375,9 @@ def main():
                 # Modo video desde consola (funcionalidad original)
                 return main_video_mode(bot)
             
+            elif choice == "4":
+                return main_multi_camera_mode(bot)
+            
             else:
                 logger.warning("⚠️ Opción no válida, activando modo bot")
                 choice = "1"
@@ -443,10 +399,10 @@ def main_camera_mode(bot=None):
     """Modo cámara en tiempo real (funcionalidad original)"""
     logger.info("📹 Modo cámara en tiempo real seleccionado")
     
-    # Inicializar componentes
+    # Inicializar componentes (prestados por el registro, se cargan una sola vez)
     try:
         logger.info("🧠 Cargando modelo de IA...")
-        detector = EmotionDetector("modelo/mejor_modelo_83.h5")
+        emotion_handle = acquire_emotion_detector()
         logger.info("✅ Modelo de emociones cargado exitosamente")
     except Exception as e:
         logger.error(f"❌ Error cargando modelo: {e}")
@@ -454,20 +410,101 @@ def main_camera_mode(bot=None):
     
     try:
         logger.info("🐕 Inicializando detector YOLO optimizado...")
-        yolo_detector = YoloDogDetector(confidence_threshold=0.60)
+        # La tasa de detección se adapta al equipo para sostener DOG_TARGET_FPS
+        yolo_handle = acquire_yolo_detector(confidence_threshold=0.60, target_fps=DEFAULT_TARGET_FPS or None)
         logger.info("✅ YOLOv8 cargado exitosamente (umbral: 60%)")
     except Exception as e:
         logger.error(f"❌ Error cargando YOLO: {e}")
+        emotion_handle.release()
         return
     
-    # Buscar cámara
-    camera_index = find_available_camera()
-    if camera_index is None:
+    try:
+        # Buscar cámara (queda abierta para el análisis)
+        camera_index, probed_cap = find_camera()
+        if camera_index is None:
+            logger.error("❌ No se encontró ninguna cámara")
+            return
+        
+        # Resto de la funcionalidad original de cámara...
+        return run_camera_analysis(emotion_handle.instance, yolo_handle.instance, bot, camera_index, probed_cap)
+    finally:
+        emotion_handle.release()
+        yolo_handle.release()
+
+def main_multi_camera_mode(bot=None):
+    """Modo multicámara: varias cámaras (o videos) con un solo modelo de cada tipo"""
+    logger.info("🎥 Modo multicámara seleccionado")
+    
+    sources = DEFAULT_CAMERAS or input(
+        "📷 Cámaras, URLs o videos separados por coma (Enter = todas las cámaras detectadas): ").strip()
+    sources = [parse_camera_source(s) for s in sources.replace('"', '').split(',') if s.strip()]
+    probed = {}  # Cámaras ya abiertas al buscarlas
+    if not sources:
+        probed = dict(find_cameras())
+        sources = list(probed)
+    if not sources:
         logger.error("❌ No se encontró ninguna cámara")
         return
     
-    # Resto de la funcionalidad original de cámara...
-    return run_camera_analysis(detector, yolo_detector, bot, camera_index)
+    # Un solo modelo de emociones y un solo YOLO cargados; cada cámara recibe su
+    # propio detector (seguimiento y tasa de detección propios) sobre el mismo modelo
+    handles = []
+    try:
+        logger.info("🧠 Cargando modelo de IA...")
+        emotion_handle = acquire_emotion_detector()
+        handles.append(emotion_handle)
+        logger.info("✅ Modelo de emociones cargado exitosamente")
+    except Exception as e:
+        logger.error(f"❌ Error cargando modelo: {e}")
+        for probed_cap in probed.values():
+            probed_cap.release()
+        return
+    
+    detector = emotion_handle.instance
+    telegram_enabled = bot is not None
+    monitor = MultiCameraMonitor(detector)
+    try:
+        for source in sources:
+            name = f"Camara {source}" if isinstance(source, int) else os.path.basename(str(source)) or str(source)
+            cap = open_camera(source, frame_event=monitor.frame_event, cap=probed.pop(source, None))
+            if not cap.isOpened():
+                logger.error(f"❌ No se pudo abrir {name}")
+                cap.release()
+                continue
+            
+            yolo_handle = acquire_yolo_detector(confidence_threshold=0.60, target_fps=DEFAULT_TARGET_FPS or None)
+            handles.append(yolo_handle)
+            yolo_detector = yolo_handle.instance
+            sink = CameraMonitorSink(
+                yolo_detector, detector.labels, camera=cap, name=name,
+                on_emotion=bot.update_emotion_history if telegram_enabled else None,
+                send_alert=bot.send_alert if telegram_enabled else None,
+                on_update=bot.send_periodic_update if telegram_enabled else None
+            )
+            monitor.add_source(name, cap, yolo_detector, [sink, WindowSink(f'🐕 {name}')],
+                               motion_gate=MotionGate(), emotion_cooldown=2)  # 2 segundos entre análisis
+            logger.info(f"📷 {name} lista")
+        
+        if not monitor.sources:
+            logger.error("❌ No se pudo abrir ninguna cámara")
+            return
+        
+        logger.info(f"\n▶️ Monitoreando {len(monitor.sources)} cámara(s) - Q o ESC en cualquier ventana para salir\n")
+        monitor.run()
+    except KeyboardInterrupt:
+        logger.info("⚠️ Interrupción por usuario")
+    except Exception as e:
+        logger.error(f"❌ Error en modo multicámara: {e}")
+    finally:
+        monitor.close()
+        for handle in handles:
+            handle.release()
+        if telegram_enabled:
+            try:
+                bot.cleanup()
+            except Exception:
+                pass
+        logger.info("🏁 Modo multicámara terminado")
 
 def main_video_mode(bot=None):
     """Modo procesamiento de video desde consola"""
@@ -498,12 +535,15 @@ def main_console_mode():
     print("\n🎯 MODO DE FUNCIONAMIENTO:")
     print("1. 📹 Cámara en tiempo real")
     print("2. 🎬 Procesar archivo de video")
+    print("3. 🎥 Varias cámaras a la vez")
     
     try:
-        choice = input("\nSelecciona una opción (1 o 2): ").strip()
+        choice = input("\nSelecciona una opción (1, 2 o 3): ").strip()
         
         if choice == "2":
             return main_video_mode()
+        elif choice == "3":
+            return main_multi_camera_mode()
         else:
             return main_camera_mode()
             
@@ -522,21 +562,12 @@ def run_camera_analysis(detector, yolo_detector, bot, camera_index):
     # Resto de la funcionalidad original de cámara...
     return run_camera_analysis(detector, yolo_detector, bot, camera_index)
 
-def run_camera_analysis(detector, yolo_detector, bot, camera_index):
+def run_camera_analysis(detector, yolo_detector, bot, camera_index, probed_cap=None):
     """Ejecutar análisis de cámara en tiempo real"""
     telegram_enabled = bot is not None
     
-    # Inicializar cámara
-    cap = cv2.VideoCapture(camera_index)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-    cap.set(cv2.CAP_PROP_FPS, 30)
-    
-    # Variables de control
-    emotion_history = []
-    cooldown_time = 2  # Reducido a 2 segundos para mejor responsividad
-    last_analysis_time = time.time()
-    frame_count = 0
+    # Inicializar cámara (un hilo lee la cámara; el bucle toma siempre el frame más nuevo)
+    cap = open_camera(camera_index, cap=probed_cap)
     
     logger.info("\n🎮 CONTROLES:")
     logger.info("  Q o ESC: Salir")
@@ -549,177 +580,65 @@ def run_camera_analysis(detector, yolo_detector, bot, camera_index):
         logger.info("  Activa el monitoreo desde el menú para recibir alertas")
     logger.info("\n▶️ Iniciando detección...\n")
     
-    try:
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                logger.error("Error capturando frame")
-                break
-
-            current_time = time.time()
-            frame_count += 1
-            
-            # PASO 1: Detectar perros con YOLO
-            dog_detections = yolo_detector.detect_dogs(frame)
-            dogs_detected = yolo_detector.is_dog_detected(dog_detections)
-            
-            # PASO 2: Dibujar detecciones de YOLO solamente
-            frame = yolo_detector.draw_detections(frame, dog_detections)
-            
-            # PASO 3: Solo analizar emociones SI hay perros detectados
-            if dogs_detected and current_time - last_analysis_time >= cooldown_time:
-                try:
-                    logger.info(f"🐕 Analizando emociones... (perro detectado)")
-                    emotion, prob, preds = detector.predict_emotion(frame)
-                    
-                    # Debug: Mostrar todas las predicciones para entender el problema
-                    logger.info("📊 Análisis detallado de emociones:")
-                    for label, p in zip(detector.labels, preds):
-                        logger.info(f"  {label}: {p:.4f} ({'⭐' if p == max(preds) else ''})")
-                    logger.info(f"  🎯 Resultado final: {emotion.upper()} ({prob:.3f})")
-                    
-                    # Verificar si hay un problema con la clasificación
-                    if emotion == 'relaxed' and max(preds) < 0.6:
-                        logger.warning(f"⚠️ Confianza baja en 'relaxed' ({prob:.3f}) - Podría ser clasificación incorrecta")
-
-                    # Determinar color según emoción
-                    color = (0, 255, 0)  # Verde por defecto
-                    if emotion in ['angry', 'sad']:
-                        color = (0, 0, 255)  # Rojo para emociones negativas
-                    elif emotion == 'happy':
-                        color = (0, 255, 255)  # Amarillo para feliz
-                    
-                    # Mostrar emoción en el frame con mejor posicionamiento
-                    emotion_text = f'EMOCION: {emotion.upper()} ({prob:.2f})'
-                    if dogs_detected:
-                        # Si hay detección YOLO, mostrar cerca del rectángulo
-                        best_detection = yolo_detector.get_best_dog_region(dog_detections)
-                        if best_detection:
-                            x, y, w, h = best_detection
-                            cv2.putText(frame, emotion_text, (x, y + h + 30), 
-                                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
-                        else:
-                            cv2.putText(frame, emotion_text, (60, 120), 
-                                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
-                    else:
-                        # Si no hay detección YOLO, mostrar en posición fija
-                        cv2.putText(frame, emotion_text, (60, 120), 
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
-
-                    # Acumular historial de emociones
-                    emotion_history.append(emotion)
-                    if len(emotion_history) > 4:  # Reducido de 8 a 4 para mejor responsividad
-                        emotion_history.pop(0)
-                    
-                    # Actualizar historial en el bot
-                    if telegram_enabled and bot:
-                        bot.update_emotion_history(emotion)
-                        bot.send_periodic_update()  # Enviar actualización si es momento
-
-                    # Verificar patrones preocupantes (reducido a 3 análisis negativos de 4)
-                    if len(emotion_history) >= 3 and all(e in ['sad', 'angry'] for e in emotion_history[-3:]):
-                        logger.warning(f"🚨 Patrón preocupante detectado: {emotion} repetidamente")
-                        
-                        if telegram_enabled and bot:
-                            try:
-                                # Capturar imagen para la alerta
-                                timestamp = int(time.time())
-                                path = f"alerta_{emotion}_{timestamp}_{int(prob*100)}.jpg"
-                                cv2.imwrite(path, frame)
-                                
-                                # Enviar alerta con recomendaciones
-                                bot.send_alert(emotion, prob, image_path=path)
-                                
-                                # Limpiar archivo temporal
-                                try:
-                                    os.remove(path)
-                                except:
-                                    pass
-                                
-                                emotion_history.clear()  # Reiniciar para evitar spam
-                                logger.info("📱 Alerta enviada por Telegram")
-                                
-                            except Exception as e:
-                                logger.error(f"Error enviando alerta: {e}")
-
-                    last_analysis_time = current_time
-                    
-                except Exception as e:
-                    logger.error(f"Error en análisis de emoción: {e}")
+    def send_test(item):
+        """S: enviar el frame actual como alerta de prueba"""
+        try:
+            test_path = "test_manual.jpg"
+            cv2.imwrite(test_path, item['frame'])
             
-            elif not dogs_detected:
-                # Solo mostrar mensaje de espera si no hay detecciones
-                cv2.putText(frame, 'ESPERANDO DETECCION DE PERRO...', 
-                           (60, 80), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
-                # Limpiar historial si no hay perros por mucho tiempo
-                if current_time - last_analysis_time > 30:  # 30 segundos sin perros
-                    if emotion_history:
-                        emotion_history.clear()
-                        logger.info("🧹 Historial limpiado - Sin perros detectados")
-
-            # Mostrar información de estado en el frame
-            info_y = frame.shape[0] - 100
-            cv2.putText(frame, f'Frame: {frame_count}', (10, info_y), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
-            cv2.putText(frame, f'Perros detectados: {len(dog_detections)}', (10, info_y + 20), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
-            cv2.putText(frame, f'Historial emocional: {len(emotion_history)}/4', (10, info_y + 40), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+            # Verificar si el monitoreo está activo
+            if not bot.monitoring_active:
+                logger.warning("⚠️ Monitoreo pausado - Activando para la prueba")
+                bot.monitoring_active = True
             
-            # Ajustar controles según Telegram
-            if telegram_enabled:
-                cv2.putText(frame, 'Q: salir | S: test | M: menu | C: limpiar', (10, info_y + 60), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
+            bot.send_alert("happy", 0.95, image_path=test_path)
+            os.remove(test_path)
+            logger.info("📱 Mensaje de prueba enviado - Revisa el menú con /menu")
+        except Exception as e:
+            logger.error(f"Error enviando prueba: {e}")
+    
+    def send_menu_reminder(item):
+        """M: recordar el menú de Telegram"""
+        try:
+            bot.send_simple_message("🎛️ Usa /menu para acceder a todas las opciones del bot")
+            logger.info("📱 Recordatorio de menú enviado")
+        except Exception as e:
+            logger.error(f"Error enviando recordatorio: {e}")
+    
+    def clear_chat(item):
+        """C: limpiar el chat de Telegram"""
+        try:
+            if bot.clear_chat_sync():
+                logger.info("✅ Chat limpiado desde teclado")
             else:
-                cv2.putText(frame, 'Q: salir', (10, info_y + 60), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
-
-            cv2.imshow('🐕 Dog Emotion Monitor + YOLOv8', frame)
-
-            # Manejar teclas
-            key = cv2.waitKey(1) & 0xFF
-            if key == ord('q') or key == 27:  # Q o ESC
-                logger.info("👋 Saliendo del programa...")
-                break
-            elif key == ord('s') and telegram_enabled and bot:  # S para test
-                try:
-                    test_path = "test_manual.jpg"
-                    cv2.imwrite(test_path, frame)
-                    
-                    # Verificar si el monitoreo está activo
-                    if not bot.monitoring_active:
-                        logger.warning("⚠️ Monitoreo pausado - Activando para la prueba")
-                        bot.monitoring_active = True
-                    
-                    bot.send_alert("happy", 0.95, image_path=test_path)
-                    os.remove(test_path)
-                    logger.info("📱 Mensaje de prueba enviado - Revisa el menú con /menu")
-                        
-                except Exception as e:
-                    logger.error(f"Error enviando prueba: {e}")
-            elif key == ord('m') and telegram_enabled and bot:  # M para menú
-                try:
-                    bot.send_simple_message("🎛️ Usa /menu para acceder a todas las opciones del bot")
-                    logger.info("📱 Recordatorio de menú enviado")
-                except Exception as e:
-                    logger.error(f"Error enviando recordatorio: {e}")
-            elif key == ord('c') and telegram_enabled and bot:  # C para limpiar chat
-                try:
-                    if bot.clear_chat_sync():
-                        logger.info("✅ Chat limpiado desde teclado")
-                    else:
-                        logger.warning("⚠️ No se pudo limpiar el chat completamente")
-                except Exception as e:
-                    logger.error(f"Error limpiando chat: {e}")
-
+                logger.warning("⚠️ No se pudo limpiar el chat completamente")
+        except Exception as e:
+            logger.error(f"Error limpiando chat: {e}")
+    
+    # Detección → emociones → historial/alertas → ventana, con el motor común.
+    # Con la escena quieta se reutilizan las últimas detecciones y emociones
+    monitor = CameraMonitorSink(
+        yolo_detector, detector.labels, camera=cap,
+        on_emotion=bot.update_emotion_history if telegram_enabled else None,
+        send_alert=bot.send_alert if telegram_enabled else None,
+        on_update=bot.send_periodic_update if telegram_enabled else None,
+        controls_text='Q: salir | S: test | M: menu | C: limpiar' if telegram_enabled else 'Q: salir'
+    )
+    key_handlers = {ord('s'): send_test, ord('m'): send_menu_reminder, ord('c'): clear_chat} if telegram_enabled else {}
+    window = WindowSink('🐕 Dog Emotion Monitor + YOLOv8', key_handlers=key_handlers)
+    pipeline = FramePipeline(yolo_detector, detector, [monitor, window],
+                             motion_gate=MotionGate(), emotion_cooldown=2)  # 2 segundos entre análisis
+    
+    try:
+        pipeline.run(CameraSource(cap))
     except KeyboardInterrupt:
         logger.info("⚠️ Interrupción por usuario")
     except Exception as e:
         logger.error(f"❌ Error en bucle principal: {e}")
     finally:
         # Cleanup
+        pipeline.close()
         cap.release()
-        cv2.destroyAllWindows()
         
         # Cerrar bot de Telegram
         if telegram_enabled and bot:
@@ -731,4 +650,8 @@ def run_camera_analysis(detector, yolo_detector, bot, camera_index):
         logger.info("🏁 Programa terminado exitosamente")
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        # Liberar los modelos cargados por el registro compartido
+        get_registry().unload_all(force=True)
@@ -7,16 +7,55 @@ Uso: python procesar_video.py ruta_del_video.mp4
 import cv2
 import os
 import sys
+import glob
+import json
 import time
+import shutil
+import tempfile
 import logging
-from utils.cam_utils import EmotionDetector
-from utils.yolo_dog_detector import YoloDogDetector
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from utils.cam_utils import draw_dog_emotions
+from utils.model_registry import (DEFAULT_EMOTION_MODEL, DEFAULT_YOLO_WEIGHTS,
+                                  acquire_emotion_detector, acquire_yolo_detector)
+from utils.frame_pipeline import FramePipeline, TimelineSink, VideoFileSource, VideoWriterSink, WindowSink
+from utils.video_io import (DEFAULT_DECODE_WIDTH, bitrate_for_size,
+                            concat_videos, open_downscaled_reader, open_video_writer)
+from utils.highlights import HighlightSelector
+from utils.timeline import EMOTION_LABELS, TimelineWriter, default_timeline_path, merge_timelines
+from utils.video_scan import (interval_index_path, load_interval_index, save_interval_index,
+                              scan_dog_intervals, video_signature)
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def process_video(video_path, output_path=None, show_video=True, save_video=False):
+# Procesos para analizar un video por tramos (1 = un solo proceso)
+DEFAULT_VIDEO_WORKERS = int(os.getenv('DOG_VIDEO_WORKERS', '1'))
+MIN_CHUNK_FRAMES = 300  # Tramos más cortos no compensan cargar los modelos en otro proceso
+
+# Frames por segundo que se analizan (0 = todos los frames del video)
+DEFAULT_ANALYSIS_FPS = float(os.getenv('DOG_ANALYSIS_FPS', '0'))
+
+# Segundos de video entre puntos de control del procesamiento reanudable
+DEFAULT_CHECKPOINT_SECONDS = float(os.getenv('DOG_CHECKPOINT_SECONDS', '60'))
+
+# Video resumen: segundos alrededor de cada aparición y time-lapse de los tramos sin perros
+DEFAULT_HIGHLIGHT_PADDING = float(os.getenv('DOG_HIGHLIGHT_PADDING', '2'))
+DEFAULT_HIGHLIGHT_TIMELAPSE = int(os.getenv('DOG_HIGHLIGHT_TIMELAPSE', '0'))
+
+# Extensiones que se buscan al procesar carpetas en modo lote
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm', '.m4v')
+# Sufijos de archivos generados por este script (no se vuelven a procesar)
+GENERATED_SUFFIXES = ('_con_detecciones.mp4',)
+
+def process_video(video_path, output_path=None, show_video=True, save_video=False,
+                  emotion_detector=None, yolo_detector=None, emotion_batch_size=8,
+                  workers=1, analysis_only=False, timeline_path=None, analysis_fps=None,
+                  two_pass=False, scan_fps=1.0, rescan=False, resumable=False,
+                  checkpoint_seconds=DEFAULT_CHECKPOINT_SECONDS, encoder=None,
+                  decode_width=DEFAULT_DECODE_WIDTH, highlights=None):
     """
     Procesa un video completo con detección de perros y análisis de emociones
     
@@ -25,6 +64,46 @@ def process_video(video_path, output_path=None, show_video=True, save_video=Fals
         output_path (str): Ruta donde guardar el video procesado (opcional)
         show_video (bool): Si mostrar el video mientras se procesa
         save_video (bool): Si guardar el video procesado
+        emotion_detector (EmotionDetector): Detector ya cargado (opcional)
+        yolo_detector (YoloDogDetector): Detector YOLO ya cargado (opcional)
+        emotion_batch_size (int): Frames con perros que se clasifican por lote
+            cuando no se muestra la ventana
+    
+        workers (int): Procesos que analizan tramos del video en paralelo (sin ventana).
+            Cada proceso carga sus propios modelos, así que emotion_detector y
+            yolo_detector no se usan cuando workers > 1
+        analysis_only (bool): Solo analizar: sin ventana, sin dibujar y sin
+            codificar video (solo estadísticas y, si se pide, línea de tiempo)
+        timeline_path (str): Dónde guardar la línea de tiempo por frame (.jsonl o .npz)
+        analysis_fps (float): Frames por segundo que se detectan y clasifican (None = todos).
+            Sin ventana ni video de salida los frames intermedios ni se decodifican;
+            con salida anotada heredan el análisis del último frame analizado
+        two_pass (bool): Barrer primero el video a scan_fps y baja resolución y analizar
+            después solo los tramos con perros (sin ventana ni video de salida).
+            Los tramos se guardan en <video>_tramos.json y se reutilizan
+        scan_fps (float): Frames por segundo examinados en el barrido
+        rescan (bool): Ignorar el índice de tramos guardado y volver a barrer
+        resumable (bool): Procesar por segmentos de checkpoint_seconds guardando un
+            punto de control tras cada uno en <video>_checkpoint/. Si se interrumpe,
+            volver a llamar con el mismo video y configuración continúa desde el
+            último segmento terminado (sin ventana; los IDs de perro se reinician
+            en cada segmento)
+        checkpoint_seconds (float): Segundos de video por segmento
+        encoder (dict): Opciones del video anotado para open_video_writer(), p. ej.
+            {'codec': 'h264', 'crf': 28, 'max_width': 854, 'max_bytes': 20 * 1024 ** 2}.
+            max_bytes se convierte en una tasa máxima según la duración del video
+        decode_width (int): Si el video es más ancho, ffmpeg lo decodifica ya reducido a
+            este ancho (0 = resolución original). El análisis y el video anotado usan
+            esa resolución; la línea de tiempo guarda las cajas en la original
+        highlights (dict): Guardar solo un video resumen con los tramos con perros, p. ej.
+            {'padding': 2.0, 'timelapse': 30}: segundos que se conservan antes y después
+            de cada aparición y, de los tramos sin perros, 1 de cada timelapse frames
+            (0 = se descartan). Si no aparece ningún perro no se genera el video.
+            Al procesar por tramos (workers o resumable) los márgenes no cruzan
+            el límite entre tramos
+    
+    Sin ventana el procesamiento va en tres etapas solapadas: un hilo decodifica,
+    el hilo principal detecta y clasifica, y otro hilo anota y codifica la salida.
     
     Returns:
         dict: Estadísticas del procesamiento
@@ -38,6 +117,15 @@ def process_video(video_path, output_path=None, show_video=True, save_video=Fals
         logger.error(f"❌ El archivo no existe: {video_path}")
         return None
     
+    if analysis_only:
+        show_video = save_video = False
+    if two_pass and (show_video or save_video):
+        logger.warning("⚠️ El análisis en dos pasadas no genera video anotado, se analizará en una pasada")
+        two_pass = False
+    if resumable and show_video:
+        logger.warning("⚠️ El procesamiento reanudable no admite ventana, se procesará sin puntos de control")
+        resumable = False
+    
     # Generar nombre de salida automático si no se especifica
     if save_video and not output_path:
         base_name = os.path.splitext(video_path)[0]
@@ -46,195 +134,604 @@ def process_video(video_path, output_path=None, show_video=True, save_video=Fals
     logger.info(f"📁 Video de entrada: {video_path}")
     if save_video:
         logger.info(f"💾 Video de salida: {output_path}")
+        encoder = _resolve_encoder(video_path, encoder)
+    if timeline_path:
+        logger.info(f"🗒️ Línea de tiempo: {timeline_path}")
+    
+    if workers > 1 and not show_video and not two_pass and not resumable:
+        return _process_video_parallel(video_path, output_path, save_video, workers, emotion_batch_size,
+                                       timeline_path, analysis_fps, encoder, decode_width, highlights)
     
-    # Cargar modelos
+    # Cargar modelos (prestados por el registro si no se recibieron)
+    handles = []
     try:
-        logger.info("🧠 Cargando modelo de emociones...")
-        emotion_detector = EmotionDetector("modelo/mejor_modelo_83.h5")
-        logger.info("✅ Modelo de emociones cargado")
+        if emotion_detector is None:
+            logger.info("🧠 Cargando modelo de emociones...")
+            handles.append(acquire_emotion_detector())
+            emotion_detector = handles[-1].instance
+            logger.info("✅ Modelo de emociones cargado")
         
-        logger.info("🐕 Cargando detector YOLO...")
-        yolo_detector = YoloDogDetector(confidence_threshold=0.55)  # 55% para mejor detección
-        logger.info("✅ Detector YOLO cargado")
+        if yolo_detector is None:
+            logger.info("🐕 Cargando detector YOLO...")
+            handles.append(acquire_yolo_detector(confidence_threshold=0.55))  # 55% para mejor detección
+            yolo_detector = handles[-1].instance
+            logger.info("✅ Detector YOLO cargado")
         
     except Exception as e:
         logger.error(f"❌ Error cargando modelos: {e}")
+        _release_handles(handles)
+        return None
+    
+    try:
+        if two_pass:
+            return _process_video_two_pass(video_path, emotion_detector, yolo_detector, emotion_batch_size,
+                                           timeline_path, analysis_fps, scan_fps, rescan, decode_width)
+        if resumable:
+            return _process_video_resumable(video_path, output_path, save_video, emotion_detector,
+                                            yolo_detector, emotion_batch_size, timeline_path,
+                                            analysis_fps, checkpoint_seconds, encoder, decode_width,
+                                            highlights)
+        return _process_video_loop(video_path, output_path, show_video, save_video,
+                                   emotion_detector, yolo_detector, emotion_batch_size,
+                                   timeline_path=timeline_path, analysis_fps=analysis_fps,
+                                   encoder=encoder, decode_width=decode_width, highlights=highlights)
+    finally:
+        _release_handles(handles)
+
+def _resolve_encoder(video_path, encoder):
+    """Convierte max_bytes en una tasa máxima para todo el video (así cada tramo usa la misma)"""
+    if not encoder or not encoder.get('max_bytes'):
+        return encoder
+    encoder = dict(encoder)
+    max_bytes = encoder.pop('max_bytes')
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    duration = cap.get(cv2.CAP_PROP_FRAME_COUNT) / fps if fps else None
+    cap.release()
+    encoder['max_kbps'] = bitrate_for_size(max_bytes, duration)
+    return encoder
+
+def _release_handles(handles):
+    """Devuelve al registro los modelos prestados"""
+    for handle in handles:
+        handle.release()
+
+def _init_chunk_worker(threads):
+    """Limita los hilos de cada proceso para que los procesos no compitan por los núcleos"""
+    for variable in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+        os.environ[variable] = str(threads)
+    cv2.setNumThreads(threads)
+
+def _analyze_chunk(video_path, start_frame, end_frame, segment_path, save_video, emotion_batch_size,
+                   timeline_path=None, analysis_fps=None, encoder=None, decode_width=DEFAULT_DECODE_WIDTH,
+                   highlights=None):
+    """
+    Analiza un tramo del video en un proceso del pool
+    
+    Los modelos se piden al registro del proceso, así que un mismo proceso
+    los reutiliza si le toca más de un tramo.
+    """
+    handles = [acquire_emotion_detector(), acquire_yolo_detector(confidence_threshold=0.55)]
+    try:
+        return _process_video_loop(video_path, segment_path, False, save_video,
+                                   handles[0].instance, handles[1].instance, emotion_batch_size,
+                                   start_frame=start_frame, end_frame=end_frame, log_summary=False,
+                                   timeline_path=timeline_path, analysis_fps=analysis_fps,
+                                   encoder=encoder, decode_width=decode_width, highlights=highlights)
+    finally:
+        _release_handles(handles)
+
+def _process_video_parallel(video_path, output_path, save_video, workers, emotion_batch_size,
+                            timeline_path=None, analysis_fps=None, encoder=None,
+                            decode_width=DEFAULT_DECODE_WIDTH, highlights=None):
+    """
+    Divide el video en tramos, los analiza en un pool de procesos y une los resultados
+    
+    Las estadísticas y el historial de emociones se combinan en el orden del
+    video, los segmentos anotados se unen en un solo MP4 y las líneas de
+    tiempo de cada tramo en un solo archivo. Los IDs de perro
+    se reinician en cada tramo.
+    """
+    cap = cv2.VideoCapture(video_path)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    
+    chunk_count = max(1, min(workers, total_frames // MIN_CHUNK_FRAMES))
+    bounds = [round(i * total_frames / chunk_count) for i in range(chunk_count + 1)]
+    logger.info(f"⚡ Análisis en paralelo: {chunk_count} tramo(s) con {chunk_count} proceso(s)")
+    
+    segment_dir = None
+    if save_video or timeline_path:
+        segment_dir = tempfile.mkdtemp(
+            prefix='tramos_', dir=os.path.dirname(os.path.abspath(output_path if save_video else timeline_path))
+        )
+    segment_paths = [os.path.join(segment_dir, f"tramo_{i:03d}.mp4") if save_video else None
+                     for i in range(chunk_count)]
+    timeline_ext = os.path.splitext(timeline_path)[1] if timeline_path else None
+    timeline_parts = [os.path.join(segment_dir, f"tramo_{i:03d}{timeline_ext}") if timeline_path else None
+                      for i in range(chunk_count)]
+    
+    start_time = time.time()
+    threads = max(1, (os.cpu_count() or 1) // chunk_count)
+    try:
+        # 'spawn' en todas las plataformas: no hereda hilos ni modelos a medio cargar del padre
+        with ProcessPoolExecutor(max_workers=chunk_count, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_chunk_worker, initargs=(threads,)) as pool:
+            futures = [
+                pool.submit(_analyze_chunk, video_path, bounds[i],
+                            bounds[i + 1] if i < chunk_count - 1 else None,  # El último tramo lee hasta el final
+                            segment_paths[i], save_video, emotion_batch_size, timeline_parts[i],
+                            analysis_fps, encoder, decode_width, highlights)
+                for i in range(chunk_count)
+            ]
+            chunks = [future.result() for future in futures]
+        
+        if any(chunk is None for chunk in chunks):
+            logger.error("❌ Falló el análisis de al menos un tramo")
+            return None
+        
+        if save_video and not _join_segments(segment_paths, chunks, output_path):
+            return None
+        
+        if timeline_path and not merge_timelines(timeline_parts, timeline_path):
+            return None
+    
+    except Exception as e:
+        logger.error(f"❌ Error en el análisis en paralelo: {e}")
+        return None
+    
+    finally:
+        if segment_dir:
+            shutil.rmtree(segment_dir, ignore_errors=True)
+    
+    return _merge_chunk_stats(video_path, output_path, save_video, chunks, total_frames,
+                              time.time() - start_time, timeline_path)
+
+def _join_segments(segment_paths, chunks, output_path):
+    """
+    Une los segmentos anotados en output_path
+    
+    En un video resumen los tramos sin perros no dejan segmento y se saltan.
+    
+    Returns:
+        bool: False si falló la unión
+    """
+    paths = [path for path, chunk in zip(segment_paths, chunks) if chunk['output_file']]
+    if not paths:
+        logger.info("🎞️ Ningún tramo tiene perros: no se genera video resumen")
+        return True
+    logger.info(f"🎞️ Uniendo {len(paths)} segmento(s) en {output_path}...")
+    if not concat_videos(paths, output_path):
+        logger.error("❌ No se pudieron unir los segmentos")
+        return False
+    return True
+
+def _merge_chunk_stats(video_path, output_path, save_video, chunks, total_frames, processing_time,
+                       timeline_path=None, frame_count=None):
+    """
+    Combina en orden las estadísticas de varios tramos del mismo video
+    
+    frame_count permite contar como vistos frames que no pertenecen a
+    ningún tramo (los descartados por el barrido de _process_video_two_pass).
+    """
+    emotion_history = [emotion for chunk in chunks for emotion in chunk['emotion_history']]
+    emotion_stats = {emotion: sum(chunk['emotion_stats'][emotion] for chunk in chunks)
+                     for emotion in EMOTION_LABELS}
+    emotion_time = {emotion: sum(chunk['emotion_time'][emotion] for chunk in chunks)
+                    for emotion in EMOTION_LABELS}
+    if frame_count is None:
+        frame_count = sum(chunk['total_frames'] for chunk in chunks)
+    if save_video and not any(chunk['output_file'] for chunk in chunks):
+        save_video = False  # Video resumen sin ningún perro
+    stats = _finalize_stats(
+        video_path, output_path, save_video, frame_count, total_frames,
+        sum(chunk['dogs_detected_frames'] for chunk in chunks),
+        emotion_history, emotion_stats, processing_time,
+        timeline_path=timeline_path, emotion_time=emotion_time,
+        frames_analyzed=sum(chunk['frames_analyzed'] for chunk in chunks)
+    )
+    stats['frames_written'] = sum(chunk.get('frames_written', 0) for chunk in chunks)
+    return stats
+
+def _process_video_two_pass(video_path, emotion_detector, yolo_detector, emotion_batch_size,
+                            timeline_path=None, analysis_fps=None, scan_fps=1.0, rescan=False,
+                            decode_width=DEFAULT_DECODE_WIDTH):
+    """
+    Análisis en dos pasadas: barrido rápido y análisis denso solo en los tramos con perros
+    
+    Los frames fuera de los tramos cuentan como vistos sin perros, así las
+    tasas siguen referidas al video completo. Si ya existe un índice de tramos
+    válido para el video se reutiliza y el barrido no se repite.
+    """
+    start_time = time.time()
+    index = None if rescan else load_interval_index(video_path, scan_fps)
+    if index is not None:
+        logger.info(f"🗂️ Reutilizando tramos de {interval_index_path(video_path)}")
+    else:
+        index = scan_dog_intervals(video_path, yolo_detector, scan_fps=scan_fps)
+        if index is None:
+            return None
+        save_interval_index(video_path, index)
+    
+    intervals = index['intervals']
+    fps = index['fps']
+    part_dir = None
+    if timeline_path and intervals:
+        part_dir = tempfile.mkdtemp(prefix='tramos_', dir=os.path.dirname(os.path.abspath(timeline_path)))
+    timeline_ext = os.path.splitext(timeline_path)[1] if timeline_path else None
+    
+    chunks = []
+    try:
+        for i, (start, end) in enumerate(intervals):
+            logger.info(f"🎯 Tramo {i + 1}/{len(intervals)}: {start / fps:.1f}s - {end / fps:.1f}s")
+            part = os.path.join(part_dir, f"tramo_{i:03d}{timeline_ext}") if part_dir else None
+            chunk = _process_video_loop(video_path, None, False, False, emotion_detector, yolo_detector,
+                                        emotion_batch_size, start_frame=start, end_frame=end,
+                                        log_summary=False, timeline_path=part, analysis_fps=analysis_fps,
+                                        decode_width=decode_width)
+            if chunk is None:
+                return None
+            chunks.append(chunk)
+        
+        if timeline_path:
+            if chunks:
+                if not merge_timelines([chunk['timeline_file'] for chunk in chunks], timeline_path):
+                    return None
+            else:
+                TimelineWriter(timeline_path, fps).close()  # Sin perros: línea de tiempo vacía
+    finally:
+        if part_dir:
+            shutil.rmtree(part_dir, ignore_errors=True)
+    
+    stats = _merge_chunk_stats(video_path, None, False, chunks, index['total_frames'],
+                               time.time() - start_time, timeline_path, frame_count=index['total_frames'])
+    stats['intervals'] = intervals
+    stats['frames_scanned'] = index['frames_scanned']
+    return stats
+
+# Cambia cuando los segmentos guardados dejan de ser compatibles (p. ej. la
+# versión 2 arranca cada segmento con el estado del detector de una sola pasada)
+CHECKPOINT_FORMAT = 2
+
+def _checkpoint_dir(video_path):
+    """Carpeta con el estado y los segmentos terminados del procesamiento reanudable"""
+    return f"{os.path.splitext(video_path)[0]}_checkpoint"
+
+def _load_checkpoint(state_path, config):
+    """Segmentos terminados de una ejecución anterior con la misma configuración"""
+    try:
+        with open(state_path, encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
         return None
+    return state['segments'] if state.get('config') == config else None
+
+def _save_checkpoint(state_path, config, segments):
+    """Guarda el estado de forma atómica (un corte a mitad de escritura no lo corrompe)"""
+    temp_path = state_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({'config': config, 'segments': segments}, f)
+    os.replace(temp_path, state_path)
+
+def _process_video_resumable(video_path, output_path, save_video, emotion_detector, yolo_detector,
+                             emotion_batch_size, timeline_path=None, analysis_fps=None,
+                             checkpoint_seconds=DEFAULT_CHECKPOINT_SECONDS, encoder=None,
+                             decode_width=DEFAULT_DECODE_WIDTH, highlights=None):
+    """
+    Procesa el video por segmentos y guarda un punto de control tras cada uno
     
+    Cada segmento terminado deja su video anotado y su línea de tiempo ya
+    cerrados, y sus estadísticas se añaden a estado.json. Al reanudar se
+    saltan los segmentos guardados; al terminar se unen y se borra la carpeta.
+    
+    Cada segmento empieza con el detector en el estado que tendría en una sola
+    pasada (ver _warm_up_detector), así el resultado es el mismo que sin
+    puntos de control.
+    """
+    cap = cv2.VideoCapture(video_path)
+    video_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    if total_frames <= 0:
+        logger.warning("⚠️ No se conoce la duración del video, se procesará sin puntos de control")
+        return _process_video_loop(video_path, output_path, False, save_video, emotion_detector,
+                                   yolo_detector, emotion_batch_size, timeline_path=timeline_path,
+                                   analysis_fps=analysis_fps, encoder=encoder, decode_width=decode_width,
+                                   highlights=highlights)
+    
+    segment_frames = max(1, int(checkpoint_seconds * video_fps))
+    bounds = list(range(0, total_frames, segment_frames)) + [total_frames]
+    segment_count = len(bounds) - 1
+    
+    # Solo se reanuda si el video y todo lo que cambia el resultado son iguales
+    timeline_ext = os.path.splitext(timeline_path)[1] if timeline_path else None
+    config = {
+        'format': CHECKPOINT_FORMAT,
+        'video': video_signature(video_path),
+        'output': os.path.abspath(output_path) if save_video else None,
+        'timeline': timeline_ext,
+        'analysis_fps': analysis_fps,
+        'segment_frames': segment_frames,
+        'encoder': encoder,
+        'decode_width': decode_width,
+        'highlights': highlights
+    }
+    checkpoint_dir = _checkpoint_dir(video_path)
+    state_path = os.path.join(checkpoint_dir, 'estado.json')
+    segments = _load_checkpoint(state_path, config)
+    if segments:
+        logger.info(f"♻️ Reanudando desde el punto de control: {len(segments)}/{segment_count} segmento(s) "
+                    f"ya procesados ({bounds[len(segments)] / video_fps:.0f}s de video)")
+    else:
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+        os.makedirs(checkpoint_dir)
+        segments = []
+    
+    segment_paths = [os.path.join(checkpoint_dir, f"tramo_{i:03d}.mp4") if save_video else None
+                     for i in range(segment_count)]
+    timeline_parts = [os.path.join(checkpoint_dir, f"tramo_{i:03d}{timeline_ext}") if timeline_path else None
+                      for i in range(segment_count)]
+    
+    for i in range(len(segments), segment_count):
+        chunk = _process_video_loop(video_path, segment_paths[i], False, save_video, emotion_detector,
+                                    yolo_detector, emotion_batch_size, start_frame=bounds[i],
+                                    end_frame=bounds[i + 1] if i < segment_count - 1 else None,
+                                    log_summary=False, timeline_path=timeline_parts[i],
+                                    analysis_fps=analysis_fps, encoder=encoder, decode_width=decode_width,
+                                    highlights=highlights)
+        if chunk is None or chunk['interrupted']:
+            logger.info(f"⏸️ Procesamiento detenido; se reanudará desde {bounds[i] / video_fps:.0f}s "
+                        f"al volver a ejecutarlo")
+            return None
+        segments.append(chunk)
+        _save_checkpoint(state_path, config, segments)
+        logger.info(f"💾 Punto de control {len(segments)}/{segment_count} "
+                    f"({bounds[i + 1] / video_fps:.0f}s de video)")
+    
+    if save_video and not _join_segments(segment_paths, segments, output_path):
+        return None
+    if timeline_path and not merge_timelines(timeline_parts, timeline_path):
+        return None
+    shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    
+    # El tiempo de procesamiento incluye el de las ejecuciones anteriores
+    return _merge_chunk_stats(video_path, output_path, save_video, segments, total_frames,
+                              sum(chunk['processing_time'] for chunk in segments), timeline_path)
+
+def _chunk_warmup_frames(yolo_detector, start_frame):
+    """Frames previos al tramo que se pasan por el detector para llegar a start_frame con su estado"""
+    if not start_frame or getattr(yolo_detector, 'tracker', None) is None:
+        return 0
+    # El tracker olvida un perro tras max_missed detecciones sin él: con esos
+    # ciclos de detección basta para que vea los mismos perros que una sola pasada
+    return min(start_frame, yolo_detector.frame_skip * (yolo_detector.tracker.max_missed + 1))
+
+def _warm_up_detector(cap, yolo_detector, start_frame, warmup_frames):
+    """
+    Deja el detector como estaría en una sola pasada al llegar a start_frame
+    
+    Los frames a los que les toca YOLO dependen del índice en el video y no del
+    tramo, y los warmup_frames anteriores (ver _chunk_warmup_frames) se pasan
+    por el detector sin contarlos. Así un tramo (proceso en paralelo o segmento
+    reanudable) detecta los mismos perros en sus primeros frames que el
+    procesamiento de todo el video.
+    """
+    if not hasattr(yolo_detector, 'frame_count'):
+        return
+    # El frame i del video (desde 1) ejecuta YOLO cuando (i - 1) es múltiplo de
+    # frame_skip: el primer frame del video siempre se detecta
+    yolo_detector.frame_count = start_frame - warmup_frames + yolo_detector.frame_skip - 1
+    for _ in range(warmup_frames):
+        ret, frame = cap.read()
+        if not ret:
+            break
+        yolo_detector.detect_dogs(frame)
+
+def _process_video_loop(video_path, output_path, show_video, save_video,
+                        emotion_detector, yolo_detector, emotion_batch_size,
+                        start_frame=0, end_frame=None, log_summary=True, timeline_path=None,
+                        analysis_fps=None, encoder=None, decode_width=DEFAULT_DECODE_WIDTH,
+                        highlights=None):
+    """
+    Bucle de procesamiento de process_video con los modelos ya cargados
+    
+    start_frame y end_frame limitan el análisis a un tramo [inicio, fin) del
+    video (lo usan los procesos de _process_video_parallel). Sin ventana ni
+    video de salida no se dibuja nada; solo se detecta, se clasifica y, si
+    hay timeline_path, se registra cada frame analizado.
+    
+    Con analysis_fps solo se analiza uno de cada N frames y cada frame
+    analizado pesa en las estadísticas por los frames del video que cubre,
+    así los porcentajes y tiempos siguen referidos a la duración real.
+    
+    Con highlights el video de salida pasa por un HighlightSelector, que
+    retiene los frames del margen previo hasta saber si aparece un perro.
+    """
     # Abrir video
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
         logger.error(f"❌ No se puede abrir el video")
         return None
     
+    # Los IDs de perro no deben arrastrarse de un video anterior
+    if getattr(yolo_detector, 'tracker', None) is not None:
+        yolo_detector.tracker.reset()
+    
     # Obtener propiedades del video
-    fps = int(cap.get(cv2.CAP_PROP_FPS))
+    fps = cap.get(cv2.CAP_PROP_FPS)  # Sin redondear: 29.97 no es 29
+    if not fps > 0:
+        fps = 30.0  # El contenedor no informa FPS (o informa 0)
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
     duration = total_frames / fps
+    sample_step = max(1, round(fps / analysis_fps)) if analysis_fps else 1
+    
+    log = logger.info if log_summary else logger.debug
+    log(f"📊 Propiedades del video:")
+    log(f"   Resolución: {width}x{height}")
+    log(f"   FPS: {fps:g}")
+    log(f"   Frames totales: {total_frames}")
+    log(f"   Duración: {duration:.1f} segundos")
+    if sample_step > 1:
+        log(f"   Análisis: 1 de cada {sample_step} frames (~{fps / sample_step:.1f} FPS)")
     
-    logger.info(f"📊 Propiedades del video:")
-    logger.info(f"   Resolución: {width}x{height}")
-    logger.info(f"   FPS: {fps}")
-    logger.info(f"   Frames totales: {total_frames}")
-    logger.info(f"   Duración: {duration:.1f} segundos")
+    # Alta resolución: ffmpeg decodifica ya reducido y las cajas se llevan a la
+    # resolución original con box_scale donde hace falta (línea de tiempo)
+    box_scale = 1.0
+    warmup_frames = _chunk_warmup_frames(yolo_detector, start_frame)
+    reduced = open_downscaled_reader(video_path, decode_width, (width, height), fps,
+                                     start_frame - warmup_frames)
+    if reduced is not None:
+        cap.release()
+        cap = reduced
+        box_scale = reduced.scale
+        width, height = reduced.width, reduced.height
+        log(f"   Decodificación reducida: {width}x{height} (ffmpeg)")
+        if save_video:
+            # Anotar a la resolución original obligaría a decodificar cada frame completo
+            log(f"   El video anotado se guarda a la resolución de trabajo ({width}x{height})")
+    elif start_frame:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame - warmup_frames)
+    _warm_up_detector(cap, yolo_detector, start_frame, warmup_frames)
     
     # Configurar escritor de video si se necesita
     out = None
     if save_video:
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+        out = open_video_writer(output_path, fps, (width, height), **(encoder or {}))
         if not out.isOpened():
             logger.error("❌ No se puede crear el archivo de salida")
             cap.release()
             return None
     
+    timeline = None
+    if timeline_path:
+        try:
+            timeline = TimelineWriter(timeline_path, fps, box_scale=box_scale)
+        except OSError as e:
+            logger.error(f"❌ No se puede crear la línea de tiempo: {e}")
+            cap.release()
+            if out is not None:
+                out.release()
+            return None
+    
     # Variables de seguimiento
-    frame_count = 0
     dogs_detected_frames = 0
     emotion_history = []
     emotion_stats = {'angry': 0, 'happy': 0, 'relaxed': 0, 'sad': 0}
+    emotion_time = {emotion: 0.0 for emotion in emotion_stats}  # Segundos de video por emoción
     
-    # Cronómetros
     start_time = time.time()
-    last_progress_time = start_time
     
     logger.info("\n🎬 Iniciando procesamiento...")
     if show_video:
         logger.info("💡 Presiona 'q' para salir, 'ESPACIO' para pausar, 's' para capturar frame")
     
-    paused = False
+    def record(item):
+        """Acumula las estadísticas del frame (ponderadas por los frames que representa)"""
+        nonlocal dogs_detected_frames
+        if item['detections']:
+            dogs_detected_frames += item['weight']
+            for result in item['dog_emotions']:
+                if 'source' not in item:
+                    emotion_history.append(result['emotion'])
+                    emotion_stats[result['emotion']] += 1
+                emotion_time[result['emotion']] += item['weight'] / fps
+        item['last_emotion'] = emotion_history[-1] if emotion_history else None
     
-    try:
-        while True:
-            if not paused or not show_video:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                frame_count += 1
-                
-                # Mostrar progreso cada 5 segundos
-                current_time = time.time()
-                if current_time - last_progress_time >= 5.0:
-                    progress = (frame_count / total_frames) * 100
-                    elapsed = current_time - start_time
-                    estimated_total = elapsed * total_frames / frame_count
-                    remaining = estimated_total - elapsed
-                    
-                    logger.info(f"📈 Progreso: {progress:.1f}% | "
-                              f"Frame {frame_count}/{total_frames} | "
-                              f"Tiempo restante: {remaining:.0f}s")
-                    last_progress_time = current_time
-            
-            # Procesar frame
-            original_frame = frame.copy()
-            
-            # 1. Detectar perros
-            dog_detections = yolo_detector.detect_dogs(frame)
-            dogs_detected = len(dog_detections) > 0
-            
-            if dogs_detected:
-                dogs_detected_frames += 1
-                
-                # 2. Dibujar detecciones YOLO
-                frame = yolo_detector.draw_detections(frame, dog_detections)
-                
-                # 3. Analizar emociones
-                try:
-                    emotion, confidence, _ = emotion_detector.predict_emotion(original_frame)
-                    emotion_history.append(emotion)
-                    emotion_stats[emotion] += 1
-                    
-                    # Dibujar emoción cerca del perro
-                    best_detection = yolo_detector.get_best_dog_region(dog_detections)
-                    if best_detection:
-                        x, y, w, h = best_detection
-                        
-                        # Determinar color según emoción
-                        emotion_colors = {
-                            'happy': (0, 255, 255),    # Amarillo
-                            'relaxed': (0, 255, 0),    # Verde
-                            'sad': (255, 0, 0),        # Azul
-                            'angry': (0, 0, 255)       # Rojo
-                        }
-                        color = emotion_colors.get(emotion, (255, 255, 255))
-                        
-                        # Texto de emoción
-                        emotion_text = f'{emotion.upper()}: {confidence:.2f}'
-                        cv2.putText(frame, emotion_text, (x, y + h + 35), 
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
-                        
-                        # Indicador de confianza
-                        bar_width = w
-                        bar_height = 8
-                        bar_x = x
-                        bar_y = y + h + 45
-                        
-                        # Fondo de la barra
-                        cv2.rectangle(frame, (bar_x, bar_y), (bar_x + bar_width, bar_y + bar_height), 
-                                     (50, 50, 50), -1)
-                        # Barra de confianza
-                        confidence_width = int(bar_width * confidence)
-                        cv2.rectangle(frame, (bar_x, bar_y), (bar_x + confidence_width, bar_y + bar_height), 
-                                     color, -1)
-                
-                except Exception as e:
-                    logger.debug(f"Error analizando emoción en frame {frame_count}: {e}")
-            
-            else:
-                # Sin perros detectados
-                cv2.putText(frame, 'Buscando perros...', (50, 50), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 255), 2)
-            
-            # Información del frame
-            info_y = height - 80
-            cv2.putText(frame, f'Frame: {frame_count}/{total_frames}', (10, info_y), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-            cv2.putText(frame, f'Perros detectados: {len(dog_detections)}', (10, info_y + 25), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-            
-            if emotion_history:
-                last_emotion = emotion_history[-1]
-                cv2.putText(frame, f'Ultima emocion: {last_emotion.upper()}', (10, info_y + 50), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-            
-            # Guardar frame procesado
-            if out is not None:
-                out.write(frame)
-            
-            # Mostrar video si está habilitado
-            if show_video:
-                cv2.imshow('🎬 Procesando Video - Dog Emotion Monitor', frame)
-                
-                # Manejar teclas
-                key = cv2.waitKey(1) & 0xFF
-                if key == ord('q'):
-                    logger.info("⏹️ Procesamiento interrumpido por usuario")
-                    break
-                elif key == ord(' '):
-                    paused = not paused
-                    logger.info(f"⏸️ {'Pausado' if paused else '▶️ Reanudado'}")
-                elif key == ord('s'):
-                    capture_name = f"captura_{frame_count:06d}.jpg"
-                    cv2.imwrite(capture_name, frame)
-                    logger.info(f"📸 Frame guardado: {capture_name}")
+    def annotate(item):
+        """Anota un frame ya clasificado"""
+        item['frame'] = _annotate_frame(
+            item['frame'], yolo_detector, item['detections'], item['dog_emotions'],
+            item['index'], total_frames, height, item['last_emotion']
+        )
+    
+    # Sin ventana: decodificación y anotación+codificación en hilos propios, con
+    # colas acotadas para que ninguna etapa se adelante demasiado a la inferencia.
+    # Sin salida anotada los frames que no se analizan se saltan con grab() sin decodificarlos
+    pipelined = not show_video
+    grab_skip = pipelined and out is None
+    source = VideoFileSource(cap, start_frame, end_frame, step=sample_step if grab_skip else 1,
+                             threaded=pipelined, total_frames=total_frames)
+    
+    sinks = [record]
+    if timeline is not None:
+        sinks.append(TimelineSink(timeline))
+    if not pipelined:
+        sinks.append(annotate)
+    writer_sink = None
+    if out is not None:
+        # Video resumen: solo se escriben los frames con perros, sus márgenes y el time-lapse
+        selector = None
+        if highlights:
+            selector = HighlightSelector(padding=round(highlights.get('padding', 1.0) * fps),
+                                         timelapse=highlights.get('timelapse', 0))
+        writer_sink = VideoWriterSink(out, annotate=annotate if pipelined else None,
+                                      threaded=pipelined, selector=selector)
+        sinks.append(writer_sink)
+    if show_video:
+        sinks.append(WindowSink('🎬 Procesando Video - Dog Emotion Monitor', pausable=True,
+                                capture_prefix='captura'))
+    
+    # Los perros de varios frames se clasifican en una sola inferencia
+    # (con ventana interactiva se procesa frame a frame)
+    pipeline = FramePipeline(yolo_detector, emotion_detector, sinks,
+                             batch_size=1 if show_video else emotion_batch_size, sample_step=sample_step)
     
+    interrupted = False
+    write_error = None
+    try:
+        pipeline.run(source)
     except KeyboardInterrupt:
         logger.info("⏹️ Procesamiento interrumpido")
-    
+        interrupted = True
     finally:
-        # Cleanup
-        cap.release()
-        if out is not None:
-            out.release()
-        if show_video:
-            cv2.destroyAllWindows()
+        # Cleanup (el escritor termina de vaciar su cola antes de cerrar el archivo)
+        try:
+            pipeline.close()
+        except Exception as e:
+            write_error = e
+        source.close()
+    
+    if write_error is not None:
+        # Disco lleno, ffmpeg caído...: no se entrega un video truncado como si estuviera bien
+        logger.error(f"❌ Error guardando el video procesado: {write_error}")
+        if output_path and os.path.exists(output_path):
+            os.remove(output_path)
+        return None
+    
+    frame_count = source.frame_count
+    frames_written = writer_sink.frames_written if writer_sink is not None else 0
+    if highlights and writer_sink is not None:
+        log(f"🎞️ Video resumen: {frames_written}/{frame_count} frames escritos")
+        if not frames_written:
+            # Sin perros el resumen quedaría vacío: no se deja un archivo inválido
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            save_video = False
     
     # Calcular estadísticas finales
     processing_time = time.time() - start_time
+    stats = _finalize_stats(video_path, output_path, save_video, frame_count, total_frames,
+                            dogs_detected_frames, emotion_history, emotion_stats,
+                            processing_time, log_summary=log_summary, timeline_path=timeline_path,
+                            emotion_time=emotion_time, frames_analyzed=pipeline.frames_analyzed)
+    stats['interrupted'] = interrupted
+    stats['box_scale'] = box_scale
+    stats['frames_written'] = frames_written
+    return stats
+
+def _finalize_stats(video_path, output_path, save_video, frame_count, total_frames,
+                    dogs_detected_frames, emotion_history, emotion_stats, processing_time,
+                    log_summary=True, timeline_path=None, emotion_time=None, frames_analyzed=None):
+    """
+    Arma el dict de estadísticas de process_video y muestra el resumen
     
+    frame_count y dogs_detected_frames cuentan frames del video (ponderados si
+    se analizó con muestreo); emotion_stats cuenta clasificaciones y
+    emotion_time los segundos de video atribuidos a cada emoción.
+    """
+    log = logger.info if log_summary else logger.debug
     stats = {
         'total_frames': frame_count,
         'total_frames_expected': total_frames,
@@ -244,28 +741,33 @@ def process_video(video_path, output_path=None, show_video=True, save_video=Fals
         'emotion_stats': emotion_stats,
         'emotion_distribution': emotion_stats,  # Alias para compatibilidad
         'processing_time': processing_time,
-        'fps_processed': frame_count / processing_time if processing_time > 0 else 0
+        'fps_processed': frame_count / processing_time if processing_time > 0 else 0,
+        'frames_analyzed': frame_count if frames_analyzed is None else frames_analyzed,
+        'emotion_time': emotion_time or {emotion: 0.0 for emotion in emotion_stats},
+        'timeline_file': timeline_path
     }
     
     # Mostrar resumen
-    logger.info("\n📊 RESUMEN DEL PROCESAMIENTO:")
-    logger.info(f"   Frames procesados: {stats['total_frames']}/{stats['total_frames_expected']}")
-    logger.info(f"   Tiempo de procesamiento: {stats['processing_time']:.1f} segundos")
-    logger.info(f"   Velocidad promedio: {stats['fps_processed']:.1f} FPS")
-    logger.info(f"   Frames con perros: {stats['dogs_detected_frames']} ({stats['dog_detection_rate']:.1f}%)")
-    logger.info(f"   Emociones analizadas: {stats['emotions_detected']}")
+    log("\n📊 RESUMEN DEL PROCESAMIENTO:")
+    log(f"   Frames procesados: {stats['total_frames']}/{stats['total_frames_expected']}")
+    log(f"   Tiempo de procesamiento: {stats['processing_time']:.1f} segundos")
+    log(f"   Velocidad promedio: {stats['fps_processed']:.1f} FPS")
+    if stats['frames_analyzed'] != frame_count:
+        log(f"   Frames analizados: {stats['frames_analyzed']}")
+    log(f"   Frames con perros: {stats['dogs_detected_frames']} ({stats['dog_detection_rate']:.1f}%)")
+    log(f"   Emociones analizadas: {stats['emotions_detected']}")
     
     if emotion_history:
-        logger.info("\n😊 DISTRIBUCIÓN DE EMOCIONES:")
+        log("\n😊 DISTRIBUCIÓN DE EMOCIONES:")
         total_emotions = len(emotion_history)
         for emotion, count in emotion_stats.items():
             if count > 0:
                 percentage = (count / total_emotions) * 100
-                logger.info(f"   {emotion.upper()}: {count} ({percentage:.1f}%)")
+                log(f"   {emotion.upper()}: {count} ({percentage:.1f}%)")
         
         # Emoción dominante
         dominant_emotion = max(emotion_stats.items(), key=lambda x: x[1])
-        logger.info(f"\n🎯 Emoción dominante: {dominant_emotion[0].upper()} ({dominant_emotion[1]} ocurrencias)")
+        log(f"\n🎯 Emoción dominante: {dominant_emotion[0].upper()} ({dominant_emotion[1]} ocurrencias)")
         
         # Agregar información completa al stats para uso externo
         stats['emotion_history'] = emotion_history
@@ -275,7 +777,7 @@ def process_video(video_path, output_path=None, show_video=True, save_video=Fals
         stats['output_file'] = output_path if save_video else None
     
     else:
-        logger.info("\n⚠️ No se detectaron emociones en el video")
+        log("\n⚠️ No se detectaron emociones en el video")
         
         # Agregar información para casos sin detecciones
         stats['emotion_history'] = []
@@ -285,11 +787,283 @@ def process_video(video_path, output_path=None, show_video=True, save_video=Fals
         stats['output_file'] = output_path if save_video else None
     
     if save_video and output_path:
-        logger.info(f"\n💾 Video guardado en: {output_path}")
+        log(f"\n💾 Video guardado en: {output_path}")
+    if timeline_path:
+        log(f"🗒️ Línea de tiempo guardada en: {timeline_path}")
     
-    logger.info("\n✅ Procesamiento completado")
+    log("\n✅ Procesamiento completado")
     return stats
 
+def _annotate_frame(frame, yolo_detector, dog_detections, dog_emotions,
+                    frame_count, total_frames, height, last_emotion):
+    """
+    Dibuja detecciones, la emoción de cada perro y la información del frame
+    
+    Args:
+        frame: Frame BGR a anotar (se modifica en el lugar)
+        yolo_detector (YoloDogDetector): Detector usado para dibujar las cajas
+        dog_detections (list): Detecciones de detect_dogs()
+        dog_emotions (list): Resultados de EmotionDetector.predict_dog_emotions()
+        frame_count (int): Número de frame
+        total_frames (int): Frames totales del video
+        height (int): Alto del video
+        last_emotion (str): Última emoción del historial (o None)
+    
+    Returns:
+        frame: Frame anotado
+    """
+    if dog_detections:
+        # 2. Dibujar detecciones YOLO
+        frame = yolo_detector.draw_detections(frame, dog_detections)
+        
+        # 3. Dibujar la emoción debajo de cada perro, con indicador de confianza
+        draw_dog_emotions(frame, dog_emotions, confidence_bar=True, offset=35)
+    
+    else:
+        # Sin perros detectados
+        cv2.putText(frame, 'Buscando perros...', (50, 50), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 255), 2)
+    
+    # Información del frame
+    info_y = height - 80
+    cv2.putText(frame, f'Frame: {frame_count}/{total_frames}', (10, info_y), 
+               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+    cv2.putText(frame, f'Perros detectados: {len(dog_detections)}', (10, info_y + 25), 
+               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+    
+    if last_emotion:
+        cv2.putText(frame, f'Ultima emocion: {last_emotion.upper()}', (10, info_y + 50), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+    
+    return frame
+
+def collect_videos(inputs):
+    """
+    Expande las entradas del modo lote en una lista de videos
+    
+    Args:
+        inputs (list): Carpetas, patrones glob ("grabaciones/*.mp4"), archivos
+            .txt con una ruta por línea o rutas de video
+    
+    Returns:
+        list: Rutas de video sin duplicados, en orden
+    """
+    videos = []
+    for entry in inputs:
+        if os.path.isdir(entry):
+            found = sorted(os.path.join(entry, name) for name in os.listdir(entry)
+                           if name.lower().endswith(VIDEO_EXTENSIONS))
+        elif entry.lower().endswith('.txt') and os.path.isfile(entry):
+            with open(entry, encoding='utf-8') as f:
+                found = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+        elif glob.has_magic(entry):
+            found = sorted(glob.glob(entry))
+        else:
+            found = [entry]
+        videos.extend(path for path in found if not path.lower().endswith(GENERATED_SUFFIXES))
+    
+    unique = []
+    seen = set()
+    for path in videos:
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            unique.append(path)
+    return unique
+
+def batch_result_path(video_path):
+    """Archivo con el resultado de un video procesado en modo lote"""
+    return f"{os.path.splitext(video_path)[0]}_resultado.json"
+
+def _load_batch_result(video_path, config):
+    """Resultado guardado si el video y la configuración no cambiaron desde entonces"""
+    try:
+        with open(batch_result_path(video_path), encoding='utf-8') as f:
+            result = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if result.get('video') != video_signature(video_path) or result.get('config') != config:
+        return None
+    output_file = result['stats'].get('output_file')
+    if output_file and not os.path.exists(output_file):
+        return None
+    return result
+
+def _process_batch_file(video_path, options):
+    """
+    Procesa un video del lote y guarda su resultado junto a él
+    
+    Se ejecuta en el proceso principal o en uno del pool; en ambos casos los
+    modelos se piden al registro del proceso y quedan cargados para el
+    siguiente video.
+    """
+    timeline_path = default_timeline_path(video_path) if options['analysis_only'] else None
+    stats = process_video(video_path, show_video=False, save_video=options['save_video'],
+                          analysis_only=options['analysis_only'], timeline_path=timeline_path,
+                          analysis_fps=options['analysis_fps'], two_pass=options['two_pass'],
+                          resumable=options['resumable'], encoder=options['encoder'],
+                          decode_width=options['decode_width'], highlights=options['highlights'])
+    if stats is None:
+        return None
+    result = {'video': video_signature(video_path), 'config': options, 'stats': stats}
+    with open(batch_result_path(video_path), 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2, default=str)
+    return result
+
+def _model_signature(model_path):
+    """Tamaño y fecha del archivo del modelo (None si se descarga o no existe en disco)"""
+    return video_signature(model_path) if os.path.isfile(model_path) else None
+
+def process_batch(inputs, workers=1, save_video=False, analysis_only=False, analysis_fps=None,
+                  two_pass=False, report_path='reporte_lote.json', force=False, resumable=False,
+                  encoder=None, decode_width=DEFAULT_DECODE_WIDTH, highlights=None):
+    """
+    Procesa muchos videos reutilizando los modelos y escribe un reporte conjunto
+    
+    Cada video deja <video>_resultado.json con sus estadísticas. Los videos
+    cuyo resultado sigue vigente (mismo archivo, misma configuración y mismos
+    modelos, comparando también su tamaño y fecha) se saltan salvo que force
+    sea True.
+    
+    Args:
+        inputs (list): Carpetas, patrones glob, listas .txt o rutas (ver collect_videos)
+        workers (int): Videos procesados a la vez, cada uno en su propio proceso
+        save_video (bool): Guardar además el video anotado de cada archivo
+        analysis_only (bool): Sin video anotado; guarda la línea de tiempo de cada archivo
+        analysis_fps (float): Frames por segundo analizados (None = todos)
+        two_pass (bool): Analizar solo los tramos con perros (ver process_video)
+        report_path (str): Reporte JSON conjunto del lote
+        force (bool): Reprocesar aunque el resultado esté al día
+        resumable, encoder, decode_width, highlights: Como en process_video,
+            para cada video del lote
+    
+    Returns:
+        dict: Reporte del lote (también guardado en report_path)
+    """
+    videos = collect_videos(inputs)
+    logger.info(f"📚 MODO LOTE: {len(videos)} video(s)")
+    
+    options = {
+        'save_video': (save_video or bool(highlights)) and not analysis_only,
+        'analysis_only': analysis_only,
+        'analysis_fps': analysis_fps,
+        'two_pass': two_pass,
+        'resumable': resumable,
+        'encoder': encoder,
+        'decode_width': decode_width,
+        'highlights': highlights,
+        'emotion_model': DEFAULT_EMOTION_MODEL,
+        'emotion_model_file': _model_signature(DEFAULT_EMOTION_MODEL),
+        'yolo_weights': DEFAULT_YOLO_WEIGHTS,
+        'yolo_weights_file': _model_signature(DEFAULT_YOLO_WEIGHTS)
+    }
+    
+    results = {}
+    pending = []
+    for video_path in videos:
+        cached = None if force else _load_batch_result(video_path, options)
+        if cached is not None:
+            logger.info(f"⏭️ Al día, se salta: {video_path}")
+            results[video_path] = ('skipped', cached)
+        elif not os.path.exists(video_path):
+            logger.error(f"❌ El archivo no existe: {video_path}")
+            results[video_path] = ('failed', None)
+        else:
+            pending.append(video_path)
+    
+    start_time = time.time()
+    if pending and workers > 1:
+        workers = min(workers, len(pending))
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        logger.info(f"⚡ Procesando {len(pending)} video(s) con {workers} proceso(s)")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_chunk_worker, initargs=(threads,)) as pool:
+            futures = {pool.submit(_process_batch_file, video_path, options): video_path
+                       for video_path in pending}
+            for future in as_completed(futures):
+                video_path = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"❌ Error procesando {video_path}: {e}")
+                    result = None
+                results[video_path] = ('processed', result) if result else ('failed', None)
+                logger.info(f"{'✅' if result else '❌'} [{len(results)}/{len(videos)}] {video_path}")
+    else:
+        for video_path in pending:
+            try:
+                result = _process_batch_file(video_path, options)
+            except Exception as e:
+                logger.error(f"❌ Error procesando {video_path}: {e}")
+                result = None
+            results[video_path] = ('processed', result) if result else ('failed', None)
+            logger.info(f"{'✅' if result else '❌'} [{len(results)}/{len(videos)}] {video_path}")
+    
+    report = _build_batch_report(videos, results, time.time() - start_time)
+    try:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, default=str)
+        logger.info(f"📄 Reporte del lote guardado en: {report_path}")
+    except OSError as e:
+        logger.error(f"❌ No se pudo guardar el reporte del lote: {e}")
+    return report
+
+def _build_batch_report(videos, results, processing_time):
+    """Reúne los resultados de cada video en un reporte con totales"""
+    files = []
+    emotion_stats = {emotion: 0 for emotion in EMOTION_LABELS}
+    emotion_time = {emotion: 0.0 for emotion in EMOTION_LABELS}
+    total_frames = dogs_detected_frames = 0
+    
+    for video_path in videos:
+        status, result = results[video_path]
+        entry = {'video': video_path, 'status': status}
+        if result is not None:
+            stats = result['stats']
+            entry.update({
+                'result_file': batch_result_path(video_path),
+                'output_file': stats.get('output_file'),
+                'timeline_file': stats.get('timeline_file'),
+                'total_frames': stats['total_frames'],
+                'dog_detection_rate': stats['dog_detection_rate'],
+                'emotions_detected': stats['emotions_detected'],
+                'dominant_emotion': stats['dominant_emotion'],
+                'emotion_stats': stats['emotion_stats'],
+                'processing_time': stats['processing_time']
+            })
+            total_frames += stats['total_frames']
+            dogs_detected_frames += stats['dogs_detected_frames']
+            for emotion in EMOTION_LABELS:
+                emotion_stats[emotion] += stats['emotion_stats'].get(emotion, 0)
+                emotion_time[emotion] += stats.get('emotion_time', {}).get(emotion, 0.0)
+        files.append(entry)
+    
+    counts = {status: sum(1 for s, _ in results.values() if s == status)
+              for status in ('processed', 'skipped', 'failed')}
+    dominant = max(emotion_stats.items(), key=lambda x: x[1])[0] if any(emotion_stats.values()) else 'no_detected'
+    
+    logger.info("\n📊 RESUMEN DEL LOTE:")
+    logger.info(f"   Videos: {len(videos)} | procesados: {counts['processed']} | "
+                f"al día: {counts['skipped']} | con error: {counts['failed']}")
+    logger.info(f"   Tiempo del lote: {processing_time:.1f} segundos")
+    logger.info(f"   Emoción dominante: {dominant.upper()}")
+    
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'processing_time': processing_time,
+        'totals': {
+            'videos': len(videos),
+            **counts,
+            'total_frames': total_frames,
+            'dogs_detected_frames': dogs_detected_frames,
+            'dog_detection_rate': dogs_detected_frames / total_frames * 100 if total_frames else 0,
+            'emotion_stats': emotion_stats,
+            'emotion_time': emotion_time,
+            'dominant_emotion': dominant
+        },
+        'files': files
+    }
+
 def main():
     """Función principal para uso desde línea de comandos"""
     
@@ -302,14 +1076,45 @@ def main():
         print(f"  python {sys.argv[0]} \"C:/Videos/perro.mp4\"")
         print(f"  python {sys.argv[0]} video.mp4 --save --output resultado.mp4")
         print(f"  python {sys.argv[0]} video.mp4 --no-display")
+        print(f"  python {sys.argv[0]} video.mp4 --no-display --save --workers 4")
+        print(f"  python {sys.argv[0]} video.mp4 --solo-analisis --timeline datos.npz")
+        print(f"  python {sys.argv[0]} video.mp4 --solo-analisis --fps-analisis 2")
+        print(f"  python {sys.argv[0]} video.mp4 --solo-analisis --dos-pasadas")
+        print(f"  python {sys.argv[0]} video_largo.mp4 --no-display --save --reanudable")
+        print(f"  python {sys.argv[0]} video.mp4 --no-display --save --h264 --ancho-max 854 --tamano-max 20")
+        print(f"  python {sys.argv[0]} video_4k.mp4 --solo-analisis --ancho-decodificacion 960")
+        print(f"  python {sys.argv[0]} video_4k.mp4 --no-display --save --ancho-decodificacion 960"
+              f"   # el video anotado sale a 960 px")
+        print(f"  python {sys.argv[0]} camara_patio.mp4 --no-display --resumen --margen 3 --timelapse 30")
+        print("\nModo lote (carpetas, patrones o listas .txt):")
+        print(f"  python {sys.argv[0]} grabaciones/ --solo-analisis --workers 4")
+        print(f"  python {sys.argv[0]} \"grabaciones/*.mp4\" otros.txt --reporte reporte.json --forzar")
         return
     
-    video_path = sys.argv[1]
+    # Entradas: argumentos hasta la primera opción
+    inputs = []
+    for arg in sys.argv[1:]:
+        if arg.startswith('--'):
+            break
+        inputs.append(arg)
+    video_path = inputs[0] if inputs else sys.argv[1]
+    batch_mode = (len(inputs) > 1 or os.path.isdir(video_path) or glob.has_magic(video_path)
+                  or video_path.lower().endswith('.txt'))
     
     # Opciones por defecto
     save_video = "--save" in sys.argv
     show_video = "--no-display" not in sys.argv
+    analysis_only = "--solo-analisis" in sys.argv
     output_path = None
+    timeline_path = None
+    
+    workers = DEFAULT_VIDEO_WORKERS
+    if "--workers" in sys.argv:
+        try:
+            workers = int(sys.argv[sys.argv.index("--workers") + 1])
+        except (ValueError, IndexError):
+            logger.warning("⚠️ --workers necesita un número, se usará 1 proceso")
+            workers = 1
     
     # Buscar output path personalizado
     if "--output" in sys.argv:
@@ -321,13 +1126,92 @@ def main():
         except (ValueError, IndexError):
             pass
     
+    analysis_fps = DEFAULT_ANALYSIS_FPS or None
+    if "--fps-analisis" in sys.argv:
+        try:
+            analysis_fps = float(sys.argv[sys.argv.index("--fps-analisis") + 1]) or None
+        except (ValueError, IndexError):
+            logger.warning("⚠️ --fps-analisis necesita un número, se analizarán todos los frames")
+            analysis_fps = None
+    
+    # Video anotado en H.264 con ffmpeg (--tamano-max en MB)
+    encoder = None
+    if "--h264" in sys.argv:
+        encoder = {'codec': 'h264'}
+        for option, key, cast in (("--crf", 'crf', int), ("--ancho-max", 'max_width', int),
+                                  ("--tamano-max", 'max_bytes', float)):
+            if option in sys.argv:
+                try:
+                    encoder[key] = cast(sys.argv[sys.argv.index(option) + 1])
+                except (ValueError, IndexError):
+                    logger.warning(f"⚠️ {option} necesita un número, se ignorará")
+        if 'max_bytes' in encoder:
+            encoder['max_bytes'] *= 1024 * 1024
+    
+    # Video resumen: solo los tramos con perros (--margen en segundos)
+    highlights = None
+    if "--resumen" in sys.argv:
+        save_video = True
+        highlights = {'padding': DEFAULT_HIGHLIGHT_PADDING, 'timelapse': DEFAULT_HIGHLIGHT_TIMELAPSE}
+        for option, key, cast in (("--margen", 'padding', float), ("--timelapse", 'timelapse', int)):
+            if option in sys.argv:
+                try:
+                    highlights[key] = cast(sys.argv[sys.argv.index(option) + 1])
+                except (ValueError, IndexError):
+                    logger.warning(f"⚠️ {option} necesita un número, se usará el valor por defecto")
+    
+    decode_width = DEFAULT_DECODE_WIDTH
+    if "--ancho-decodificacion" in sys.argv:
+        try:
+            decode_width = int(sys.argv[sys.argv.index("--ancho-decodificacion") + 1])
+        except (ValueError, IndexError):
+            logger.warning("⚠️ --ancho-decodificacion necesita un número, se usará la resolución original")
+            decode_width = 0
+    
+    # Línea de tiempo por frame (.jsonl o .npz)
+    if "--timeline" in sys.argv:
+        timeline_index = sys.argv.index("--timeline") + 1
+        if timeline_index < len(sys.argv):
+            timeline_path = sys.argv[timeline_index]
+    elif analysis_only:
+        timeline_path = default_timeline_path(video_path)
+    
+    if batch_mode:
+        report_path = 'reporte_lote.json'
+        if "--reporte" in sys.argv:
+            report_index = sys.argv.index("--reporte") + 1
+            if report_index < len(sys.argv):
+                report_path = sys.argv[report_index]
+        try:
+            report = process_batch(inputs, workers=workers, save_video=save_video,
+                                   analysis_only=analysis_only, analysis_fps=analysis_fps,
+                                   two_pass="--dos-pasadas" in sys.argv, report_path=report_path,
+                                   force="--forzar" in sys.argv, resumable="--reanudable" in sys.argv,
+                                   encoder=encoder, decode_width=decode_width, highlights=highlights)
+        except KeyboardInterrupt:
+            logger.info("👋 Programa interrumpido por usuario")
+            return
+        if report['totals']['failed']:
+            sys.exit(1)
+        return
+    
     # Procesar video
     try:
         stats = process_video(
             video_path=video_path,
             output_path=output_path,
             show_video=show_video,
-            save_video=save_video
+            save_video=save_video,
+            workers=workers,
+            analysis_only=analysis_only,
+            timeline_path=timeline_path,
+            analysis_fps=analysis_fps,
+            two_pass="--dos-pasadas" in sys.argv,
+            rescan="--rebarrer" in sys.argv,
+            resumable="--reanudable" in sys.argv,
+            encoder=encoder,
+            decode_width=decode_width,
+            highlights=highlights
         )
         
         if stats is None:
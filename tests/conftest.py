@@ -0,0 +1,24 @@
+"""
+Configuración común de las pruebas
+
+Las pruebas importan los módulos de utils/ y procesar_video.py desde la raíz
+del repositorio y no cargan TensorFlow ni Ultralytics: los modelos se
+reemplazan por dobles mínimos (ver fakes.py).
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import write_dog_video  # noqa: E402  (necesita la raíz en sys.path)
+
+
+@pytest.fixture
+def dog_video(tmp_path):
+    """Video sintético con un perro en DOG_FRAMES (ver fakes.py)"""
+    path = tmp_path / 'perro.avi'
+    write_dog_video(path)
+    return path
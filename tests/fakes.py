@@ -0,0 +1,89 @@
+"""
+Dobles de los modelos y video sintético para las pruebas de procesamiento
+
+El "perro" es un cuadro blanco que cruza el frame y el parche gris de la
+esquina superior izquierda indica la emoción (oscuro = 'sad', claro = 'happy').
+Así los resultados son deterministas sin TensorFlow ni YOLO.
+"""
+
+import cv2
+import numpy as np
+
+from utils.yolo_dog_detector import YoloDogDetector
+
+FPS = 30
+FRAMES = 150
+DOG_FRAMES = set(range(10, 40)) | set(range(55, 120))
+HAPPY_FROM = 90  # Desde este frame el parche indica 'happy'
+
+STATS_KEYS = ('total_frames', 'dogs_detected_frames', 'emotions_detected', 'emotion_stats')
+
+
+def write_dog_video(path, dog_frames=DOG_FRAMES, frames=FRAMES, size=(160, 120)):
+    """Escribe el video sintético (MJPG, sin depender de ffmpeg)"""
+    width, height = size
+    out = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), FPS, (width, height))
+    for i in range(frames):
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        frame[:height // 8, :width // 10] = 60 if i < HAPPY_FROM else 140
+        if i in dog_frames:
+            x = (20 + i % 80) * width // 160
+            frame[height * 5 // 12:height * 3 // 4, x:x + width // 4] = 255
+        out.write(frame)
+    out.release()
+
+
+def find_dog(frame):
+    """Caja xyxy de los píxeles blancos bajo el parche (el "perro"), o None"""
+    top = frame.shape[0] // 6
+    ys, xs = np.nonzero(frame[top:, :, 0] > 200)
+    if not len(xs):
+        return None
+    return [xs.min(), ys.min() + top, xs.max() + 1, ys.max() + top + 1]
+
+
+def fake_yolo_detector(**kwargs):
+    """YoloDogDetector real (salto de frames y tracker) con el modelo reemplazado"""
+    detector = YoloDogDetector(model=object(), **kwargs)
+
+    def _run_model(frame, input_size=None):
+        box = find_dog(frame)
+        if box is None:
+            return np.empty((0, 4), dtype=np.float32), np.empty((0,), dtype=np.float32)
+        return np.array([box], dtype=np.float32), np.array([0.9], dtype=np.float32)
+
+    detector._run_model = _run_model
+    return detector
+
+
+class FakeEmotions:
+    """Clasifica según el parche de la esquina; con interrupt simula un Ctrl+C al ver 'happy'"""
+
+    def __init__(self, interrupt=False):
+        self.interrupt = interrupt
+
+    def predict_dog_emotions_frames(self, frames, detections):
+        results = []
+        for frame, dogs in zip(frames, detections):
+            height, width = frame.shape[:2]
+            emotion = 'sad' if frame[:height // 8, :width // 10].mean() < 100 else 'happy'
+            if emotion == 'happy' and self.interrupt:
+                raise KeyboardInterrupt
+            results.append([{'emotion': emotion, 'confidence': 0.9, 'bbox': dog['bbox']} for dog in dogs])
+        return results
+
+
+class FakeHandle:
+    """Préstamo del registro con un modelo falso (ver model_registry.ModelHandle)"""
+
+    def __init__(self, instance):
+        self.instance = instance
+        self.released = False
+
+    def release(self):
+        self.released = True
+
+
+def stats_summary(stats):
+    """Estadísticas que deben coincidir entre formas de procesar el mismo video"""
+    return {key: stats[key] for key in STATS_KEYS}
@@ -0,0 +1,98 @@
+"""Pruebas del modo lote (selección de videos y resultados reutilizables)"""
+
+import os
+
+import pytest
+
+import procesar_video
+from fakes import FakeEmotions, FakeHandle, fake_yolo_detector, write_dog_video
+
+
+@pytest.fixture
+def videos(tmp_path, monkeypatch):
+    """Carpeta con dos videos y modelos falsos para process_video"""
+    monkeypatch.setattr(procesar_video, 'acquire_emotion_detector', lambda **kwargs: FakeHandle(FakeEmotions()))
+    monkeypatch.setattr(procesar_video, 'acquire_yolo_detector',
+                        lambda **kwargs: FakeHandle(fake_yolo_detector()))
+    model = tmp_path / 'modelo.h5'
+    model.write_bytes(b'pesos')
+    monkeypatch.setattr(procesar_video, 'DEFAULT_EMOTION_MODEL', str(model))
+
+    folder = tmp_path / 'grabaciones'
+    folder.mkdir()
+    write_dog_video(folder / 'a.avi')
+    write_dog_video(folder / 'b.avi', dog_frames=range(100, 140))
+    return folder
+
+
+def _run(folder, **kwargs):
+    report = procesar_video.process_batch([str(folder)], analysis_only=True,
+                                          report_path=str(folder.parent / 'reporte.json'), **kwargs)
+    return {os.path.basename(entry['video']): entry['status'] for entry in report['files']}, report
+
+
+def _touch(path, seconds=10):
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + seconds))
+
+
+def test_collect_videos_expands_and_deduplicates(tmp_path):
+    for name in ('a.mp4', 'b.MOV', 'a_con_detecciones.mp4', 'notas.txt'):
+        (tmp_path / name).write_bytes(b'')
+    listing = tmp_path / 'lista.txt'
+    listing.write_text(f"# comentario\n{tmp_path / 'a.mp4'}\n\n{tmp_path / 'c.mkv'}\n", encoding='utf-8')
+
+    found = procesar_video.collect_videos([str(tmp_path), str(tmp_path / '*.mp4'), str(listing)])
+    assert [os.path.basename(path) for path in found] == ['a.mp4', 'b.MOV', 'c.mkv']
+
+
+def test_second_run_skips_up_to_date_videos(videos):
+    statuses, report = _run(videos)
+    assert statuses == {'a.avi': 'processed', 'b.avi': 'processed'}
+    assert report['totals']['total_frames'] == 300
+    assert report['totals']['emotion_stats']['sad'] > 0 and report['totals']['emotion_stats']['happy'] > 0
+    assert (videos / 'a_resultado.json').exists()
+
+    statuses, skipped = _run(videos)
+    assert statuses == {'a.avi': 'skipped', 'b.avi': 'skipped'}
+    assert skipped['totals']['emotion_stats'] == report['totals']['emotion_stats']
+
+    statuses, _ = _run(videos, force=True)
+    assert statuses == {'a.avi': 'processed', 'b.avi': 'processed'}
+
+
+@pytest.mark.parametrize('changed', [{'analysis_fps': 10.0}, {'two_pass': True}, {'decode_width': 640},
+                                     {'resumable': True}])
+def test_changed_options_reprocess(videos, changed):
+    _run(videos)
+    statuses, _ = _run(videos, **changed)
+    assert set(statuses.values()) == {'processed'}
+    statuses, _ = _run(videos, **changed)
+    assert set(statuses.values()) == {'skipped'}
+
+
+def test_changed_video_or_model_file_reprocesses(videos):
+    _run(videos)
+
+    write_dog_video(videos / 'a.avi', dog_frames=())
+    _touch(videos / 'a.avi')
+    statuses, _ = _run(videos)
+    assert statuses == {'a.avi': 'processed', 'b.avi': 'skipped'}
+
+    # Mismo nombre de modelo, archivo reentrenado
+    _touch(procesar_video.DEFAULT_EMOTION_MODEL)
+    statuses, _ = _run(videos)
+    assert statuses == {'a.avi': 'processed', 'b.avi': 'processed'}
+
+
+def test_unreadable_result_reprocesses(videos):
+    _run(videos)
+    (videos / 'b_resultado.json').write_text('{roto', encoding='utf-8')
+    statuses, _ = _run(videos)
+    assert statuses == {'a.avi': 'skipped', 'b.avi': 'processed'}
+
+
+def test_missing_video_is_reported_as_failed(videos):
+    report = procesar_video.process_batch([str(videos / 'no_existe.avi')], analysis_only=True,
+                                          report_path=str(videos.parent / 'reporte.json'))
+    assert [entry['status'] for entry in report['files']] == ['failed']
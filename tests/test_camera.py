@@ -0,0 +1,96 @@
+"""Pruebas de la búsqueda de cámaras con la última usada en caché"""
+
+import json
+import time
+
+import pytest
+
+from utils import camera
+
+
+class FakeCap:
+    def __init__(self, index):
+        self.index = index
+        self.released = False
+
+    def release(self):
+        self.released = True
+
+
+@pytest.fixture
+def devices(monkeypatch):
+    """Dispositivos 0-4 simulados; working indica cuáles entregan frames"""
+    state = {'working': {1, 3}, 'probed': [], 'caps': []}
+
+    def _probe(index):
+        state['probed'].append(index)
+        if index not in state['working']:
+            return None
+        state['caps'].append(FakeCap(index))
+        return state['caps'][-1]
+
+    monkeypatch.setattr(camera, '_probe_camera', _probe)
+    monkeypatch.setattr(camera, 'camera_candidates', lambda max_index=10: [0, 1, 2, 3, 4])
+    return state
+
+
+def _wait(condition):
+    """Las cámaras que quedan por probar terminan en sus hilos después de find_camera()"""
+    deadline = time.time() + 2
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def test_without_cache_probes_all_and_saves_first(devices, tmp_path):
+    cache = tmp_path / 'camara.json'
+    index, cap = camera.find_camera(cache_path=str(cache))
+
+    assert (index, cap.index) == (1, 1)
+    assert json.loads(cache.read_text())['index'] == 1
+
+    # Las demás se siguen probando en sus hilos; la otra que respondió se libera al terminar
+    _wait(lambda: len(devices['probed']) == 5
+          and any(c.index == 3 and c.released for c in devices['caps']))
+    assert sorted(devices['probed']) == [0, 1, 2, 3, 4]
+    assert sorted((c.index, c.released) for c in devices['caps']) == [(1, False), (3, True)]
+
+
+def test_cache_hit_probes_only_the_cached_camera(devices, tmp_path):
+    cache = tmp_path / 'camara.json'
+    cache.write_text(json.dumps({'index': 3, 'modes': {'3': 'x'}}))
+
+    index, _ = camera.find_camera(cache_path=str(cache))
+    assert index == 3
+    assert devices['probed'] == [3]
+    assert json.loads(cache.read_text()) == {'index': 3, 'modes': {'3': 'x'}}
+
+
+def test_stale_cache_falls_back_to_full_probe(devices, tmp_path):
+    cache = tmp_path / 'camara.json'
+    cache.write_text(json.dumps({'index': 3, 'modes': {'3': 'x'}}))
+    devices['working'] = {0, 4}  # La cámara 3 se desconectó
+
+    index, _ = camera.find_camera(cache_path=str(cache))
+    assert index == 0
+    _wait(lambda: len(devices['probed']) == 6)
+    assert devices['probed'][0] == 3 and sorted(devices['probed'][1:]) == [0, 1, 2, 3, 4]
+    # Se recuerda la nueva cámara sin perder los modos guardados
+    assert json.loads(cache.read_text()) == {'index': 0, 'modes': {'3': 'x'}}
+
+
+def test_no_cameras_and_unreadable_cache(devices, tmp_path):
+    cache = tmp_path / 'camara.json'
+    cache.write_text('{roto')
+    devices['working'] = set()
+
+    assert camera.find_camera(cache_path=str(cache)) == (None, None)
+    assert cache.read_text() == '{roto'  # Sin cámara no se sobrescribe
+    assert camera.load_camera_cache(str(cache)) == {}
+
+
+def test_find_all_cameras_without_cache_file(devices):
+    found = camera.find_cameras(cache_path='')
+    assert [index for index, _ in found] == [1, 3]
+    assert not any(cap.released for _, cap in found)
+
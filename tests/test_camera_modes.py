@@ -0,0 +1,181 @@
+"""Pruebas de la negociación del formato de la cámara"""
+
+import cv2
+import numpy as np
+import pytest
+
+from utils import camera, camera_modes
+from utils.camera_modes import fourcc_to_str, measure_mode, negotiate_mode
+
+
+class FakeDriver:
+    """
+    cv2.VideoCapture simulado: cada modo (FOURCC, ancho, alto) entrega ciertos FPS y CPU
+
+    Los modos que no están en performance caen en fallback, como hacen los drivers.
+    """
+
+    def __init__(self, performance, fallback=None):
+        self.performance = performance
+        self.fallback = fallback
+        self.props = {}
+        self.applied = []
+
+    def set(self, prop, value):
+        self.props[prop] = value
+        if prop == cv2.CAP_PROP_FPS:
+            requested = (fourcc_to_str(self.props[cv2.CAP_PROP_FOURCC]),
+                         self.props[cv2.CAP_PROP_FRAME_WIDTH], self.props[cv2.CAP_PROP_FRAME_HEIGHT])
+            actual = requested if requested in self.performance else self.fallback
+            self.props[cv2.CAP_PROP_FOURCC] = cv2.VideoWriter_fourcc(*actual[0])
+            self.props[cv2.CAP_PROP_FRAME_WIDTH], self.props[cv2.CAP_PROP_FRAME_HEIGHT] = actual[1:]
+            self.applied.append(actual)
+        return True
+
+    def get(self, prop):
+        return self.props.get(prop, 0)
+
+    def current(self):
+        return self.applied[-1]
+
+
+@pytest.fixture
+def measured(monkeypatch):
+    """measure_mode devuelve lo que el driver simulado entrega en el modo actual"""
+    calls = []
+
+    def _measure(cap, frames=20, warmup=3):
+        mode = cap.current()
+        calls.append(mode)
+        result = cap.performance.get(mode)
+        if result is None:
+            return None
+        fps, cpu_ms = result
+        return fps, cpu_ms, (mode[2], mode[1])
+
+    monkeypatch.setattr(camera_modes, 'measure_mode', _measure)
+    return calls
+
+
+def test_cheapest_mode_at_80_percent_of_requested_fps(measured):
+    driver = FakeDriver({
+        ('MJPG', 640, 480): (29.0, 3.0),
+        ('MJPG', 1280, 720): (30.0, 6.0),
+        ('YUYV', 640, 480): (24.0, 1.0),   # Justo el 80% de 30 FPS: cumple y es el más barato
+        ('YUYV', 1280, 720): (8.0, 2.0),
+    })
+    mode = negotiate_mode(driver, 640, 480, 30)
+
+    assert (mode['fourcc'], mode['width'], mode['height']) == ('YUYV', 640, 480)
+    assert (mode['measured_fps'], mode['cpu_ms']) == (24.0, 1.0)
+    assert driver.current() == ('YUYV', 640, 480)  # La cámara queda en el modo elegido
+    assert len(measured) == 4
+
+
+def test_mode_below_80_percent_is_not_suitable(measured):
+    driver = FakeDriver({
+        ('MJPG', 640, 480): (29.0, 3.0),
+        ('MJPG', 1280, 720): (30.0, 6.0),
+        ('YUYV', 640, 480): (23.9, 1.0),
+        ('YUYV', 1280, 720): (8.0, 2.0),
+    })
+    mode = negotiate_mode(driver, 640, 480, 30)
+    assert (mode['fourcc'], mode['width']) == ('MJPG', 640)
+
+    # Con min_fps explícito vale el umbral indicado
+    mode = negotiate_mode(driver, 640, 480, 30, min_fps=20)
+    assert (mode['fourcc'], mode['width']) == ('YUYV', 640)
+
+
+def test_equal_cost_prefers_smaller_mode(measured):
+    driver = FakeDriver({('MJPG', 640, 480): (30.0, 2.0), ('MJPG', 1280, 720): (30.0, 2.0)},
+                        fallback=('MJPG', 640, 480))
+    mode = negotiate_mode(driver, 640, 480, 30)
+    assert (mode['width'], mode['height']) == (640, 480)
+    # YUYV no existe: el driver cae en MJPG 640x480, que no se vuelve a medir
+    assert measured == [('MJPG', 640, 480), ('MJPG', 1280, 720)]
+
+
+def test_without_suitable_mode_keeps_fastest(measured):
+    driver = FakeDriver({('MJPG', 640, 480): (12.0, 3.0), ('YUYV', 640, 480): (9.0, 1.0),
+                         ('MJPG', 1280, 720): (14.0, 5.0), ('YUYV', 1280, 720): (5.0, 2.0)})
+    mode = negotiate_mode(driver, 640, 480, 30)
+    assert (mode['fourcc'], mode['width'], mode['measured_fps']) == ('MJPG', 1280, 14.0)
+
+
+def test_too_small_resolution_is_not_suitable(measured):
+    # El driver solo da 320x240 rápido; 1280x720 cumple la resolución pedida
+    driver = FakeDriver({('MJPG', 320, 240): (30.0, 1.0), ('MJPG', 1280, 720): (25.0, 4.0)},
+                        fallback=('MJPG', 320, 240))
+    mode = negotiate_mode(driver, 640, 480, 30)
+    assert (mode['width'], mode['height']) == (1280, 720)
+
+
+def test_no_measurable_mode(measured):
+    assert negotiate_mode(FakeDriver({}, fallback=('MJPG', 640, 480)), 640, 480, 30) is None
+
+
+class FakeClock:
+    """Reloj de pared y de CPU del hilo simulados"""
+
+    def __init__(self):
+        self.wall = self.cpu = 0.0
+
+    def perf_counter(self):
+        return self.wall
+
+    def thread_time(self):
+        return self.cpu
+
+    def time(self):
+        return self.wall
+
+
+class TimedCapture:
+    """Cada read() tarda 40 ms de reloj y 5 ms de CPU del hilo"""
+
+    def __init__(self, clock, fail_after=None):
+        self.clock = clock
+        self.reads = 0
+        self.fail_after = fail_after
+
+    def read(self):
+        self.reads += 1
+        if self.fail_after is not None and self.reads > self.fail_after:
+            return False, None
+        self.clock.wall += 0.040
+        self.clock.cpu += 0.005
+        return True, np.zeros((480, 640, 3), dtype=np.uint8)
+
+
+def test_measure_mode_reports_fps_and_thread_cpu(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(camera_modes, 'time', clock)
+    cap = TimedCapture(clock)
+
+    assert measure_mode(cap, frames=10, warmup=3) == (25.0, 5.0, (480, 640))
+    assert cap.reads == 13  # Los frames de calentamiento no cuentan en la medición
+    assert measure_mode(TimedCapture(clock, fail_after=5), frames=10) is None
+
+
+def test_saved_mode_is_reused_until_request_changes(monkeypatch, tmp_path):
+    cache = str(tmp_path / 'camara.json')
+    negotiated = []
+    mode = {'fourcc': 'MJPG', 'width': 640, 'height': 480, 'fps': 30, 'measured_fps': 29.9, 'cpu_ms': 1.0}
+
+    def _negotiate(cap, width, height, fps):
+        negotiated.append((width, height, fps))
+        return dict(mode, width=width, height=height)
+
+    applied = []
+    monkeypatch.setattr(camera, 'negotiate_mode', _negotiate)
+    monkeypatch.setattr(camera, 'apply_mode', lambda cap, m: applied.append(m))
+
+    assert camera.configure_camera_mode(None, 0, cache_path=cache) == mode
+    assert camera.configure_camera_mode(None, 0, cache_path=cache) == mode
+    assert negotiated == [(640, 480, 30)] and applied == [mode]
+
+    camera.configure_camera_mode(None, 0, width=1280, height=720, cache_path=cache)
+    camera.configure_camera_mode(None, 0, probe='force', cache_path=cache)
+    assert camera.configure_camera_mode(None, 0, probe='0', cache_path=cache) is None
+    assert negotiated == [(640, 480, 30), (1280, 720, 30), (640, 480, 30)]
@@ -0,0 +1,69 @@
+"""Pruebas del seguimiento de perros entre frames"""
+
+import numpy as np
+
+from utils.dog_tracker import DogTracker, iou_matrix
+
+
+def _boxes(*boxes):
+    return np.array(boxes, dtype=np.float32).reshape(-1, 4)
+
+
+def _scores(n):
+    return np.full(n, 0.9, dtype=np.float32)
+
+
+def test_iou_matrix_hand_computed():
+    a = _boxes([0, 0, 10, 10])
+    b = _boxes([0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30])
+    np.testing.assert_allclose(iou_matrix(a, b), [[1.0, 50 / 150, 0.0]], atol=1e-6)
+
+
+def test_ids_survive_a_missed_detection():
+    tracker = DogTracker(max_missed=3)
+    left, right = [0, 0, 40, 40], [200, 0, 240, 40]
+
+    _, _, ids = tracker.step(_boxes(left, right), _scores(2))
+    first_left, first_right = ids.tolist()
+    assert first_left != first_right
+
+    # YOLO no ve al perro de la izquierda en este frame
+    _, _, ids = tracker.step(_boxes([202, 0, 242, 40]), _scores(1))
+    assert ids.tolist() == [first_right]
+
+    # Reaparece (en orden inverso) y recupera su ID
+    _, _, ids = tracker.step(_boxes([204, 0, 244, 40], [2, 0, 42, 40]), _scores(2))
+    assert ids.tolist() == [first_right, first_left]
+
+
+def test_track_is_forgotten_after_max_missed():
+    tracker = DogTracker(max_missed=1)
+    _, _, ids = tracker.step(_boxes([0, 0, 40, 40]), _scores(1))
+    old_id = ids[0]
+
+    tracker.step(_boxes(), _scores(0))
+    tracker.step(_boxes(), _scores(0))
+    _, _, ids = tracker.step(_boxes([0, 0, 40, 40]), _scores(1))
+    assert ids[0] != old_id
+
+
+def test_skipped_frames_predict_constant_velocity():
+    tracker = DogTracker()
+    for x in (0, 10, 20, 30):  # 10 px por frame hacia la derecha
+        _, _, ids = tracker.step(_boxes([x, 0, x + 40, 40]), _scores(1))
+
+    boxes, scores, predicted_ids = tracker.step()  # Frame saltado
+    assert predicted_ids.tolist() == ids.tolist()
+    assert scores.shape == (1,)
+    assert 35 < boxes[0, 0] < 45  # Cerca de x = 40
+    assert tracker.motion() > 0
+
+
+def test_reset_restarts_ids():
+    tracker = DogTracker()
+    tracker.step(_boxes([0, 0, 40, 40]), _scores(1))
+    tracker.reset()
+    boxes, _, ids = tracker.step()
+    assert boxes.shape == (0, 4) and ids.size == 0
+    _, _, ids = tracker.step(_boxes([100, 100, 140, 140]), _scores(1))
+    assert ids.tolist() == [1]
@@ -0,0 +1,185 @@
+"""Pruebas del motor común de frames (orden de entrega, lotes, muestreo y cierre)"""
+
+import time
+
+import numpy as np
+import pytest
+
+from utils.frame_pipeline import FramePipeline, StopPipeline, VideoWriterSink
+from utils.highlights import HighlightSelector
+from utils.yolo_dog_detector import YoloDogDetector
+
+
+class FakeYolo:
+    """Detecta un perro en los frames cuyo valor está en dog_frames"""
+
+    def __init__(self, dog_frames):
+        self.dog_frames = set(dog_frames)
+        self.calls = []
+
+    def detect_dogs(self, frame, force=False):
+        self.calls.append((frame, force))
+        return [{'bbox': (0, 0, 10, 10), 'confidence': 0.9}] if frame in self.dog_frames else []
+
+
+class FakeEmotions:
+    """Devuelve una emoción con el número de frame y registra cada lote"""
+
+    def __init__(self):
+        self.batches = []
+
+    def predict_dog_emotions_frames(self, frames, detections):
+        self.batches.append(list(frames))
+        return [[{'emotion': f'e{frame}', 'confidence': 0.8}] for frame in frames]
+
+
+class RecordingSink:
+    def __init__(self):
+        self.items = []
+        self.closed = False
+
+    def __call__(self, item):
+        self.items.append((item['index'], [d['emotion'] for d in item['dog_emotions']]))
+
+    def close(self):
+        self.closed = True
+
+
+def _packets(frames):
+    return [{'frame': frame, 'index': frame, 'weight': 1, 'timestamp': None} for frame in frames]
+
+
+def test_batches_emotions_and_delivers_in_order():
+    emotions, sink = FakeEmotions(), RecordingSink()
+    pipeline = FramePipeline(FakeYolo({2, 3, 5, 6, 7}), emotions, [sink], batch_size=3)
+    pipeline.run(_packets(range(1, 9)))
+
+    # El frame 4 (sin perros) espera detrás del lote para no adelantarse al 2 y al 3
+    assert emotions.batches == [[2, 3, 5], [6, 7]]
+    assert sink.items == [(1, []), (2, ['e2']), (3, ['e3']), (4, []), (5, ['e5']),
+                          (6, ['e6']), (7, ['e7']), (8, [])]
+    assert pipeline.frames_analyzed == 8
+
+
+def test_sampling_reuses_last_analysis():
+    yolo, emotions, sink = FakeYolo(range(10)), FakeEmotions(), RecordingSink()
+    pipeline = FramePipeline(yolo, emotions, [sink], sample_step=3)
+    pipeline.run(_packets(range(7)))
+
+    assert yolo.calls == [(0, True), (3, True), (6, True)]  # Muestras forzadas, sin frame_skip
+    assert emotions.batches == [[0], [3], [6]]
+    assert sink.items == [(0, ['e0']), (1, ['e0']), (2, ['e0']), (3, ['e3']),
+                          (4, ['e3']), (5, ['e3']), (6, ['e6'])]
+    assert pipeline.frames_analyzed == 3
+
+
+def test_stop_pipeline_drops_pending_frames():
+    seen = []
+
+    def stop_at_two(item):
+        seen.append(item['index'])
+        if item['index'] == 2:
+            raise StopPipeline()
+
+    pipeline = FramePipeline(FakeYolo({3, 4}), FakeEmotions(), [stop_at_two], batch_size=4)
+    pipeline.run(_packets(range(1, 10)))
+    assert seen == [1, 2]
+
+
+def test_close_closes_every_sink_and_reraises_first_error():
+    class FailingSink(RecordingSink):
+        def close(self):
+            super().close()
+            raise OSError("disco lleno")
+
+    first, failing, last = RecordingSink(), FailingSink(), RecordingSink()
+    pipeline = FramePipeline(FakeYolo(()), FakeEmotions(), [first, failing, last])
+    with pytest.raises(OSError, match="disco lleno"):
+        pipeline.close()
+    assert first.closed and failing.closed and last.closed
+
+
+class FakeWriter:
+    def __init__(self, fail_at=None):
+        self.frames = []
+        self.fail_at = fail_at
+        self.released = False
+
+    def write(self, frame):
+        if frame == self.fail_at:
+            raise OSError("ffmpeg terminó")
+        self.frames.append(frame)
+
+    def release(self):
+        self.released = True
+
+
+@pytest.mark.parametrize('threaded', [False, True])
+def test_video_writer_sink_keeps_order_with_selector(threaded):
+    out = FakeWriter()
+    sink = VideoWriterSink(out, threaded=threaded, selector=HighlightSelector(padding=1))
+    pipeline = FramePipeline(FakeYolo({4, 5}), FakeEmotions(), [sink], batch_size=2)
+    pipeline.run(_packets(range(10)))
+    pipeline.close()
+
+    assert out.frames == [3, 4, 5, 6]
+    assert sink.frames_written == 4
+    assert out.released
+
+
+def test_video_writer_sink_reports_write_errors():
+    out = FakeWriter(fail_at=2)
+    pipeline = FramePipeline(FakeYolo(()), FakeEmotions(), [VideoWriterSink(out)])
+    pipeline.run(_packets(range(5)))
+    with pytest.raises(OSError, match="ffmpeg"):
+        pipeline.close()
+    assert out.frames == [0, 1]  # Tras el error no se escribe nada más
+    assert out.released
+
+
+class ScriptedGate:
+    """Compuerta de movimiento que obedece a un indicador"""
+
+    def __init__(self):
+        self.moving = True
+
+    def check(self, frame, now=None):
+        return self.moving
+
+
+def test_static_stretch_keeps_rate_controller_steady(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(time, 'perf_counter', lambda: clock[0])
+
+    detector = YoloDogDetector(model=object(), target_fps=15)
+
+    def _run_model(frame, input_size=None):
+        clock[0] += 0.005  # YOLO rápido: 5 ms
+        return np.empty((0, 4), dtype=np.float32), np.empty((0,), dtype=np.float32)
+
+    detector._run_model = _run_model
+    gate = ScriptedGate()
+    pipeline = FramePipeline(detector, FakeEmotions(), motion_gate=gate)
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+
+    controller = detector.rate_controller
+
+    def run(frames):
+        """Devuelve las configuraciones (intervalo, resolución) por las que pasó el control"""
+        settings = set()
+        for _ in range(frames):
+            pipeline.push(frame, timestamp=clock[0])
+            clock[0] += 1 / 30  # Cámara a 30 FPS
+            settings.add((controller.interval, controller.input_size))
+        return settings
+
+    run(60)
+    before = (controller.interval, controller.input_size)
+    assert before == (1, 640)  # Con margen YOLO pasa a ejecutarse en todos los frames
+
+    gate.moving = False
+    assert run(600) == {before}  # 20 s de escena quieta: no se ejecuta YOLO
+    assert controller.fps == pytest.approx(30, rel=0.05)
+
+    gate.moving = True
+    assert run(60) == {before}  # El perro vuelve a moverse: no se degrada la detección
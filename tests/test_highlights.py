@@ -0,0 +1,35 @@
+"""Pruebas de la selección de frames del video resumen"""
+
+from utils.highlights import HighlightSelector
+
+DOG_FRAMES = {8, 9, 15}
+
+
+def _select(selector, frames=20):
+    written = []
+    for index in range(frames):
+        written.extend(selector.push(index, index in DOG_FRAMES))
+    written.extend(selector.flush())
+    return written
+
+
+def test_keeps_dogs_with_padding():
+    written = _select(HighlightSelector(padding=2))
+    assert written == [6, 7, 8, 9, 10, 11, 13, 14, 15, 16, 17]
+
+
+def test_timelapse_samples_quiet_frames_in_order():
+    # Frames sin perros fuera de los márgenes: 0-5, 12, 18, 19 -> se escribe el 1.º y el 6.º
+    written = _select(HighlightSelector(padding=2, timelapse=5))
+    assert written == [0, 5, 6, 7, 8, 9, 10, 11, 13, 14, 15, 16, 17]
+
+
+def test_without_padding_only_dog_frames():
+    assert _select(HighlightSelector(padding=0)) == [8, 9, 15]
+
+
+def test_no_dogs_writes_nothing_unless_timelapse():
+    selector = HighlightSelector(padding=3)
+    assert [f for i in range(10) for f in selector.push(i, False)] + selector.flush() == []
+    selector = HighlightSelector(padding=3, timelapse=4)
+    assert [f for i in range(10) for f in selector.push(i, False)] + selector.flush() == [0, 4, 8]
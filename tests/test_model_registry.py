@@ -0,0 +1,98 @@
+"""Pruebas del registro de modelos (préstamos, devoluciones y descargas)"""
+
+import os
+
+import pytest
+
+from utils import model_registry
+from utils.model_registry import ModelRegistry
+from utils.yolo_dog_detector import YoloDogDetector
+
+
+def test_acquire_loads_once_and_counts_handles():
+    registry = ModelRegistry()
+    loads = []
+
+    def _load():
+        loads.append(1)
+        return object()
+
+    first = registry.acquire(('m',), _load)
+    second = registry.acquire(('m',), _load)
+
+    assert len(loads) == 1
+    assert first.instance is second.instance
+    assert first.lock is second.lock
+    assert registry.stats() == {('m',): 2}
+
+    first.release()
+    first.release()  # Idempotente
+    assert registry.stats() == {('m',): 1}
+
+    with second:
+        pass
+    assert registry.stats() == {('m',): 0}
+
+
+def test_unload_refuses_while_borrowed():
+    registry = ModelRegistry()
+    handle = registry.acquire(('m',), object)
+
+    assert registry.unload(('m',)) is False
+    assert registry.stats() == {('m',): 1}
+
+    handle.release()
+    assert registry.unload(('m',)) is True
+    assert registry.stats() == {}
+
+
+def test_release_after_forced_unload_is_a_no_op():
+    registry = ModelRegistry()
+    stale = registry.acquire(('m',), object)
+    assert registry.unload(('m',), force=True) is True
+
+    fresh = registry.acquire(('m',), object)
+    stale.release()  # No debe descontar el préstamo de la carga nueva
+    assert registry.stats() == {('m',): 1}
+
+    fresh.release()
+    assert registry.stats() == {('m',): 0}
+
+
+def test_failed_load_leaves_no_entry():
+    registry = ModelRegistry()
+
+    def _load():
+        raise RuntimeError("pesos corruptos")
+
+    with pytest.raises(RuntimeError):
+        registry.acquire(('m',), _load)
+    assert registry.stats() == {}
+    assert registry.acquire(('m',), object).instance is not None
+
+
+def test_yolo_key_uses_absolute_path(monkeypatch, tmp_path):
+    monkeypatch.setattr(model_registry, '_registry', ModelRegistry())
+    loads = []
+
+    def _load_model(weights, warmup=False, backend=None):
+        loads.append(weights)
+        return object()
+
+    monkeypatch.setattr(YoloDogDetector, 'load_model', staticmethod(_load_model))
+    monkeypatch.chdir(tmp_path)
+
+    relative = model_registry.acquire_yolo_detector(weights='yolov8n.pt', warmup=False)
+    dotted = model_registry.acquire_yolo_detector(weights='./yolov8n.pt', warmup=False)
+    absolute = model_registry.acquire_yolo_detector(weights=os.path.join(str(tmp_path), 'yolov8n.pt'),
+                                                    warmup=False)
+
+    assert len(loads) == 1
+    assert relative.instance is not dotted.instance  # Cada préstamo tiene su propio detector
+    assert relative.instance.model is dotted.instance.model is absolute.instance.model
+    key = ('yolo', os.path.join(str(tmp_path), 'yolov8n.pt'), 'ultralytics')
+    assert model_registry.get_registry().stats() == {key: 3}
+
+    for handle in (relative, dotted, absolute):
+        handle.release()
+    assert model_registry.get_registry().stats() == {key: 0}
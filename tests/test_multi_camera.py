@@ -0,0 +1,131 @@
+"""Pruebas del monitoreo de varias cámaras con inferencia compartida"""
+
+import numpy as np
+
+from fakes import FakeEmotions, fake_yolo_detector
+from utils.multi_camera import MultiCameraMonitor
+
+
+def _frame(dog=True, happy=False):
+    frame = np.zeros((120, 160, 3), dtype=np.uint8)
+    frame[:15, :16] = 140 if happy else 60
+    if dog:
+        frame[50:90, 40:80] = 255
+    return frame
+
+
+class FakeCamera:
+    """LatestFrameCamera simulada: entrega los frames encolados de a uno"""
+
+    def __init__(self):
+        self.queue = []
+        self.timestamp = 0.0
+        self.released = False
+
+    @property
+    def has_new_frame(self):
+        return bool(self.queue)
+
+    @property
+    def alive(self):
+        return bool(self.queue)
+
+    def read(self, timeout=None):
+        self.timestamp += 1.0
+        return True, self.queue.pop(0)
+
+    def release(self):
+        self.released = True
+
+
+class ScriptedGate:
+    """Compuerta de movimiento con respuestas fijas por frame"""
+
+    def __init__(self, answers):
+        self.answers = list(answers)
+
+    def check(self, frame, now=None):
+        return self.answers.pop(0)
+
+
+class CountingEmotions(FakeEmotions):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def predict_dog_emotions_frames(self, frames, detections):
+        self.batches.append(len(frames))
+        return super().predict_dog_emotions_frames(frames, detections)
+
+
+def _monitor():
+    """Tres cámaras (A con compuerta de movimiento, B y C sin ella) y un modelo YOLO compartido"""
+    emotions = CountingEmotions()
+    monitor = MultiCameraMonitor(emotions)
+    yolo_batches = []
+    cameras, delivered = {}, {}
+    for name, gate in (('A', ScriptedGate([False])), ('B', None), ('C', None)):
+        detector = fake_yolo_detector()
+        detector.frame_skip = 1  # YOLO en todos los frames: la prueba cuenta lotes, no saltos
+        run_model = detector._run_model
+
+        def _run_model_batch(frames, input_size=None, run_model=run_model):
+            yolo_batches.append(len(frames))
+            return [run_model(frame) for frame in frames]
+
+        detector._run_model_batch = _run_model_batch
+        cameras[name] = FakeCamera()
+        delivered[name] = []
+        monitor.add_source(name, cameras[name], detector, sinks=[delivered[name].append], motion_gate=gate)
+    return monitor, cameras, delivered, emotions, yolo_batches
+
+
+def _emotions(item):
+    return [result['emotion'] for result in item['dog_emotions']]
+
+
+def test_one_yolo_batch_and_one_emotion_call_per_round():
+    monitor, cameras, delivered, emotions, yolo_batches = _monitor()
+    cameras['A'].queue.append(_frame())
+    cameras['B'].queue.append(_frame(happy=True))
+    cameras['C'].queue.append(_frame(dog=False))
+
+    assert monitor.process_round() == 3
+    assert yolo_batches == [3]          # Las tres cámaras en una sola pasada de YOLO
+    assert emotions.batches == [2]      # Los perros de A y B en una sola clasificación
+    assert _emotions(delivered['A'][0]) == ['sad']
+    assert _emotions(delivered['B'][0]) == ['happy']
+    assert _emotions(delivered['C'][0]) == []
+
+
+def test_gated_and_ungated_cameras_in_one_round():
+    monitor, cameras, delivered, emotions, yolo_batches = _monitor()
+    for name in 'ABC':
+        cameras[name].queue.append(_frame(happy=name == 'B'))
+    monitor.process_round()
+
+    # Segunda ronda: A está quieta (compuerta cerrada), B tiene frame nuevo y C no
+    cameras['A'].queue.append(_frame())
+    cameras['B'].queue.append(_frame(happy=True))
+    assert monitor.process_round() == 2
+
+    assert yolo_batches == [3, 1]       # Solo B pasa por YOLO
+    assert emotions.batches == [3, 1]   # Y solo B se clasifica
+    a_item, b_item = delivered['A'][1], delivered['B'][1]
+    assert a_item['static'] and a_item['source'] is delivered['A'][0]
+    assert _emotions(a_item) == ['sad']  # A reutiliza su último análisis
+    assert 'source' not in b_item and _emotions(b_item) == ['happy']
+    assert len(delivered['C']) == 1
+    assert monitor.frames_processed == 5 and monitor.rounds == 2
+
+
+def test_round_without_new_frames_and_run_until_cameras_stop():
+    monitor, cameras, delivered, _, yolo_batches = _monitor()
+    assert monitor.process_round() == 0 and yolo_batches == []
+
+    cameras['B'].queue.extend([_frame(), _frame()])
+    monitor.run()  # Termina cuando ninguna cámara entrega frames
+    assert len(delivered['B']) == 2 and monitor.rounds == 2
+
+    monitor.close()
+    assert all(camera.released for camera in cameras.values())
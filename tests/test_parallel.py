@@ -0,0 +1,64 @@
+"""Pruebas del análisis en paralelo por tramos: mismo resultado que una sola pasada"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import procesar_video
+from fakes import FakeEmotions, FakeHandle, fake_yolo_detector, stats_summary
+
+
+class InlinePool(ThreadPoolExecutor):
+    """
+    Pool de hilos en lugar del de procesos
+
+    Los procesos 'spawn' no heredan los modelos falsos; con hilos cada tramo
+    pasa igual por _analyze_chunk, _chunk_warmup_frames y la unión de resultados.
+    """
+
+    def __init__(self, max_workers, mp_context=None, initializer=None, initargs=()):
+        super().__init__(max_workers=max_workers)
+        self.chunks = max_workers
+
+
+def _use_fake_models(monkeypatch, min_chunk_frames=20):
+    pools, detectors = [], []
+
+    def _pool(*args, **kwargs):
+        pools.append(InlinePool(*args, **kwargs))
+        return pools[-1]
+
+    def _acquire_yolo(**kwargs):
+        detectors.append(fake_yolo_detector())
+        return FakeHandle(detectors[-1])
+
+    monkeypatch.setattr(procesar_video, 'ProcessPoolExecutor', _pool)
+    monkeypatch.setattr(procesar_video, 'MIN_CHUNK_FRAMES', min_chunk_frames)
+    monkeypatch.setattr(procesar_video, 'acquire_emotion_detector', lambda **kwargs: FakeHandle(FakeEmotions()))
+    monkeypatch.setattr(procesar_video, 'acquire_yolo_detector', _acquire_yolo)
+    return pools, detectors
+
+
+def _single_pass(video):
+    return procesar_video.process_video(str(video), show_video=False, analysis_only=True,
+                                        emotion_detector=FakeEmotions(), yolo_detector=fake_yolo_detector())
+
+
+def test_parallel_chunks_match_single_pass(dog_video, monkeypatch):
+    single = _single_pass(dog_video)
+    pools, detectors = _use_fake_models(monkeypatch)
+
+    # 150 frames en 5 tramos de 30: los límites caen con perros en escena (frames 30, 60, 90)
+    parallel = procesar_video.process_video(str(dog_video), show_video=False, analysis_only=True, workers=5)
+
+    assert pools[0].chunks == 5 and len(detectors) == 5
+    assert stats_summary(parallel) == stats_summary(single)
+
+
+def test_parallel_chunks_with_odd_bounds_match_single_pass(dog_video, monkeypatch):
+    single = _single_pass(dog_video)
+    pools, _ = _use_fake_models(monkeypatch, min_chunk_frames=10)
+
+    # 150 / 7 no es entero: tramos de 21 y 22 frames, con fases distintas del salto de frames
+    parallel = procesar_video.process_video(str(dog_video), show_video=False, analysis_only=True, workers=7)
+
+    assert pools[0].chunks == 7
+    assert stats_summary(parallel) == stats_summary(single)
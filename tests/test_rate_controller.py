@@ -0,0 +1,71 @@
+"""Pruebas del control adaptativo de la tasa de detección"""
+
+import numpy as np
+
+from utils.rate_controller import DetectionRateController
+from utils.yolo_dog_detector import YoloDogDetector
+
+
+class _Loop:
+    """Bucle simulado con reloj falso: periodo de frame y latencia de YOLO fijos"""
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.now = 0.0
+
+    def run(self, frames, period, latency, motion=None):
+        for _ in range(frames):
+            self.controller.record_detection(latency, motion)
+            self.now += period
+            self.controller.record_frame(now=self.now)
+        return self.controller.interval, self.controller.input_size
+
+
+def test_overload_widens_interval_then_lowers_size():
+    loop = _Loop(DetectionRateController(target_fps=15, adjust_every=1))
+    assert loop.run(1, 1 / 10, 0.05) == (2, 640)  # Primer frame: aún no hay periodo medido
+    assert loop.run(4, 1 / 10, 0.05) == (6, 640)  # Sobrecargado y sin movimiento: se espacia YOLO
+    assert loop.run(1, 1 / 10, 0.05) == (6, 512)  # Con el intervalo al máximo baja la resolución
+
+
+def test_fast_motion_lowers_size_first():
+    loop = _Loop(DetectionRateController(target_fps=15, adjust_every=1))
+    assert loop.run(2, 1 / 10, 0.05, motion=0.2) == (2, 512)
+
+
+def test_headroom_relaxes_only_if_estimate_holds():
+    # 30 FPS con 10 ms de YOLO: con YOLO en cada frame se estiman ~26 FPS, se relaja
+    loop = _Loop(DetectionRateController(target_fps=15, adjust_every=1))
+    assert loop.run(2, 1 / 30, 0.01) == (1, 640)
+
+    # 17 FPS con 50 ms de YOLO: bajar el intervalo daría ~12 FPS, no se toca
+    loop = _Loop(DetectionRateController(target_fps=15, adjust_every=1))
+    assert loop.run(5, 1 / 17, 0.05) == (2, 640)
+
+
+def test_cpu_budget_counts_as_overload():
+    # 15 FPS justos pero YOLO se lleva el 60% del frame con un presupuesto del 30%
+    controller = DetectionRateController(target_fps=15, cpu_budget=0.3, adjust_every=1)
+    assert _Loop(controller).run(2, 1 / 15, 0.08) == (3, 640)
+    assert abs(controller.detection_share - 0.08 * 15 / 3) < 1e-9
+
+
+def test_input_size_snaps_to_supported_sizes():
+    assert DetectionRateController(input_size=500).input_size == 512
+
+
+def test_detector_follows_controller_interval():
+    detector = YoloDogDetector(model=object(), target_fps=15)
+    calls = []
+
+    def _run_model(frame, input_size=None):
+        calls.append(detector.frame_count)
+        return np.empty((0, 4), dtype=np.float32), np.empty((0,), dtype=np.float32)
+
+    detector._run_model = _run_model
+    detector.rate_controller.interval = 3
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    for _ in range(9):
+        detector.detect_dogs(frame)
+    assert calls == [3, 6, 9]
+    assert detector.frame_skip == 3
@@ -0,0 +1,50 @@
+"""Pruebas del procesamiento reanudable: mismo resultado que una sola pasada"""
+
+import json
+import os
+
+import procesar_video
+from fakes import FakeEmotions, fake_yolo_detector, stats_summary, write_dog_video
+
+
+def _process(dog_video, emotions, **kwargs):
+    return procesar_video.process_video(str(dog_video), show_video=False, analysis_only=True,
+                                        emotion_detector=emotions, yolo_detector=fake_yolo_detector(),
+                                        **kwargs)
+
+
+def test_resumable_matches_single_pass(dog_video):
+    single = _process(dog_video, FakeEmotions())
+    resumable = _process(dog_video, FakeEmotions(), resumable=True, checkpoint_seconds=1)
+
+    assert single['dogs_detected_frames'] > 0
+    assert set(single['emotion_stats']) >= {'sad', 'happy'}
+    assert single['emotion_stats']['sad'] and single['emotion_stats']['happy']
+    assert stats_summary(resumable) == stats_summary(single)
+    assert not (dog_video.parent / 'perro_checkpoint').exists()
+
+
+def test_resume_after_interruption_matches_single_pass(dog_video):
+    single = _process(dog_video, FakeEmotions())
+
+    # Ctrl+C en el frame 90 (cuarto segmento de 1 s): quedan guardados los tres primeros
+    assert _process(dog_video, FakeEmotions(interrupt=True), resumable=True, checkpoint_seconds=1) is None
+    state = dog_video.parent / 'perro_checkpoint' / 'estado.json'
+    assert len(json.loads(state.read_text())['segments']) == 3
+
+    resumed = _process(dog_video, FakeEmotions(), resumable=True, checkpoint_seconds=1)
+    assert stats_summary(resumed) == stats_summary(single)
+    assert not state.exists()
+
+
+def test_checkpoint_is_discarded_when_video_changes(dog_video):
+    assert _process(dog_video, FakeEmotions(interrupt=True), resumable=True, checkpoint_seconds=1) is None
+
+    # Otro video con el mismo nombre: los segmentos guardados ya no valen
+    write_dog_video(dog_video, dog_frames=range(100, 140))
+    stat = dog_video.stat()
+    os.utime(dog_video, (stat.st_atime, stat.st_mtime + 10))
+    resumed = _process(dog_video, FakeEmotions(), resumable=True, checkpoint_seconds=1)
+    single = _process(dog_video, FakeEmotions())
+    assert stats_summary(resumed) == stats_summary(single)
+    assert resumed['emotion_stats']['sad'] == 0
@@ -0,0 +1,148 @@
+"""Pruebas del escritor H.264 con ffmpeg y del límite de tamaño"""
+
+import io
+
+import cv2
+import numpy as np
+import pytest
+
+import procesar_video
+from fakes import FakeEmotions, fake_yolo_detector
+from utils import video_io
+from utils.video_io import FfmpegVideoWriter, bitrate_for_size, open_video_writer
+
+
+class FakeStdin(io.BytesIO):
+    def __init__(self, fail=False):
+        super().__init__()
+        self.fail = fail
+
+    def write(self, data):
+        if self.fail:
+            raise BrokenPipeError()
+        return super().write(data)
+
+    def close(self):
+        self.received = self.getvalue()
+        super().close()
+
+
+class FakeProcess:
+    """Proceso ffmpeg simulado: guarda el comando y lo recibido por stdin"""
+
+    def __init__(self, command, returncode=0, fail_write=False, stderr=b''):
+        self.command = command
+        self.returncode = returncode
+        self.stdin = FakeStdin(fail_write)
+        self.stderr = io.BytesIO(stderr)
+
+    def poll(self):
+        return None
+
+    def wait(self):
+        return self.returncode
+
+
+@pytest.fixture
+def ffmpeg(monkeypatch):
+    """Reemplaza subprocess.Popen de video_io; options se aplica al próximo proceso"""
+    processes = []
+    options = {}
+
+    def _popen(command, **kwargs):
+        processes.append(FakeProcess(command, **options))
+        return processes[-1]
+
+    monkeypatch.setattr(video_io.subprocess, 'Popen', _popen)
+    return processes, options
+
+
+def _arg(command, flag):
+    return command[command.index(flag) + 1]
+
+
+def test_bitrate_for_size():
+    # 20 MB en 100 s: 1677.7 kbit/s, menos el 10% de margen
+    assert bitrate_for_size(20 * 1024 ** 2, 100) == pytest.approx(1509.95, abs=0.01)
+    assert bitrate_for_size(20 * 1024 ** 2, None) is None
+    assert bitrate_for_size(20 * 1024 ** 2, 0) is None
+    assert bitrate_for_size(None, 100) is None
+
+
+def test_size_target_sets_maxrate_and_bufsize(ffmpeg):
+    processes, _ = ffmpeg
+    FfmpegVideoWriter('salida.mp4', 29.97, (1920, 1080), crf=28, preset='veryfast',
+                      max_width=854, max_kbps=bitrate_for_size(20 * 1024 ** 2, 100))
+    command = processes[0].command
+
+    assert _arg(command, '-maxrate') == '1510k'
+    assert _arg(command, '-bufsize') == '1510k'
+    assert _arg(command, '-crf') == '28' and _arg(command, '-preset') == 'veryfast'
+    assert _arg(command, '-s') == '1920x1080' and _arg(command, '-r') == '29.97'
+    assert _arg(command, '-vf') == 'scale=854:-2'
+    assert command[-1] == 'salida.mp4'
+
+
+def test_without_size_target_only_crf(ffmpeg):
+    processes, _ = ffmpeg
+    FfmpegVideoWriter('salida.mp4', 30, (640, 480), max_width=854)
+    command = processes[0].command
+    assert '-maxrate' not in command and '-bufsize' not in command
+    assert '-vf' not in command  # Ya es más angosto que max_width
+
+
+def test_write_resizes_to_declared_size(ffmpeg):
+    processes, _ = ffmpeg
+    writer = FfmpegVideoWriter('salida.mp4', 30, (64, 48))
+    assert writer.isOpened()
+    writer.write(np.zeros((96, 128, 3), dtype=np.uint8))
+    writer.write(np.zeros((48, 64, 3), dtype=np.uint8))
+    writer.release()
+    assert len(processes[0].stdin.received) == 2 * 64 * 48 * 3
+
+
+def test_broken_pipe_is_raised_on_release(ffmpeg):
+    _, options = ffmpeg
+    options.update(fail_write=True, stderr=b'No space left on device')
+    writer = FfmpegVideoWriter('salida.mp4', 30, (64, 48))
+    writer.write(np.zeros((48, 64, 3), dtype=np.uint8))
+    with pytest.raises(OSError, match='No space left'):
+        writer.release()
+    writer.release()  # El error se informa una sola vez
+
+
+def test_ffmpeg_exit_code_is_raised_on_release(ffmpeg):
+    _, options = ffmpeg
+    options.update(returncode=1, stderr=b'Invalid argument')
+    writer = FfmpegVideoWriter('salida.mp4', 30, (64, 48))
+    with pytest.raises(OSError, match='Invalid argument'):
+        writer.release()
+
+
+def test_open_video_writer_falls_back_to_mp4v(monkeypatch, tmp_path):
+    monkeypatch.setattr(video_io.shutil, 'which', lambda name: None)
+    writer = open_video_writer(str(tmp_path / 'salida.mp4'), 30, (64, 48), codec='h264')
+    assert isinstance(writer, cv2.VideoWriter)
+    writer.release()
+
+
+def test_size_target_uses_whole_video_duration(dog_video):
+    # 150 frames a 30 FPS = 5 s
+    encoder = procesar_video._resolve_encoder(str(dog_video), {'codec': 'h264', 'max_bytes': 1024 ** 2})
+    assert 'max_bytes' not in encoder
+    assert encoder['max_kbps'] == pytest.approx(bitrate_for_size(1024 ** 2, 5.0))
+    assert encoder['codec'] == 'h264'
+
+
+def test_process_video_discards_output_when_encoding_fails(dog_video, ffmpeg, monkeypatch):
+    _, options = ffmpeg
+    options.update(fail_write=True, stderr=b'No space left on device')
+    monkeypatch.setattr(video_io.shutil, 'which', lambda name: '/usr/bin/ffmpeg')
+    output = dog_video.parent / 'salida.mp4'
+    output.write_bytes(b'parcial')  # Lo que ffmpeg alcanzó a escribir
+
+    stats = procesar_video.process_video(str(dog_video), output_path=str(output), show_video=False,
+                                         save_video=True, encoder={'codec': 'h264'},
+                                         emotion_detector=FakeEmotions(), yolo_detector=fake_yolo_detector())
+    assert stats is None
+    assert not output.exists()
@@ -0,0 +1,114 @@
+"""Pruebas del análisis en dos pasadas (barrido de tramos e índice junto al video)"""
+
+import json
+import os
+
+import pytest
+
+import procesar_video
+from fakes import FakeEmotions, fake_yolo_detector, stats_summary, write_dog_video
+from utils import video_scan
+from utils.video_scan import interval_index_path, load_interval_index, scan_dog_intervals
+
+# 10 s de video con perros breves alrededor de los frames 30 y 240 (el barrido a 1 FPS mira 0, 30, ..., 270)
+BRIEF_FRAMES = 300
+BRIEF_DOGS = set(range(28, 36)) | set(range(238, 246))
+
+
+@pytest.fixture
+def brief_video(tmp_path):
+    path = tmp_path / 'breve.avi'
+    write_dog_video(path, dog_frames=BRIEF_DOGS, frames=BRIEF_FRAMES)
+    return path
+
+
+def test_scan_merges_margins_into_intervals(brief_video):
+    # Margen = paso (30) + padding: cada muestra con perro cubre hasta las muestras vecinas
+    index = scan_dog_intervals(str(brief_video), fake_yolo_detector(), scan_fps=1.0, padding=0)
+    assert index['frames_scanned'] == 10
+    assert index['total_frames'] == BRIEF_FRAMES
+    assert index['intervals'] == [[0, 61], [210, 271]]
+
+    # Con 1 s de padding el segundo tramo se recorta al final del video
+    index = scan_dog_intervals(str(brief_video), fake_yolo_detector(), scan_fps=1.0, padding=1.0)
+    assert index['intervals'] == [[0, 91], [180, 300]]
+
+    # Con 3 s de padding los dos tramos se solapan y se unen
+    index = scan_dog_intervals(str(brief_video), fake_yolo_detector(), scan_fps=1.0, padding=3.0)
+    assert index['intervals'] == [[0, 300]]
+
+
+def test_scan_without_dogs_has_no_intervals(tmp_path):
+    path = tmp_path / 'vacio.avi'
+    write_dog_video(path, dog_frames=())
+    assert scan_dog_intervals(str(path), fake_yolo_detector())['intervals'] == []
+
+
+def _two_pass(video, **kwargs):
+    return procesar_video.process_video(str(video), show_video=False, analysis_only=True, two_pass=True,
+                                        emotion_detector=FakeEmotions(), yolo_detector=fake_yolo_detector(),
+                                        **kwargs)
+
+
+@pytest.fixture
+def count_scans(monkeypatch):
+    scans = []
+
+    def _scan(*args, **kwargs):
+        scans.append(args[0])
+        return scan_dog_intervals(*args, **kwargs)
+
+    monkeypatch.setattr(procesar_video, 'scan_dog_intervals', _scan)
+    return scans
+
+
+def test_two_pass_matches_single_pass_and_reuses_index(brief_video, count_scans):
+    single = procesar_video.process_video(str(brief_video), show_video=False, analysis_only=True,
+                                          emotion_detector=FakeEmotions(), yolo_detector=fake_yolo_detector())
+    first = _two_pass(brief_video)
+
+    # Se analizan solo los tramos, pero las tasas siguen referidas al video completo
+    assert first['intervals'] == [[0, 91], [180, 300]]
+    assert first['frames_scanned'] == 10
+    assert stats_summary(first) == stats_summary(single)
+    assert os.path.exists(interval_index_path(str(brief_video)))
+    assert len(count_scans) == 1
+
+    second = _two_pass(brief_video)
+    assert len(count_scans) == 1  # Índice reutilizado: no se vuelve a barrer
+    assert stats_summary(second) == stats_summary(first)
+
+    _two_pass(brief_video, rescan=True)
+    assert len(count_scans) == 2
+
+
+def test_index_is_ignored_when_video_or_scan_rate_changes(brief_video, count_scans):
+    _two_pass(brief_video)
+    video = str(brief_video)
+    assert load_interval_index(video, 1.0) is not None
+    assert load_interval_index(video, 2.0) is None  # Barrido hecho a otra tasa
+
+    _two_pass(brief_video, scan_fps=2.0)
+    assert len(count_scans) == 2
+
+    # Otro contenido con el mismo nombre: la firma del índice ya no coincide
+    write_dog_video(brief_video, dog_frames=(), frames=BRIEF_FRAMES)
+    stat = brief_video.stat()
+    os.utime(brief_video, (stat.st_atime, stat.st_mtime + 10))
+    assert load_interval_index(video) is None
+    stats = _two_pass(brief_video, scan_fps=2.0)
+    assert len(count_scans) == 3
+    assert stats['intervals'] == [] and stats['dogs_detected_frames'] == 0
+
+
+def test_unreadable_or_old_index_is_rescanned(brief_video):
+    video = str(brief_video)
+    with open(interval_index_path(video), 'w', encoding='utf-8') as f:
+        f.write('{roto')
+    assert load_interval_index(video) is None
+
+    index = scan_dog_intervals(video, fake_yolo_detector())
+    index['version'] = video_scan.INDEX_VERSION + 1
+    with open(interval_index_path(video), 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+    assert load_interval_index(video) is None
@@ -0,0 +1,90 @@
+"""Pruebas del letterbox, el NMS y la decodificación de la salida ONNX"""
+
+import numpy as np
+
+from utils.yolo_backends import OnnxYoloModel, default_yolo_backend, letterbox, nms
+
+
+def test_letterbox_pads_the_short_side():
+    frame = np.zeros((320, 640, 3), dtype=np.uint8)
+    image, scale, (pad_x, pad_y) = letterbox(frame, 640)
+
+    assert image.shape == (640, 640, 3)
+    assert scale == 1.0
+    assert (pad_x, pad_y) == (0, 160)
+    assert (image[:160] == 114).all() and (image[480:] == 114).all()
+    assert (image[160:480] == 0).all()
+
+
+def test_letterbox_scales_down_keeping_aspect():
+    frame = np.zeros((480, 1280, 3), dtype=np.uint8)
+    image, scale, (pad_x, pad_y) = letterbox(frame, 640)
+
+    assert image.shape == (640, 640, 3)
+    assert scale == 0.5
+    assert (pad_x, pad_y) == (0, 200)  # 1280x480 -> 640x240, 400 px de relleno
+
+
+def test_nms_keeps_best_of_overlapping_boxes():
+    boxes = np.array([
+        [0, 0, 10, 10],      # 0.9
+        [1, 0, 11, 10],      # 0.8, IoU con la primera = 90 / 110 ≈ 0.82
+        [20, 20, 30, 30],    # 0.7, sin solapamiento
+        [5, 0, 15, 10],      # 0.95, IoU con la primera = 50 / 150 ≈ 0.33
+    ], dtype=np.float32)
+    scores = np.array([0.9, 0.8, 0.7, 0.95], dtype=np.float32)
+
+    assert nms(boxes, scores, 0.5).tolist() == [3, 0, 2]
+    # Con un umbral menor que 0.33 la primera también cae bajo la de 0.95
+    assert nms(boxes, scores, 0.3).tolist() == [3, 2]
+
+
+def test_nms_without_boxes():
+    assert nms(np.empty((0, 4)), np.empty((0,)), 0.5).tolist() == []
+
+
+def _onnx_model(output):
+    """OnnxYoloModel sin archivo: _forward devuelve una salida fija"""
+    model = OnnxYoloModel.__new__(OnnxYoloModel)
+    model.runtime = 'onnx'
+    model.input_size = 640
+    model.dynamic_input = False
+    model._forward = lambda blob: output
+    return model
+
+
+def test_detect_undoes_letterbox_and_filters_class():
+    dog = 16
+    # Tres anchors en coordenadas de la entrada 640x640 (cx, cy, w, h, 80 clases)
+    output = np.zeros((1, 84, 3), dtype=np.float32)
+    output[0, :4, 0] = [100, 260, 40, 40]    # Perro con confianza 0.9
+    output[0, 4 + dog, 0] = 0.9
+    output[0, :4, 1] = [102, 260, 40, 40]    # Casi la misma caja, la quita el NMS
+    output[0, 4 + dog, 1] = 0.8
+    output[0, :4, 2] = [400, 300, 20, 20]    # Otra clase (persona)
+    output[0, 4 + 0, 2] = 0.99
+
+    frame = np.zeros((320, 640, 3), dtype=np.uint8)  # pad_y = 160, escala 1
+    boxes, scores = _onnx_model(output).detect(frame, 0.5, 0.45, dog)
+
+    np.testing.assert_allclose(boxes, [[80, 80, 120, 120]])
+    np.testing.assert_allclose(scores, [0.9])
+
+
+def test_detect_clips_to_frame_and_handles_no_detections():
+    output = np.zeros((1, 84, 1), dtype=np.float32)
+    output[0, :4, 0] = [10, 170, 40, 40]  # Se sale por la izquierda
+    output[0, 4 + 16, 0] = 0.8
+    frame = np.zeros((320, 640, 3), dtype=np.uint8)
+    model = _onnx_model(output)
+
+    boxes, _ = model.detect(frame, 0.5, 0.45, 16)
+    np.testing.assert_allclose(boxes, [[0, 0, 30, 30]])
+
+    boxes, scores = model.detect(frame, 0.95, 0.45, 16)
+    assert boxes.shape == (0, 4) and scores.shape == (0,)
+
+
+def test_default_backend_by_extension():
+    assert default_yolo_backend('yolov8n.pt') == 'ultralytics'
+    assert default_yolo_backend('yolov8n.ONNX') in ('onnx', 'opencv')
@@ -1,16 +1,186 @@
+import threading
 import cv2
 import numpy as np
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing.image import img_to_array
+from .emotion_backends import default_backend, load_emotion_model
+
+# Colores BGR por emoción para las anotaciones por perro
+EMOTION_COLORS = {
+    'happy': (0, 255, 255),    # Amarillo
+    'relaxed': (0, 255, 0),    # Verde
+    'sad': (255, 0, 0),        # Azul
+    'angry': (0, 0, 255)       # Rojo
+}
+
+# Paleta de las ventanas de cámara: rojo para emociones negativas, amarillo para feliz
+CAMERA_EMOTION_COLORS = {
+    'happy': (0, 255, 255),
+    'relaxed': (0, 255, 0),
+    'sad': (0, 0, 255),
+    'angry': (0, 0, 255)
+}
+
+def crop_dog_regions(frame, bboxes, padding=0.15):
+    """
+    Recorta cada perro en un cuadrado centrado en su caja, con margen
+
+    El recorte es cuadrado para que al redimensionar a 224x224 no se deforme
+    el perro; lo que queda fuera de la imagen se rellena con negro.
+
+    Args:
+        frame: Imagen BGR completa
+        bboxes: Lista de cajas (x, y, w, h)
+        padding (float): Margen relativo añadido a cada lado de la caja
+
+    Returns:
+        list: Un recorte BGR por caja, en el mismo orden
+    """
+    frame_h, frame_w = frame.shape[:2]
+    crops = []
+    for x, y, w, h in bboxes:
+        side = int(max(w, h) * (1 + 2 * padding))
+        side = max(side, 1)
+        cx, cy = x + w / 2, y + h / 2
+        x1, y1 = int(round(cx - side / 2)), int(round(cy - side / 2))
+        x2, y2 = x1 + side, y1 + side
+
+        # Parte del cuadrado que cae dentro de la imagen
+        ix1, iy1 = max(x1, 0), max(y1, 0)
+        ix2, iy2 = min(x2, frame_w), min(y2, frame_h)
+        if ix2 <= ix1 or iy2 <= iy1:
+            crops.append(np.zeros((side, side, 3), dtype=frame.dtype))
+            continue
+
+        crop = frame[iy1:iy2, ix1:ix2]
+        if (ix1, iy1, ix2, iy2) != (x1, y1, x2, y2):
+            crop = cv2.copyMakeBorder(crop, iy1 - y1, y2 - iy2, ix1 - x1, x2 - ix2,
+                                      cv2.BORDER_CONSTANT, value=(0, 0, 0))
+        crops.append(crop)
+    return crops
+
+def best_dog_emotion(dog_emotions):
+    """Resultado del perro detectado con mayor confianza YOLO, o None"""
+    if not dog_emotions:
+        return None
+    return max(dog_emotions, key=lambda d: d['confidence'])
+
+def draw_dog_emotions(frame, dog_emotions, colors=None, confidence_bar=False, offset=30,
+                      text_format='{emotion}: {confidence:.2f}'):
+    """
+    Dibuja la emoción de cada perro debajo de su caja
+
+    Args:
+        frame: Imagen BGR (se modifica en el lugar)
+        dog_emotions (list): Resultados de EmotionDetector.predict_dog_emotions()
+        colors (dict): Color BGR por emoción (EMOTION_COLORS por defecto)
+        confidence_bar (bool): Dibujar barra de confianza bajo el texto
+        offset (int): Distancia en píxeles entre la caja y el texto
+        text_format (str): Formato del texto con {emotion} y {confidence}
+
+    Returns:
+        frame: Imagen anotada
+    """
+    colors = colors or EMOTION_COLORS
+    for result in dog_emotions:
+        x, y, w, h = result['bbox']
+        emotion = result['emotion']
+        confidence = result['emotion_confidence']
+        color = colors.get(emotion, (255, 255, 255))
+
+        text = text_format.format(emotion=emotion.upper(), confidence=confidence)
+        cv2.putText(frame, text, (x, y + h + offset),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
+
+        if confidence_bar:
+            bar_y = y + h + offset + 10
+            cv2.rectangle(frame, (x, bar_y), (x + w, bar_y + 8), (50, 50, 50), -1)
+            cv2.rectangle(frame, (x, bar_y), (x + int(w * confidence), bar_y + 8), color, -1)
+    return frame
+
 #Ingreso de imagen detectado y halla valor maximo de probabilidad por frame
 class EmotionDetector:
-    def __init__(self, model_path):
-        self.model = load_model(model_path)
+    def __init__(self, model_path, backend=None):
+        # backend: 'keras', 'tflite', 'onnx', 'opencv' o None (según la extensión).
+        # Solo 'keras' importa TensorFlow; los demás usan el modelo exportado por cuantizar_modelo.py
+        self.backend = backend or default_backend(model_path)
+        self.model = load_emotion_model(model_path, self.backend)
         self.labels = ['angry', 'happy', 'relaxed', 'sad']
-    
+        self._lock = threading.Lock()  # El modelo se comparte entre hilos via model_registry
+        self._buffer = None  # Lote float32 reutilizado entre llamadas
+
+    def warmup(self):
+        """Ejecuta una inferencia vacía para que la primera predicción real sea rápida"""
+        self.predict_emotion(np.zeros((224, 224, 3), dtype=np.uint8))
+
     def predict_emotion(self, frame):
-        img = cv2.resize(frame, (224, 224))
-        img = img_to_array(img) / 255.0
-        img = np.expand_dims(img, axis=0)
-        preds = self.model.predict(img)[0]
-        return self.labels[np.argmax(preds)], max(preds), preds
+        return self.predict_emotion_batch([frame])[0]
+
+    def predict_emotion_batch(self, frames):
+        """
+        Clasifica varios frames o recortes en una sola pasada del modelo
+
+        Args:
+            frames: Lista de imágenes BGR de cualquier tamaño
+
+        Returns:
+            list: [(emocion, probabilidad, vector_de_probabilidades), ...] en el mismo orden
+        """
+        if len(frames) == 0:
+            return []
+
+        with self._lock:
+            batch = self._batch_buffer(len(frames))
+            for i, frame in enumerate(frames):
+                batch[i] = cv2.resize(frame, (224, 224))
+            np.divide(batch, 255.0, out=batch)
+            preds = np.asarray(self.model.predict_on_batch(batch))
+
+        return [(self.labels[np.argmax(p)], max(p), p) for p in preds]
+
+    def _batch_buffer(self, size):
+        """Buffer float32 preasignado que solo crece cuando llega un lote más grande"""
+        if self._buffer is None or len(self._buffer) < size:
+            self._buffer = np.empty((max(size, 8), 224, 224, 3), dtype=np.float32)
+        return self._buffer[:size]
+
+    def predict_dog_emotions(self, frame, dog_detections, padding=0.15):
+        """
+        Clasifica la emoción de cada perro detectado en un solo lote
+
+        Args:
+            frame: Imagen BGR sin anotaciones
+            dog_detections (list): Detecciones de YoloDogDetector.detect_dogs()
+            padding (float): Margen relativo alrededor de cada caja
+
+        Returns:
+            list: Un dict por perro con 'bbox', 'confidence', 'track_id' (None
+                sin seguimiento), 'emotion', 'emotion_confidence' y 'probabilities'
+        """
+        return self.predict_dog_emotions_frames([frame], [dog_detections], padding)[0]
+
+    def predict_dog_emotions_frames(self, frames, detections_per_frame, padding=0.15):
+        """
+        Igual que predict_dog_emotions pero agrupando los perros de varios frames en un lote
+
+        Returns:
+            list: Una lista de resultados por frame
+        """
+        crops = []
+        for frame, detections in zip(frames, detections_per_frame):
+            crops.extend(crop_dog_regions(frame, [d['bbox'] for d in detections], padding))
+
+        predictions = iter(self.predict_emotion_batch(crops))
+        results = []
+        for detections in detections_per_frame:
+            frame_results = []
+            for detection in detections:
+                emotion, prob, preds = next(predictions)
+                frame_results.append({
+                    'bbox': detection['bbox'],
+                    'confidence': detection['confidence'],
+                    'track_id': detection.get('track_id'),
+                    'emotion': emotion,
+                    'emotion_confidence': float(prob),
+                    'probabilities': preds
+                })
+            results.append(frame_results)
+        return results
@@ -0,0 +1,338 @@
+"""
+Captura de cámara en un hilo propio que conserva solo el último frame
+
+Con cap.read() en el mismo hilo que YOLO y el modelo de emociones, el driver
+acumula frames mientras corre la inferencia y el bucle termina analizando
+imágenes con cientos de milisegundos de retraso. Aquí un hilo lee la cámara
+sin parar y guarda únicamente el frame más reciente: los que nadie llegó a
+leer se descartan (y se cuentan), así el análisis siempre trabaja sobre la
+imagen más nueva.
+
+Un archivo de video también puede usarse como cámara: se lee a su FPS
+nominal, como si fuera en vivo (útil para probar o para el modo multicámara).
+
+Para encontrar la cámara se prueba primero la última que funcionó (guardada
+en DOG_CAMERA_CACHE) y, si ya no responde, todos los dispositivos a la vez
+(en Linux solo los /dev/video* existentes). La cámara abierta al probarla se
+entrega a open_camera() en lugar de cerrarla y volver a abrirla.
+
+La primera vez que se abre cada cámara se negocia su formato (ver
+utils.camera_modes) y el modo elegido se guarda en el mismo archivo.
+"""
+
+import os
+import re
+import sys
+import glob
+import json
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+
+from .camera_modes import apply_mode, describe_mode, negotiate_mode
+
+logger = logging.getLogger(__name__)
+
+# Última cámara que funcionó ('' = no recordar)
+DEFAULT_CAMERA_CACHE = os.getenv('DOG_CAMERA_CACHE',
+                                 os.path.join(os.path.expanduser('~'), '.feelipetai_camara.json'))
+
+# Negociar el formato de la cámara: '1' la primera vez (luego se usa el guardado),
+# 'force' en cada apertura, '0' nunca (solo se pide la resolución y los FPS)
+DEFAULT_CAMERA_PROBE = os.getenv('DOG_CAMERA_PROBE', '1').lower()
+
+
+class LatestFrameCamera:
+    """
+    Envuelve un cv2.VideoCapture de cámara con un buffer de un solo frame
+
+    Se usa como el propio cv2.VideoCapture (read, isOpened, release).
+
+    Args:
+        cap: cv2.VideoCapture ya configurado (se libera en release())
+        frame_event (threading.Event): Se activa con cada frame nuevo; varias cámaras
+            pueden compartir uno para esperar a la primera que tenga frame
+        pace_fps (float): Limita la lectura a estos FPS (archivos de video leídos
+            como cámara en vivo; None = tan rápido como entregue la cámara)
+
+    Attributes:
+        timestamp (float): time.time() en que se capturó el último frame entregado
+        frames_captured (int): Frames leídos de la cámara
+        frames_dropped (int): Frames reemplazados por uno más nuevo sin haberse entregado
+    """
+
+    def __init__(self, cap, frame_event=None, pace_fps=None):
+        self.cap = cap
+        self.frame_event = frame_event
+        self._frame_interval = 1.0 / pace_fps if pace_fps else 0.0
+        self.timestamp = None
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self._frame = None
+        self._frame_time = None
+        self._frame_id = 0      # Último frame capturado
+        self._delivered_id = 0  # Último frame entregado por read()
+        self._running = cap.isOpened()
+        self._condition = threading.Condition()
+        self._thread = None
+        if self._running:
+            self._thread = threading.Thread(target=self._run, name="camera-reader", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        next_frame_time = time.time()
+        while self._running:
+            if self._frame_interval:
+                delay = next_frame_time - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                next_frame_time = max(next_frame_time + self._frame_interval, time.time() - self._frame_interval)
+            ret, frame = self.cap.read()
+            captured_at = time.time()
+            with self._condition:
+                if not ret:
+                    self._running = False
+                    self._condition.notify_all()
+                    if self.frame_event is not None:
+                        self.frame_event.set()
+                    return
+                if self._frame_id != self._delivered_id:
+                    self.frames_dropped += 1
+                self._frame = frame
+                self._frame_time = captured_at
+                self._frame_id += 1
+                self.frames_captured += 1
+                self._condition.notify_all()
+            if self.frame_event is not None:
+                self.frame_event.set()
+
+    def read(self, timeout=2.0):
+        """
+        Espera un frame más nuevo que el último entregado
+
+        Returns:
+            tuple: (ret, frame) como cv2.VideoCapture.read(); ret es False si la
+                cámara dejó de entregar frames o no llegó ninguno en timeout segundos
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._frame_id != self._delivered_id or not self._running,
+                                     timeout)
+            if self._frame_id == self._delivered_id:
+                return False, None
+            self._delivered_id = self._frame_id
+            self.timestamp = self._frame_time
+            return True, self._frame
+
+    @property
+    def alive(self):
+        """False cuando la cámara dejó de entregar frames (o se liberó)"""
+        return self._running
+
+    @property
+    def has_new_frame(self):
+        """True si hay un frame que read() entregaría sin esperar"""
+        return self._frame_id != self._delivered_id
+
+    @property
+    def frame_age(self):
+        """Segundos desde que se capturó el último frame entregado"""
+        return time.time() - self.timestamp if self.timestamp is not None else 0.0
+
+    def status(self):
+        """Texto corto para mostrar en la ventana"""
+        return f"Retraso: {self.frame_age * 1000:.0f} ms | Descartados: {self.frames_dropped}"
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def release(self):
+        """Detiene el hilo y libera la cámara"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        self.cap.release()
+        if self.frames_captured:
+            logger.info(f"📷 Cámara: {self.frames_captured} frames capturados, "
+                        f"{self.frames_dropped} descartados por estar desactualizados")
+
+
+def parse_camera_source(source):
+    """Convierte '0', '1'... en índice de cámara; URLs y rutas quedan como texto"""
+    if isinstance(source, str) and source.strip().isdigit():
+        return int(source)
+    return source.strip() if isinstance(source, str) else source
+
+
+def camera_candidates(max_index=10):
+    """Índices de cámara a probar: en Linux los /dev/video* existentes; si no, de 0 a max_index - 1"""
+    if sys.platform.startswith('linux'):
+        indices = []
+        for path in glob.glob('/dev/video*'):
+            match = re.fullmatch(r'/dev/video(\d+)', path)
+            if match:
+                indices.append(int(match.group(1)))
+        return sorted(indices)
+    return list(range(max_index))
+
+
+def _probe_camera(index):
+    """Abre la cámara y lee un frame; devuelve el cv2.VideoCapture abierto o None"""
+    cap = cv2.VideoCapture(index)
+    try:
+        if cap.isOpened():
+            ret, frame = cap.read()
+            if ret and frame is not None:
+                logger.info(f"✅ Cámara {index} encontrada: {frame.shape[1]}x{frame.shape[0]}")
+                return cap
+    except Exception as e:
+        logger.debug(f"Cámara {index} no disponible: {e}")
+    cap.release()
+    return None
+
+
+def _release_probe(future):
+    """Libera una cámara probada que no se va a usar"""
+    cap = future.result()
+    if cap is not None:
+        cap.release()
+
+
+def load_camera_cache(cache_path=DEFAULT_CAMERA_CACHE):
+    """Datos guardados de la última cámara que funcionó ({} si no hay)"""
+    if not cache_path:
+        return {}
+    try:
+        with open(cache_path, encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_camera_cache(data, cache_path=DEFAULT_CAMERA_CACHE):
+    """Guarda los datos de la cámara de forma atómica (errores de escritura se ignoran)"""
+    if not cache_path:
+        return
+    try:
+        temp_path = cache_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        logger.debug(f"No se pudo guardar la cámara en {cache_path}: {e}")
+
+
+def find_cameras(max_index=10, first_only=False, cache_path=DEFAULT_CAMERA_CACHE):
+    """
+    Busca cámaras locales que entregan frames, probando todos los dispositivos a la vez
+
+    Args:
+        max_index (int): Índices a probar cuando no hay /dev/video* (Windows, macOS)
+        first_only (bool): Quedarse solo con la primera (índice más bajo) que funcione;
+            se prueba antes la última cámara guardada en cache_path
+        cache_path (str): Archivo con la última cámara que funcionó ('' = no usarlo)
+
+    Returns:
+        list: (índice, cv2.VideoCapture abierto) por cámara, ordenados por índice.
+            Los VideoCapture se pasan a open_camera(index, cap=cap) o se liberan
+    """
+    start = time.time()
+    cache = load_camera_cache(cache_path)
+    cached_index = cache.get('index')
+    if first_only and isinstance(cached_index, int):
+        cap = _probe_camera(cached_index)
+        if cap is not None:
+            logger.info(f"📷 Cámara {cached_index} (última usada) lista en {time.time() - start:.2f}s")
+            return [(cached_index, cap)]
+
+    candidates = camera_candidates(max_index)
+    found = []
+    if candidates:
+        executor = ThreadPoolExecutor(max_workers=len(candidates), thread_name_prefix='camera-probe')
+        futures = [(index, executor.submit(_probe_camera, index)) for index in candidates]
+        for index, future in futures:
+            if first_only and found:
+                # Ya hay cámara: las demás se liberan cuando terminen de probarse
+                future.add_done_callback(_release_probe)
+                continue
+            cap = future.result()
+            if cap is not None:
+                found.append((index, cap))
+        executor.shutdown(wait=False)
+
+    logger.info(f"📷 {len(found)} cámara(s) encontrada(s) entre {len(candidates)} dispositivo(s) "
+                f"en {time.time() - start:.2f}s")
+    if found and found[0][0] != cached_index:
+        save_camera_cache(dict(cache, index=found[0][0]), cache_path)
+    return found
+
+
+def find_camera(max_index=10, cache_path=DEFAULT_CAMERA_CACHE):
+    """
+    Primera cámara disponible (la última usada si sigue respondiendo)
+
+    Returns:
+        tuple: (índice, cv2.VideoCapture abierto) o (None, None) si no hay cámaras
+    """
+    found = find_cameras(max_index, first_only=True, cache_path=cache_path)
+    return found[0] if found else (None, None)
+
+
+def configure_camera_mode(cap, camera_index, width=640, height=480, fps=30,
+                          probe=DEFAULT_CAMERA_PROBE, cache_path=DEFAULT_CAMERA_CACHE):
+    """
+    Deja la cámara en el modo más barato que entrega width x height a fps
+
+    Usa el modo guardado para camera_index o, si no hay (o probe='force'),
+    lo negocia con utils.camera_modes.negotiate_mode y lo guarda.
+
+    Returns:
+        dict: Modo aplicado (None si no se negoció)
+    """
+    if probe == '0':
+        return None
+    cache = load_camera_cache(cache_path)
+    requested = {'width': width, 'height': height, 'fps': fps}
+    saved = cache.get('modes', {}).get(str(camera_index))
+    if probe != 'force' and saved and saved.get('requested') == requested:
+        apply_mode(cap, saved['mode'])
+        logger.info(f"📷 Modo de cámara guardado: {describe_mode(saved['mode'])}")
+        return saved['mode']
+
+    logger.info(f"🔎 Probando formatos de la cámara {camera_index}...")
+    mode = negotiate_mode(cap, width, height, fps)
+    if mode is not None:
+        modes = dict(cache.get('modes', {}))
+        modes[str(camera_index)] = {'requested': requested, 'mode': mode}
+        save_camera_cache(dict(cache, modes=modes), cache_path)
+    return mode
+
+
+def open_camera(camera_index, width=640, height=480, fps=30, frame_event=None, cap=None):
+    """
+    Abre una cámara con la resolución pedida y la lectura del último frame en segundo plano
+
+    Args:
+        camera_index: Índice de cámara, URL de stream o ruta de un archivo de video
+            (el archivo se reproduce a su FPS, como una cámara en vivo)
+        frame_event (threading.Event): Ver LatestFrameCamera
+        cap (cv2.VideoCapture): Cámara ya abierta por find_camera()/find_cameras()
+
+    Returns:
+        LatestFrameCamera: Cámara lista para read() (comprobar isOpened())
+    """
+    camera_index = parse_camera_source(camera_index)
+    if cap is None:
+        cap = cv2.VideoCapture(camera_index)
+    if isinstance(camera_index, str) and os.path.isfile(camera_index):
+        file_fps = cap.get(cv2.CAP_PROP_FPS)
+        return LatestFrameCamera(cap, frame_event, pace_fps=file_fps if file_fps > 0 else fps)
+    if not isinstance(camera_index, int) or not cap.isOpened() or \
+            configure_camera_mode(cap, camera_index, width, height, fps) is None:
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        cap.set(cv2.CAP_PROP_FPS, fps)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Menos frames viejos en el driver (si el backend lo admite)
+    return LatestFrameCamera(cap, frame_event)
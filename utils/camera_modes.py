@@ -0,0 +1,138 @@
+"""
+Negociación del formato de la cámara
+
+Pedir 640x480 a 30 FPS no garantiza recibirlo: muchos drivers caen a YUYV sin
+comprimir (que por USB no da más de 10-15 FPS) o a otra resolución. Aquí se
+prueban los formatos candidatos (FOURCC, resolución y FPS), se mide lo que la
+cámara entrega de verdad (FPS reales y CPU por frame) y se elige el modo más
+barato que cumple lo que necesita el análisis.
+"""
+
+import time
+import logging
+import cv2
+
+logger = logging.getLogger(__name__)
+
+CAMERA_FOURCCS = ('MJPG', 'YUYV')
+
+
+def fourcc_to_str(value):
+    """Código FOURCC de cv2 (CAP_PROP_FOURCC) como texto, p. ej. 'MJPG'"""
+    value = int(value)
+    return ''.join(chr((value >> (8 * i)) & 0xFF) for i in range(4)).strip('\x00 ') or '?'
+
+
+def describe_mode(mode):
+    """Texto corto del modo para los logs"""
+    text = f"{mode['fourcc']} {mode['width']}x{mode['height']} @ {mode['fps']:g} FPS"
+    if 'measured_fps' in mode:
+        text += f" (medido {mode['measured_fps']:.1f} FPS, {mode['cpu_ms']:.1f} ms CPU/frame)"
+    return text
+
+
+def apply_mode(cap, mode):
+    """
+    Configura la cámara con un modo (FOURCC, resolución y FPS)
+
+    Returns:
+        dict: Modo que el driver aceptó realmente (puede diferir del pedido)
+    """
+    cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*mode['fourcc']))
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, mode['width'])
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, mode['height'])
+    cap.set(cv2.CAP_PROP_FPS, mode['fps'])
+    return {
+        'fourcc': fourcc_to_str(cap.get(cv2.CAP_PROP_FOURCC)),
+        'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        'fps': cap.get(cv2.CAP_PROP_FPS) or mode['fps']
+    }
+
+
+def measure_mode(cap, frames=20, warmup=3):
+    """
+    Mide los FPS que entrega la cámara y el CPU que cuesta cada frame
+
+    Se mide el CPU del hilo que llama (time.thread_time): incluye la
+    decodificación (MJPG) y la conversión a BGR que hace OpenCV en read(),
+    pero no los hilos de otras cámaras ya abiertas ni los del bot.
+
+    Returns:
+        tuple: (fps medidos, ms de CPU por frame, (alto, ancho) del frame), o None si falla la lectura
+    """
+    for _ in range(warmup):  # El primer frame tras cambiar de modo suele tardar más
+        ret, frame = cap.read()
+        if not ret or frame is None:
+            return None
+    start, cpu_start = time.perf_counter(), time.thread_time()
+    for _ in range(frames):
+        ret, frame = cap.read()
+        if not ret or frame is None:
+            return None
+    elapsed = time.perf_counter() - start
+    cpu = time.thread_time() - cpu_start
+    return round(frames / max(elapsed, 1e-6), 1), round(cpu * 1000 / frames, 2), frame.shape[:2]
+
+
+def candidate_modes(width, height, fps):
+    """Modos a probar: la resolución pedida y 1280x720, en cada FOURCC"""
+    resolutions = [(width, height)]
+    if width * height < 1280 * 720:
+        resolutions.append((1280, 720))
+    return [{'fourcc': fourcc, 'width': w, 'height': h, 'fps': fps}
+            for fourcc in CAMERA_FOURCCS for w, h in resolutions]
+
+
+def negotiate_mode(cap, width=640, height=480, fps=30, min_fps=None, frames=20):
+    """
+    Prueba los modos candidatos y deja la cámara en el más barato que cumple
+
+    Cumple el modo que entrega al menos width x height a min_fps reales; de
+    esos se elige el de menos CPU por frame (y a igual costo, el más chico).
+    Si ninguno cumple se queda el de más FPS reales.
+
+    Args:
+        cap: cv2.VideoCapture de cámara abierto
+        width, height (int): Resolución mínima que necesita el análisis
+        fps (int): FPS que se piden al driver
+        min_fps (float): FPS reales mínimos (por defecto 80% de fps)
+        frames (int): Frames que se miden por modo
+
+    Returns:
+        dict: Modo elegido (fourcc, width, height, fps, measured_fps, cpu_ms) o None
+            si no se pudo medir ninguno
+    """
+    min_fps = min_fps or fps * 0.8
+    measured = []
+    seen = set()
+    start = time.time()
+    for candidate in candidate_modes(width, height, fps):
+        try:
+            mode = apply_mode(cap, candidate)
+            key = (mode['fourcc'], mode['width'], mode['height'], round(mode['fps']))
+            if key in seen:
+                continue  # El driver cayó en un modo ya medido
+            seen.add(key)
+            result = measure_mode(cap, frames)
+        except Exception as e:
+            logger.debug(f"Modo {describe_mode(candidate)} no disponible: {e}")
+            continue
+        if result is None:
+            continue
+        mode['measured_fps'], mode['cpu_ms'], (mode['height'], mode['width']) = result
+        logger.info(f"   Modo {describe_mode(mode)}")
+        measured.append(mode)
+
+    if not measured:
+        return None
+    suitable = [m for m in measured
+                if m['measured_fps'] >= min_fps and m['width'] >= width and m['height'] >= height]
+    if suitable:
+        best = min(suitable, key=lambda m: (m['cpu_ms'], m['width'] * m['height']))
+    else:
+        best = max(measured, key=lambda m: m['measured_fps'])
+        logger.warning(f"⚠️ Ningún modo de la cámara entrega {width}x{height} a {min_fps:.0f} FPS")
+    apply_mode(cap, best)
+    logger.info(f"📷 Modo de cámara elegido en {time.time() - start:.1f}s: {describe_mode(best)}")
+    return best
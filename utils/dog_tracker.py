@@ -0,0 +1,154 @@
+"""
+Seguimiento de perros entre frames
+
+Asocia las detecciones de YOLO con los perros ya vistos por IoU y mantiene
+un filtro de Kalman de velocidad constante por perro. Así cada perro conserva
+su ID y en los frames donde se salta YOLO se devuelve la caja predicha en
+lugar de la última detección congelada.
+"""
+
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """
+    IoU entre dos conjuntos de cajas x1, y1, x2, y2
+
+    Returns:
+        np.ndarray: Matriz (len(boxes_a), len(boxes_b))
+    """
+    a = boxes_a[:, np.newaxis, :]
+    b = boxes_b[np.newaxis, :, :]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    intersection = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return intersection / (area_a + area_b - intersection + 1e-9)
+
+
+class _KalmanTrack:
+    """
+    Un perro seguido: estado (cx, cy, w, h, vx, vy, vw, vh) con velocidad constante
+    """
+
+    # Modelo de movimiento y de medida (la medida es la caja sin velocidades)
+    F = np.eye(8) + np.eye(8, k=4)
+    H = np.eye(4, 8)
+    Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.5, 0.5, 0.1, 0.1])
+    R = np.diag([4.0, 4.0, 10.0, 10.0])
+
+    def __init__(self, track_id, xyxy, score):
+        self.track_id = track_id
+        self.score = float(score)
+        self.x = np.zeros(8)
+        self.x[:4] = self._to_cxcywh(xyxy)
+        self.P = np.diag([10.0, 10.0, 10.0, 10.0, 1000.0, 1000.0, 1000.0, 1000.0])
+        self.hits = 1
+        self.missed = 0  # Detecciones consecutivas sin asociar
+
+    @staticmethod
+    def _to_cxcywh(xyxy):
+        x1, y1, x2, y2 = xyxy
+        return np.array([(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1])
+
+    @property
+    def xyxy(self):
+        cx, cy = self.x[0], self.x[1]
+        w, h = max(self.x[2], 1.0), max(self.x[3], 1.0)
+        return np.array([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2])
+
+    def predict(self):
+        self.x = self.F @ self.x
+        self.P = self.F @ self.P @ self.F.T + self.Q
+
+    def update(self, xyxy, score):
+        residual = self._to_cxcywh(xyxy) - self.H @ self.x
+        S = self.H @ self.P @ self.H.T + self.R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ residual
+        self.P = (np.eye(8) - K @ self.H) @ self.P
+        self.score = float(score)
+        self.hits += 1
+        self.missed = 0
+
+
+class DogTracker:
+    """
+    Tracker IoU + Kalman de velocidad constante
+
+    Se llama a step() una vez por frame: con las detecciones de YOLO cuando
+    se ejecutó, o sin ellas en los frames saltados para avanzar las predicciones.
+
+    Args:
+        iou_threshold (float): IoU mínimo para asociar una detección a un perro seguido
+        max_missed (int): Detecciones sin asociar antes de olvidar un perro
+    """
+
+    def __init__(self, iou_threshold=0.3, max_missed=3):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.tracks = []
+        self._next_id = 1
+
+    def motion(self):
+        """Mayor desplazamiento por frame de los perros visibles, relativo al tamaño de su caja"""
+        speeds = [np.hypot(t.x[4], t.x[5]) / max(t.x[2], t.x[3], 1.0) for t in self.tracks if t.missed == 0]
+        return float(max(speeds)) if speeds else 0.0
+
+    def reset(self):
+        """Olvida todos los perros (p. ej. al cambiar de video)"""
+        self.tracks = []
+        self._next_id = 1
+
+    def step(self, xyxy=None, scores=None):
+        """
+        Avanza un frame y, si hay detecciones, las asocia
+
+        Args:
+            xyxy (np.ndarray): Cajas (N, 4) detectadas en este frame, o None si se saltó YOLO
+            scores (np.ndarray): Confianzas (N,)
+
+        Returns:
+            tuple: (cajas (M, 4), confianzas (M,), ids (M,)) de los perros visibles.
+                En frames con detección son las cajas detectadas; en los saltados, las predichas.
+        """
+        for track in self.tracks:
+            track.predict()
+
+        if xyxy is None:
+            visible = [t for t in self.tracks if t.missed == 0]
+            return (np.array([t.xyxy for t in visible], dtype=np.float32).reshape(-1, 4),
+                    np.array([t.score for t in visible], dtype=np.float32),
+                    np.array([t.track_id for t in visible], dtype=np.int32))
+
+        ids = np.zeros(len(xyxy), dtype=np.int32)
+        unmatched_tracks = set(range(len(self.tracks)))
+        if len(self.tracks) and len(xyxy):
+            predicted = np.array([t.xyxy for t in self.tracks])
+            iou = iou_matrix(predicted, np.asarray(xyxy, dtype=np.float64))
+            # Asociación voraz por IoU descendente (pocos perros por frame)
+            for flat in np.argsort(iou, axis=None)[::-1]:
+                t, d = np.unravel_index(flat, iou.shape)
+                if iou[t, d] < self.iou_threshold:
+                    break
+                if t in unmatched_tracks and ids[d] == 0:
+                    self.tracks[t].update(xyxy[d], scores[d])
+                    ids[d] = self.tracks[t].track_id
+                    unmatched_tracks.discard(t)
+
+        for t in unmatched_tracks:
+            self.tracks[t].missed += 1
+        self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+
+        for d in np.flatnonzero(ids == 0):
+            track = _KalmanTrack(self._next_id, xyxy[d], scores[d])
+            self.tracks.append(track)
+            ids[d] = track.track_id
+            self._next_id += 1
+            logger.debug(f"🐕 Nuevo perro en seguimiento: #{track.track_id}")
+
+        return np.asarray(xyxy, dtype=np.float32).reshape(-1, 4), np.asarray(scores, dtype=np.float32), ids
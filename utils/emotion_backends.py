@@ -0,0 +1,148 @@
+"""
+Backends de inferencia para el modelo de emociones
+
+Cada backend expone predict_on_batch(batch) con la misma firma que un modelo
+de Keras: recibe un lote float32 (N, 224, 224, 3) normalizado a [0, 1] y
+devuelve las probabilidades (N, 4). Así EmotionDetector no necesita saber
+qué motor ejecuta el modelo.
+
+Solo el backend 'keras' importa TensorFlow; 'onnx' (onnxruntime), 'opencv'
+(cv2.dnn) y 'tflite' con tflite_runtime permiten ejecutar el modelo
+exportado sin cargar TensorFlow en el proceso.
+"""
+
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _load_tflite_interpreter(model_path, num_threads=None):
+    """Crea un intérprete TFLite usando tflite_runtime si está instalado"""
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter(model_path=model_path, num_threads=num_threads)
+
+
+class TFLiteModel:
+    """
+    Modelo TFLite (float32, float16 o int8 completo)
+
+    Para modelos int8 cuantiza la entrada y decuantiza la salida con los
+    parámetros guardados en el propio archivo.
+    """
+
+    def __init__(self, model_path, num_threads=None):
+        self.interpreter = _load_tflite_interpreter(model_path, num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input['shape'][0])
+        logger.info(f"✅ Modelo TFLite cargado ({np.dtype(self._input['dtype']).name}): {model_path}")
+
+    def _resize_batch(self, size):
+        """Ajusta el tamaño de lote del intérprete solo cuando cambia"""
+        if size != self._batch_size:
+            self.interpreter.resize_tensor_input(self._input['index'], [size, 224, 224, 3])
+            self.interpreter.allocate_tensors()
+            self._input = self.interpreter.get_input_details()[0]
+            self._output = self.interpreter.get_output_details()[0]
+            self._batch_size = size
+
+    def predict_on_batch(self, batch):
+        self._resize_batch(len(batch))
+
+        input_dtype = self._input['dtype']
+        if input_dtype != np.float32:
+            scale, zero_point = self._input['quantization']
+            info = np.iinfo(input_dtype)
+            batch = np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(input_dtype)
+
+        self.interpreter.set_tensor(self._input['index'], batch)
+        self.interpreter.invoke()
+        preds = self.interpreter.get_tensor(self._output['index'])
+
+        if self._output['dtype'] != np.float32:
+            scale, zero_point = self._output['quantization']
+            preds = (preds.astype(np.float32) - zero_point) * scale
+        return preds
+
+
+class OnnxModel:
+    """Modelo ONNX ejecutado con onnxruntime en CPU"""
+
+    def __init__(self, model_path, num_threads=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, sess_options=options,
+                                            providers=['CPUExecutionProvider'])
+        self._input_name = self.session.get_inputs()[0].name
+        logger.info(f"✅ Modelo ONNX cargado (onnxruntime): {model_path}")
+
+    def predict_on_batch(self, batch):
+        return self.session.run(None, {self._input_name: batch})[0]
+
+
+class OpenCVDnnModel:
+    """Modelo ONNX ejecutado con cv2.dnn (no necesita dependencias extra)"""
+
+    def __init__(self, model_path):
+        import cv2
+
+        self.net = cv2.dnn.readNetFromONNX(model_path)
+        logger.info(f"✅ Modelo ONNX cargado (cv2.dnn): {model_path}")
+
+    def predict_on_batch(self, batch):
+        # El modelo exportado espera NHWC igual que Keras
+        self.net.setInput(np.ascontiguousarray(batch))
+        return self.net.forward()
+
+
+BACKENDS = ('keras', 'tflite', 'onnx', 'opencv')
+
+
+def default_backend(model_path):
+    """Backend según la extensión del archivo de modelo"""
+    extension = model_path.lower().rsplit('.', 1)[-1]
+    if extension == 'tflite':
+        return 'tflite'
+    if extension == 'onnx':
+        try:
+            import onnxruntime  # noqa: F401
+            return 'onnx'
+        except ImportError:
+            return 'opencv'
+    return 'keras'
+
+
+def load_emotion_model(model_path, backend=None):
+    """
+    Carga el modelo de emociones con el backend indicado
+
+    Args:
+        model_path (str): Ruta del modelo (.h5, .keras, .tflite u .onnx)
+        backend (str): 'keras', 'tflite', 'onnx', 'opencv' o None para elegir por extensión
+
+    Returns:
+        Objeto con predict_on_batch(batch)
+    """
+    backend = backend or default_backend(model_path)
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de emociones no soportado: {backend} (opciones: {', '.join(BACKENDS)})")
+
+    if backend == 'tflite':
+        return TFLiteModel(model_path)
+    if backend == 'onnx':
+        return OnnxModel(model_path)
+    if backend == 'opencv':
+        return OpenCVDnnModel(model_path)
+
+    # Único camino que importa TensorFlow
+    from tensorflow.keras.models import load_model
+    return load_model(model_path)
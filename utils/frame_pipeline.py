@@ -0,0 +1,555 @@
+"""
+Motor común de procesamiento frame a frame
+
+Todos los modos (cámara, archivo de video, stream, bot de Telegram) hacen lo
+mismo: leer un frame, detectar perros, clasificar sus emociones y entregar el
+resultado a una o más salidas. Aquí ese bucle está una sola vez:
+
+- Fuentes: VideoFileSource (archivo o stream grabado) y CameraSource (cámara
+  o stream en vivo a través de utils.camera) entregan los frames.
+- FramePipeline decide qué frames se analizan (muestreo, compuerta de
+  movimiento, espera entre clasificaciones) y clasifica por lotes.
+- Sinks: callables que reciben cada frame ya clasificado, en orden
+  (WindowSink, VideoWriterSink, TimelineSink, CameraMonitorSink o cualquier
+  función). Si tienen close() el motor lo llama al terminar.
+
+Así cualquier optimización del análisis se aplica a todos los modos a la vez.
+"""
+
+import os
+import time
+import logging
+import cv2
+
+from .cam_utils import CAMERA_EMOTION_COLORS, best_dog_emotion, draw_dog_emotions
+from .video_io import ThreadedFrameReader, ThreadedFrameWriter
+
+logger = logging.getLogger(__name__)
+
+
+class StopPipeline(Exception):
+    """Un sink pide terminar el procesamiento (p. ej. se pulsó Q en la ventana)"""
+
+
+class VideoFileSource:
+    """
+    Frames de un video ya abierto, en orden
+
+    Cada frame entregado es un dict con 'frame', 'index' (desde 1), 'weight'
+    (frames del video que representa) y 'timestamp' (None: el tiempo lo da el índice).
+
+    Args:
+        cap: cv2.VideoCapture (o lector compatible) ya posicionado en start_frame
+        start_frame (int): Primer frame del tramo
+        end_frame (int): Fin del tramo (exclusivo; None = hasta el final)
+        step (int): Con step > 1 solo se decodifica uno de cada step frames
+            (los demás se saltan con grab() y se suman a 'weight')
+        threaded (bool): Decodificar en un hilo propio (ThreadedFrameReader)
+        total_frames (int): Frames del video, para mostrar el progreso cada 5 segundos
+    """
+
+    def __init__(self, cap, start_frame=0, end_frame=None, step=1, threaded=True, total_frames=None):
+        self.cap = cap
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.step = max(1, int(step))
+        self.total_frames = total_frames
+        self.frame_count = 0  # Frames del video cubiertos (incluye los saltados)
+        self.reader = ThreadedFrameReader(cap, step=self.step) if threaded else None
+
+    def _read(self):
+        if self.reader is not None:
+            ret, frame = self.reader.read()
+            return ret, frame, self.reader.last_span
+        ret, frame = self.cap.read()
+        span = 1
+        while ret and span < self.step and self.cap.grab():
+            span += 1
+        return ret, frame, span
+
+    def __iter__(self):
+        start_time = last_progress_time = time.time()
+        end_frame = self.end_frame if self.end_frame is not None else self.total_frames
+        frames_to_process = (end_frame or 0) - self.start_frame
+        while True:
+            if self.end_frame is not None and self.start_frame + self.frame_count >= self.end_frame:
+                break
+            ret, frame, span = self._read()
+            if not ret:
+                break
+            if self.end_frame is not None:
+                span = min(span, self.end_frame - self.start_frame - self.frame_count)
+            index = self.start_frame + self.frame_count + 1
+            self.frame_count += span
+
+            # Mostrar progreso cada 5 segundos
+            current_time = time.time()
+            if frames_to_process > 0 and current_time - last_progress_time >= 5.0:
+                elapsed = current_time - start_time
+                remaining = elapsed * frames_to_process / self.frame_count - elapsed
+                logger.info(f"📈 Progreso: {self.frame_count / frames_to_process * 100:.1f}% | "
+                            f"Frame {self.start_frame + self.frame_count}/{self.total_frames} | "
+                            f"Tiempo restante: {remaining:.0f}s")
+                last_progress_time = current_time
+
+            yield {'frame': frame, 'index': index, 'weight': span, 'timestamp': None}
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.close()
+        else:
+            self.cap.release()
+
+
+class CameraSource:
+    """
+    Frames en vivo de una utils.camera.LatestFrameCamera (cámara local o URL de stream)
+
+    Cada frame lleva como 'timestamp' el instante en que se capturó.
+    """
+
+    def __init__(self, camera):
+        self.camera = camera
+        self.frame_count = 0
+
+    def __iter__(self):
+        while True:
+            ret, frame = self.camera.read()
+            if not ret:
+                logger.error("Error capturando frame")
+                break
+            self.frame_count += 1
+            yield {'frame': frame, 'index': self.frame_count, 'weight': 1,
+                   'timestamp': self.camera.timestamp}
+
+    def close(self):
+        self.camera.release()
+
+
+class FramePipeline:
+    """
+    Detecta perros, clasifica sus emociones por lotes y entrega los frames a los sinks
+
+    Cada frame se convierte en un dict con 'frame' (lo que se anota), 'original',
+    'index', 'weight', 'timestamp', 'detections' y 'dog_emotions' (lo que hay
+    que mostrar para ese frame). Los frames que reutilizan el análisis de uno
+    anterior llevan 'source' con ese frame ('static' si fue por la compuerta de
+    movimiento); los recién clasificados llevan 'classify'.
+
+    Args:
+        yolo_detector (YoloDogDetector): Detector de perros
+        emotion_detector (EmotionDetector): Clasificador de emociones
+        sinks (list): Callables que reciben cada frame clasificado, en orden
+        batch_size (int): Frames con perros que se clasifican juntos (1 = frame a frame)
+        sample_step (int): Solo se analiza uno de cada sample_step frames; los
+            demás reutilizan el último análisis
+        motion_gate (MotionGate): Con la escena quieta se reutiliza el último análisis
+        emotion_cooldown (float): Segundos mínimos entre clasificaciones (según
+            'timestamp'; los frames intermedios se detectan pero no se clasifican)
+    """
+
+    def __init__(self, yolo_detector, emotion_detector, sinks=(), batch_size=1, sample_step=1,
+                 motion_gate=None, emotion_cooldown=0.0):
+        self.yolo_detector = yolo_detector
+        self.emotion_detector = emotion_detector
+        self.sinks = list(sinks)
+        self.batch_size = max(1, batch_size)
+        self.sample_step = max(1, sample_step)
+        self.motion_gate = motion_gate
+        self.emotion_cooldown = emotion_cooldown
+        self.frames_analyzed = 0
+
+        self._pending = []
+        self._first_index = None
+        self._last_analyzed = None
+        self._last_classified = None
+        self._last_emotions = []
+
+    def push(self, frame, index=None, weight=1, timestamp=None):
+        """Agrega el siguiente frame; se entrega a los sinks cuando se vacía el lote"""
+        item = self.prepare(frame, index, weight, timestamp)
+        if 'detections' not in item:
+            # Con muestreo cada frame analizado debe pasar por YOLO
+            self.set_detections(item, self.yolo_detector.detect_dogs(frame, force=self.detect_force))
+        self._pending.append(item)
+
+        # Vaciar cuando el lote está lleno, cuando no hay nada que clasificar
+        # o cuando se acumularon demasiados frames sin perros detrás del lote
+        to_classify = sum(1 for pending in self._pending if pending.get('classify'))
+        if to_classify >= self.batch_size or to_classify == 0 or len(self._pending) >= 4 * self.batch_size:
+            self.flush()
+
+    @property
+    def detect_force(self):
+        """Con muestreo cada frame analizado debe ejecutar YOLO (sin saltos del detector)"""
+        return self.sample_step > 1
+
+    def prepare(self, frame, index=None, weight=1, timestamp=None):
+        """
+        Crea el item del frame y decide si reutiliza el último análisis
+
+        Returns:
+            dict: Item sin 'detections' si hay que detectar perros en él
+                (ver set_detections); con 'detections' y 'source' si no
+        """
+        if self._first_index is None:
+            self._first_index = index
+        item = {'index': index, 'frame': frame, 'original': frame, 'weight': weight, 'timestamp': timestamp}
+
+        last = self._last_analyzed
+        if last is not None:
+            static = False
+            if self.sample_step > 1 and (index - self._first_index) % self.sample_step:
+                pass  # Frame entre muestras
+            elif self.motion_gate is not None and not self.motion_gate.check(frame, timestamp):
+                static = True
+                # El bucle sigue a su ritmo aunque se salte YOLO: sin contar estos frames el
+                # control de ritmo vería toda la escena quieta como un solo frame lentísimo
+                controller = getattr(self.yolo_detector, 'rate_controller', None)
+                if controller is not None:
+                    controller.record_frame()
+            else:
+                return item
+            item['detections'] = last['detections']
+            item['source'] = last
+            item['static'] = static
+        return item
+
+    def set_detections(self, item, detections):
+        """Registra los perros detectados en un item de prepare() y decide si se clasifica"""
+        item['detections'] = detections
+        self._last_analyzed = item
+        self.frames_analyzed += 1
+        if detections and self._cooldown_over(item['timestamp']):
+            item['classify'] = True
+
+    def _cooldown_over(self, timestamp):
+        if not self.emotion_cooldown or timestamp is None or self._last_classified is None:
+            return True
+        return timestamp - self._last_classified >= self.emotion_cooldown
+
+    def flush(self):
+        """Clasifica en lote los perros pendientes y entrega los frames en orden"""
+        classify_items(self.emotion_detector, self._pending)
+        pending, self._pending = self._pending, []
+        self.deliver(pending)
+
+    def deliver(self, items):
+        """Entrega a los sinks, en orden, items ya pasados por classify_items()"""
+        for item in items:
+            if item.get('classify'):
+                if item['dog_emotions']:
+                    self._last_emotions = item['dog_emotions']
+                    if item['timestamp'] is not None:
+                        self._last_classified = item['timestamp']
+            elif 'source' in item:
+                # Frame no analizado: se muestra con las últimas emociones
+                item['dog_emotions'] = self._last_emotions
+            else:
+                item['dog_emotions'] = []
+                if not item['detections']:
+                    self._last_emotions = []
+            for sink in self.sinks:
+                sink(item)
+
+    def run(self, source, should_stop=None):
+        """
+        Procesa la fuente completa (o hasta que un sink lance StopPipeline)
+
+        Args:
+            source: Iterable de dicts con 'frame', 'index', 'weight' y 'timestamp'
+            should_stop (callable): Se consulta tras cada frame; True termina el bucle
+        """
+        try:
+            for packet in source:
+                self.push(**packet)
+                if should_stop is not None and should_stop():
+                    break
+            self.flush()
+        except StopPipeline:
+            self._pending = []
+
+    def close(self):
+        """
+        Cierra los sinks que lo necesiten (escritores, archivos, ventanas)
+
+        Se cierran todos aunque alguno falle; después se relanza el primer error
+        (p. ej. el de VideoWriterSink si el video de salida quedó incompleto).
+        """
+        error = None
+        for sink in self.sinks:
+            close = getattr(sink, 'close', None)
+            if close is not None:
+                try:
+                    close()
+                except Exception as e:
+                    error = error or e
+        if error is not None:
+            raise error
+
+
+def classify_items(emotion_detector, items):
+    """
+    Clasifica en una sola inferencia los perros de todos los items marcados con 'classify'
+
+    Los items pueden venir de distintas fuentes (ver utils.multi_camera).
+    """
+    batch = [item for item in items if item.get('classify')]
+    if not batch:
+        return
+    try:
+        # Un recorte por perro; todos los perros del lote van en una sola inferencia
+        results = emotion_detector.predict_dog_emotions_frames(
+            [item['original'] for item in batch],
+            [item['detections'] for item in batch]
+        )
+    except Exception as e:
+        logger.error(f"Error en análisis de emoción: {e}")
+        results = [[] for _ in batch]
+    for item, dog_emotions in zip(batch, results):
+        item['dog_emotions'] = dog_emotions
+
+
+class WindowSink:
+    """
+    Muestra cada frame en una ventana de OpenCV
+
+    Q o ESC terminan el procesamiento. Con pausable, ESPACIO pausa (la
+    ventana sigue respondiendo); con capture_prefix, S guarda el frame.
+
+    Args:
+        title (str): Título de la ventana
+        wait_ms (int): Espera de cv2.waitKey por frame
+        pausable (bool): Permitir pausar con ESPACIO
+        capture_prefix (str): Prefijo de las capturas con S (None = sin capturas)
+        key_handlers (dict): {código de tecla: función(item)} con prioridad sobre las anteriores
+    """
+
+    def __init__(self, title, wait_ms=1, pausable=False, capture_prefix=None, key_handlers=None):
+        self.title = title
+        self.wait_ms = wait_ms
+        self.pausable = pausable
+        self.capture_prefix = capture_prefix
+        self.key_handlers = key_handlers or {}
+        self.paused = False
+
+    def __call__(self, item):
+        cv2.imshow(self.title, item['frame'])
+        self._handle_key(cv2.waitKey(self.wait_ms) & 0xFF, item)
+        while self.paused:
+            self._handle_key(cv2.waitKey(100) & 0xFF, item)
+
+    def _handle_key(self, key, item):
+        if key in self.key_handlers:
+            self.key_handlers[key](item)
+        elif key == ord('q') or key == 27:  # Q o ESC
+            self.paused = False
+            logger.info("👋 Procesamiento terminado por el usuario")
+            raise StopPipeline()
+        elif key == ord(' ') and self.pausable:
+            self.paused = not self.paused
+            logger.info(f"⏸️ {'Pausado' if self.paused else '▶️ Reanudado'}")
+        elif key == ord('s') and self.capture_prefix:
+            capture_name = f"{self.capture_prefix}_{item['index']:06d}.jpg"
+            cv2.imwrite(capture_name, item['frame'])
+            logger.info(f"📸 Frame guardado: {capture_name}")
+
+    def close(self):
+        cv2.destroyAllWindows()
+
+
+class VideoWriterSink:
+    """
+    Escribe los frames en un video (ver video_io.open_video_writer)
+
+    Args:
+        out: Escritor abierto (se libera en close())
+        annotate (callable): Anota el frame antes de escribirlo; None si otro sink ya lo hizo
+        threaded (bool): Anotar y codificar en un hilo propio (ThreadedFrameWriter)
+        selector (HighlightSelector): Escribir solo los frames que elija (video resumen)
+    """
+
+    def __init__(self, out, annotate=None, threaded=True, selector=None):
+        self.out = out
+        self.annotate = annotate
+        self.selector = selector
+        self.frames_written = 0
+        self._writer = ThreadedFrameWriter(self._write) if threaded else None
+
+    def _write(self, item):
+        if self.annotate is not None:
+            self.annotate(item)
+        self.out.write(item['frame'])
+
+    def _emit(self, items):
+        self.frames_written += len(items)
+        for item in items:
+            if self._writer is not None:
+                self._writer.submit(item)
+            else:
+                self._write(item)
+
+    def __call__(self, item):
+        self._emit([item] if self.selector is None else self.selector.push(item, bool(item['detections'])))
+
+    def close(self):
+        """
+        Escribe lo que retuvo el selector y cierra el archivo (tras vaciar la cola del hilo)
+
+        Raises:
+            Exception: Si falló la escritura (el video de salida quedó incompleto)
+        """
+        try:
+            if self.selector is not None:
+                self._emit(self.selector.flush())
+                self.selector = None
+            if self._writer is not None:
+                self._writer.close()
+        finally:
+            self.out.release()
+
+
+class TimelineSink:
+    """Registra en una TimelineWriter cada frame analizado (no los que reutilizan un análisis)"""
+
+    def __init__(self, timeline):
+        self.timeline = timeline
+
+    def __call__(self, item):
+        if 'source' not in item:
+            self.timeline.add(item['index'], item['detections'], item['dog_emotions'])
+
+    def close(self):
+        self.timeline.close()
+
+
+class CameraMonitorSink:
+    """
+    Anotación, historial y alertas de los modos de cámara en tiempo real
+
+    Dibuja las cajas y emociones, lleva el historial de las últimas
+    clasificaciones y, si las últimas 3 son negativas (sad/angry), envía una
+    alerta con la imagen anotada.
+
+    Args:
+        yolo_detector (YoloDogDetector): Detector usado para dibujar las cajas
+        labels (list): Emociones en el orden de las probabilidades del modelo
+        camera (LatestFrameCamera): Para mostrar retraso y frames descartados
+        on_emotion (callable): Se llama con la emoción de cada perro clasificado
+        send_alert (callable): send_alert(emotion, prob, image_path=...) para las alertas
+        on_update (callable): Se llama tras cada clasificación (p. ej. resúmenes periódicos)
+        controls_text (str): Ayuda de teclas que se muestra en la ventana
+        history_size (int): Clasificaciones que se conservan en el historial
+        name (str): Nombre de la cámara para los mensajes y la ventana (modo multicámara)
+    """
+
+    def __init__(self, yolo_detector, labels, camera=None, on_emotion=None, send_alert=None,
+                 on_update=None, controls_text='Q: salir', history_size=4, name=None):
+        self.yolo_detector = yolo_detector
+        self.name = name
+        self._log_prefix = f"[{name}] " if name else ""
+        self.labels = labels
+        self.camera = camera
+        self.on_emotion = on_emotion
+        self.send_alert = send_alert
+        self.on_update = on_update
+        self.controls_text = controls_text
+        self.history_size = history_size
+        self.emotion_history = []
+        self.last_analysis_time = time.time()
+
+    def __call__(self, item):
+        current_time = item['timestamp'] or time.time()
+        dog_detections = item['detections']
+        dogs_detected = self.yolo_detector.is_dog_detected(dog_detections)
+
+        # Dibujar detecciones de YOLO y la emoción de cada perro debajo de su rectángulo
+        frame = self.yolo_detector.draw_detections(item['frame'], dog_detections)
+        if item['dog_emotions']:
+            draw_dog_emotions(frame, item['dog_emotions'], colors=CAMERA_EMOTION_COLORS,
+                              text_format='EMOCION: {emotion} ({confidence:.2f})')
+
+        if item.get('classify') and item['dog_emotions']:
+            try:
+                self._record(item['dog_emotions'], frame, current_time)
+            except Exception as e:
+                logger.error(f"Error en análisis de emoción: {e}")
+
+        elif not dogs_detected:
+            # Solo mostrar mensaje de espera si no hay detecciones
+            cv2.putText(frame, 'ESPERANDO DETECCION DE PERRO...',
+                        (60, 80), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
+            # Limpiar historial si no hay perros por mucho tiempo
+            if current_time - self.last_analysis_time > 30:  # 30 segundos sin perros
+                if self.emotion_history:
+                    self.emotion_history.clear()
+                    logger.info("🧹 Historial limpiado - Sin perros detectados")
+
+        # Mostrar información de estado en el frame
+        info_y = frame.shape[0] - 100
+        if self.name:
+            cv2.putText(frame, self.name, (10, info_y - 60),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+        if self.camera is not None:
+            cv2.putText(frame, self.camera.status(), (10, info_y - 40),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
+        rate_status = self.yolo_detector.rate_status() + (' | ESCENA QUIETA' if item.get('static') else '')
+        cv2.putText(frame, rate_status, (10, info_y - 20),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
+        cv2.putText(frame, f"Frame: {item['index']}", (10, info_y),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+        cv2.putText(frame, f'Perros detectados: {len(dog_detections)}', (10, info_y + 20),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+        cv2.putText(frame, f'Historial emocional: {len(self.emotion_history)}/{self.history_size}',
+                    (10, info_y + 40), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+        cv2.putText(frame, self.controls_text, (10, info_y + 60),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
+        item['frame'] = frame
+
+    def _record(self, dog_emotions, frame, current_time):
+        """Historial y alertas tras una clasificación nueva"""
+        # La alerta y el historial local siguen al perro con mayor confianza YOLO
+        primary = best_dog_emotion(dog_emotions)
+        emotion, prob, preds = primary['emotion'], primary['emotion_confidence'], primary['probabilities']
+
+        logger.info(f"🐕 {self._log_prefix}Emociones analizadas ({len(dog_emotions)} perro(s) detectado(s))")
+        logger.info("📊 Análisis detallado de emociones:")
+        for label, p in zip(self.labels, preds):
+            logger.info(f"  {label}: {p:.4f} ({'⭐' if p == max(preds) else ''})")
+        logger.info(f"  🎯 Resultado final: {emotion.upper()} ({prob:.3f})")
+
+        # Verificar si hay un problema con la clasificación
+        if emotion == 'relaxed' and max(preds) < 0.6:
+            logger.warning(f"⚠️ Confianza baja en 'relaxed' ({prob:.3f}) - Podría ser clasificación incorrecta")
+
+        # Acumular historial de emociones
+        self.emotion_history.append(emotion)
+        if len(self.emotion_history) > self.history_size:
+            self.emotion_history.pop(0)
+
+        # Historial externo (una entrada por perro)
+        if self.on_emotion is not None:
+            for result in dog_emotions:
+                self.on_emotion(result['emotion'])
+        if self.on_update is not None:
+            self.on_update()
+
+        # Verificar patrones preocupantes (3 análisis negativos seguidos)
+        if len(self.emotion_history) >= 3 and all(e in ['sad', 'angry'] for e in self.emotion_history[-3:]):
+            logger.warning(f"🚨 {self._log_prefix}Patrón preocupante detectado: {emotion} repetidamente")
+            if self.send_alert is not None:
+                try:
+                    # Capturar imagen para la alerta
+                    path = f"alerta_{emotion}_{int(time.time())}_{int(prob * 100)}.jpg"
+                    cv2.imwrite(path, frame)
+                    self.send_alert(emotion, prob, image_path=path)
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                    self.emotion_history.clear()  # Reiniciar para evitar spam
+                    logger.info("📱 Alerta enviada por Telegram")
+                except Exception as e:
+                    logger.error(f"Error enviando alerta: {e}")
+
+        self.last_analysis_time = current_time
@@ -0,0 +1,66 @@
+"""
+Selección de frames para un video resumen (solo los tramos con perros)
+
+Decide, frame a frame y en orden, qué frames del video anotado se escriben:
+los que tienen perros, unos segundos antes y después de cada aparición y,
+opcionalmente, un frame de cada N de los tramos sin perros (time-lapse).
+Así el tiempo de codificación, el tamaño y la subida dependen del contenido
+interesante y no de la duración del video.
+"""
+
+from collections import deque
+
+
+class HighlightSelector:
+    """
+    Filtro en orden de los frames a escribir
+
+    Args:
+        padding (int): Frames que se conservan antes y después de cada frame con perros
+        timelapse (int): De los tramos sin perros se escribe 1 de cada timelapse frames
+            (0 = se descartan)
+    """
+
+    def __init__(self, padding=30, timelapse=0):
+        self.padding = max(0, int(padding))
+        self.timelapse = max(0, int(timelapse))
+        self._before = deque()  # Frames sin perros que aún pueden ser margen previo
+        self._after = 0         # Frames que faltan del margen posterior
+        self._quiet = 0         # Frames sin perros descartados o muestreados
+
+    def _quiet_frame(self, item):
+        """Frame fuera de los márgenes: solo se escribe si le toca en el time-lapse"""
+        self._quiet += 1
+        if self.timelapse and (self._quiet - 1) % self.timelapse == 0:
+            return [item]
+        return []
+
+    def push(self, item, has_dogs):
+        """
+        Recibe el siguiente frame del video
+
+        Returns:
+            list: Frames (en orden) que ya se pueden escribir
+        """
+        if has_dogs:
+            selected = list(self._before)
+            selected.append(item)
+            self._before.clear()
+            self._after = self.padding
+            return selected
+
+        if self._after > 0:
+            self._after -= 1
+            return [item]
+
+        self._before.append(item)
+        if len(self._before) > self.padding:
+            return self._quiet_frame(self._before.popleft())
+        return []
+
+    def flush(self):
+        """Frames pendientes al terminar el video (ya no habrá perros después)"""
+        selected = []
+        while self._before:
+            selected.extend(self._quiet_frame(self._before.popleft()))
+        return selected
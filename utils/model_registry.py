@@ -0,0 +1,227 @@
+"""
+Registro de modelos compartido por todo el proceso
+
+Carga una sola vez cada modelo (emociones y YOLO) por configuración y lo
+presta a todos los puntos de entrada (consola, bot de Telegram, procesador
+de video). Cada préstamo incrementa un contador de referencias; al devolverlo
+el modelo queda cargado y "caliente" hasta que se llame a unload().
+"""
+
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Se puede apuntar a una variante cuantizada (p. ej. modelo/mejor_modelo_83_int8.tflite)
+DEFAULT_EMOTION_MODEL = os.getenv('DOG_EMOTION_MODEL', "modelo/mejor_modelo_83.h5")
+# 'keras', 'tflite', 'onnx' u 'opencv'; vacío = según la extensión del modelo
+DEFAULT_EMOTION_BACKEND = os.getenv('DOG_EMOTION_BACKEND') or None
+# Un .onnx exportado evita cargar Ultralytics/PyTorch (ver yolo_backends.py)
+DEFAULT_YOLO_WEIGHTS = os.getenv('DOG_YOLO_WEIGHTS', "yolov8n.pt")
+# 'ultralytics', 'onnx' u 'opencv'; vacío = según la extensión de los pesos
+DEFAULT_YOLO_BACKEND = os.getenv('DOG_YOLO_BACKEND') or None
+
+
+class ModelHandle:
+    """
+    Préstamo de un modelo del registro
+
+    Se puede usar como context manager o llamar a release() manualmente.
+    """
+
+    def __init__(self, registry, key, instance, lock, entry=None):
+        self._registry = registry
+        self._entry = entry  # Entrada prestada (un unload() posterior no la confunde con otra)
+        self._released = False
+        self.key = key
+        self.instance = instance
+        self.lock = lock  # Lock de inferencia compartido por todos los préstamos
+
+    def release(self):
+        """Devuelve el préstamo al registro (idempotente)"""
+        if not self._released:
+            self._released = True
+            self._registry.release(self.key, self._entry)
+
+    def __enter__(self):
+        return self.instance
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+        return False
+
+
+class _RegistryEntry:
+    def __init__(self):
+        self.instance = None
+        self.refcount = 0
+        self.load_lock = threading.Lock()      # Evita cargas duplicadas de la misma clave
+        self.inference_lock = threading.Lock()  # Serializa inferencias sobre el mismo modelo
+        self.loaded_at = None
+        self.unloaded = False  # Descargada con préstamos activos: sus release() no cuentan
+
+
+class ModelRegistry:
+    """
+    Registro thread-safe de modelos con conteo de referencias
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def acquire(self, key, loader):
+        """
+        Obtiene un préstamo del modelo identificado por key
+
+        Args:
+            key (tuple): Identificador del modelo y su configuración
+            loader (callable): Función sin argumentos que carga el modelo si no existe
+
+        Returns:
+            ModelHandle: Préstamo del modelo cargado
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _RegistryEntry()
+                self._entries[key] = entry
+            entry.refcount += 1
+
+        try:
+            # La carga se hace fuera del lock global para no bloquear otras claves
+            with entry.load_lock:
+                if entry.instance is None:
+                    start = time.time()
+                    logger.info(f"🔄 Registro: cargando {key[0]} {key[1:]}...")
+                    entry.instance = loader()
+                    entry.loaded_at = time.time()
+                    logger.info(f"✅ Registro: {key[0]} listo en {entry.loaded_at - start:.1f}s")
+        except Exception:
+            with self._lock:
+                entry.refcount -= 1
+                if entry.refcount <= 0 and entry.instance is None:
+                    self._entries.pop(key, None)
+            raise
+
+        return ModelHandle(self, key, entry.instance, entry.inference_lock, entry)
+
+    def release(self, key, entry=None):
+        """
+        Decrementa el contador de referencias (el modelo sigue cargado)
+
+        Args:
+            key (tuple): Identificador del modelo
+            entry: Entrada del préstamo; si se descargó (unload con force) no se
+                descuenta nada, ni de ella ni de una carga nueva con la misma clave
+        """
+        with self._lock:
+            if entry is None:
+                entry = self._entries.get(key)
+            if entry is not None and not entry.unloaded and entry.refcount > 0:
+                entry.refcount -= 1
+
+    def unload(self, key, force=False):
+        """
+        Descarga un modelo del registro
+
+        Args:
+            key (tuple): Identificador del modelo
+            force (bool): Descargar aunque haya préstamos activos; la entrada
+                queda marcada como descargada y los release() pendientes no
+                descuentan nada (tampoco de una carga nueva con la misma clave)
+
+        Returns:
+            bool: True si el modelo fue descargado
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            if entry.refcount > 0 and not force:
+                logger.warning(f"⚠️ Registro: {key[0]} sigue en uso ({entry.refcount} préstamos)")
+                return False
+            self._entries.pop(key)
+            entry.unloaded = True
+
+        logger.info(f"🧹 Registro: {key[0]} {key[1:]} descargado")
+        return True
+
+    def unload_all(self, force=False):
+        """Descarga todos los modelos sin préstamos activos (o todos si force)"""
+        with self._lock:
+            keys = list(self._entries.keys())
+        return sum(1 for key in keys if self.unload(key, force=force))
+
+    def stats(self):
+        """Devuelve {key: refcount} de los modelos cargados"""
+        with self._lock:
+            return {key: entry.refcount for key, entry in self._entries.items()
+                    if entry.instance is not None}
+
+
+_registry = ModelRegistry()
+
+
+def get_registry():
+    """Registro global del proceso"""
+    return _registry
+
+
+def acquire_emotion_detector(model_path=DEFAULT_EMOTION_MODEL, warmup=True, backend=DEFAULT_EMOTION_BACKEND):
+    """
+    Presta el EmotionDetector compartido para model_path y backend
+
+    Returns:
+        ModelHandle: handle.instance es un EmotionDetector
+    """
+    from .cam_utils import EmotionDetector
+    from .emotion_backends import default_backend
+
+    backend = backend or default_backend(model_path)
+    key = ('emotion', os.path.abspath(model_path), backend)
+
+    def _load():
+        detector = EmotionDetector(model_path, backend=backend)
+        if warmup:
+            detector.warmup()
+        return detector
+
+    return _registry.acquire(key, _load)
+
+
+def acquire_yolo_detector(confidence_threshold=0.60, weights=DEFAULT_YOLO_WEIGHTS, warmup=True,
+                          backend=DEFAULT_YOLO_BACKEND, target_fps=None):
+    """
+    Presta un YoloDogDetector que comparte el modelo YOLO cargado
+
+    El modelo pesado se carga una sola vez por archivo de pesos y backend; cada préstamo
+    recibe su propio detector (umbral, cache de detecciones y contador de
+    frames independientes) para que dos hilos no mezclen su estado.
+    
+    Args:
+        target_fps (float): FPS a sostener ajustando la tasa de detección (bucles de cámara)
+
+    Returns:
+        ModelHandle: handle.instance es un YoloDogDetector
+    """
+    from .yolo_dog_detector import YoloDogDetector
+    from .yolo_backends import default_yolo_backend
+
+    backend = backend or default_yolo_backend(weights)
+    key = ('yolo', os.path.abspath(weights), backend)
+
+    def _load():
+        return YoloDogDetector.load_model(weights, warmup=warmup, backend=backend)
+
+    model_handle = _registry.acquire(key, _load)
+    # El préstamo es del modelo; lo que se entrega es un detector propio sobre él
+    model_handle.instance = YoloDogDetector(
+        confidence_threshold=confidence_threshold,
+        model=model_handle.instance,
+        model_lock=model_handle.lock,
+        target_fps=target_fps
+    )
+    return model_handle
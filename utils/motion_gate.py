@@ -0,0 +1,86 @@
+"""
+Compuerta de movimiento para los bucles de cámara
+
+Compara cada frame, reducido y en escala de grises, con un fondo promediado.
+Si la escena está quieta (p. ej. un perro durmiendo) no hace falta volver a
+ejecutar YOLO ni el modelo de emociones: se reutiliza el último resultado.
+La inferencia completa vuelve en cuanto hay movimiento o cada cierto tiempo
+para refrescar el análisis.
+"""
+
+import os
+import time
+import logging
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Fracción de píxeles que deben cambiar para considerar que hay movimiento (0 desactiva la compuerta)
+DEFAULT_MOTION_THRESHOLD = float(os.getenv('DOG_MOTION_THRESHOLD', '0.01'))
+
+
+class MotionGate:
+    """
+    Decide por frame si hace falta la inferencia completa
+
+    Args:
+        threshold (float): Fracción de píxeles cambiados que cuenta como movimiento
+        pixel_threshold (int): Diferencia de gris (0-255) para que un píxel cuente como cambiado
+        refresh_interval (float): Segundos máximos sin inferencia completa aunque no haya movimiento
+        width (int): Ancho del frame reducido usado para comparar
+        learning_rate (float): Velocidad con la que el fondo absorbe los cambios
+    """
+
+    def __init__(self, threshold=DEFAULT_MOTION_THRESHOLD, pixel_threshold=25, refresh_interval=10.0,
+                 width=160, learning_rate=0.05):
+        self.threshold = threshold
+        self.pixel_threshold = pixel_threshold
+        self.refresh_interval = refresh_interval
+        self.width = width
+        self.learning_rate = learning_rate
+
+        self.motion_ratio = 0.0
+        self.frames_skipped = 0
+        self._background = None
+        self._last_full_time = None
+
+    def _prepare(self, frame):
+        height, width = frame.shape[:2]
+        small = cv2.resize(frame, (self.width, max(1, height * self.width // width)),
+                           interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def check(self, frame, now=None):
+        """
+        Compara el frame con el fondo
+
+        Returns:
+            bool: True si hay que ejecutar la inferencia completa en este frame
+        """
+        if not self.threshold:
+            return True
+
+        now = time.time() if now is None else now
+        gray = self._prepare(frame)
+
+        if self._background is None or self._background.shape != gray.shape:
+            self._background = gray.astype(np.float32)
+            self._last_full_time = now
+            return True
+
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self._background))
+        self.motion_ratio = np.count_nonzero(diff > self.pixel_threshold) / diff.size
+        cv2.accumulateWeighted(gray, self._background, self.learning_rate)
+
+        if self.motion_ratio >= self.threshold or now - self._last_full_time >= self.refresh_interval:
+            self._last_full_time = now
+            return True
+
+        self.frames_skipped += 1
+        return False
+
+    def status(self):
+        """Texto corto para overlays"""
+        return f"movimiento {self.motion_ratio:.1%}"
@@ -0,0 +1,139 @@
+"""
+Monitoreo de varias cámaras en un solo proceso
+
+Cada cámara (o archivo de video leído como cámara) se captura en su propio
+hilo con utils.camera y tiene su propio FramePipeline: historial, alertas,
+seguimiento de perros y ventana independientes. Lo que se comparte es la
+inferencia: en cada ronda se toman los frames nuevos de todas las cámaras,
+YOLO los procesa en un solo lote (detect_dogs_batch) y todos los perros
+encontrados se clasifican juntos en una sola llamada al modelo de emociones.
+Así agregar una cámara cuesta mucho menos que abrir un segundo proceso.
+"""
+
+import time
+import threading
+import logging
+
+from .frame_pipeline import FramePipeline, StopPipeline, classify_items
+from .yolo_dog_detector import detect_dogs_batch
+
+logger = logging.getLogger(__name__)
+
+
+class MultiCameraMonitor:
+    """
+    Analiza varias cámaras en vivo con inferencia compartida por lotes
+
+    Args:
+        emotion_detector (EmotionDetector): Clasificador de emociones compartido
+    """
+
+    def __init__(self, emotion_detector):
+        self.emotion_detector = emotion_detector
+        self.frame_event = threading.Event()  # Pasarlo a open_camera() de cada cámara
+        self.sources = []
+        self.rounds = 0
+        self.frames_processed = 0
+
+    def add_source(self, name, camera, yolo_detector, sinks=(), motion_gate=None, emotion_cooldown=0.0):
+        """
+        Agrega una cámara con su propio detector y sus propios sinks
+
+        Args:
+            name (str): Nombre de la cámara (para los mensajes)
+            camera (LatestFrameCamera): Cámara abierta con frame_event=self.frame_event
+            yolo_detector (YoloDogDetector): Detector propio de la cámara (ver
+                model_registry.acquire_yolo_detector; el modelo se comparte)
+            sinks (list): Sinks de FramePipeline para esta cámara
+            motion_gate (MotionGate): Compuerta de movimiento propia de la cámara
+            emotion_cooldown (float): Segundos mínimos entre clasificaciones
+
+        Returns:
+            FramePipeline: Motor de la cámara
+        """
+        pipeline = FramePipeline(yolo_detector, self.emotion_detector, sinks,
+                                 motion_gate=motion_gate, emotion_cooldown=emotion_cooldown)
+        self.sources.append({'name': name, 'camera': camera, 'pipeline': pipeline, 'frames': 0})
+        return pipeline
+
+    def _collect(self):
+        """Toma el frame más nuevo de cada cámara que tenga uno sin procesar"""
+        collected = []
+        for source in self.sources:
+            camera = source['camera']
+            if not camera.has_new_frame:
+                continue
+            ret, frame = camera.read(timeout=0)
+            if ret:
+                source['frames'] += 1
+                collected.append((source, frame, camera.timestamp))
+        return collected
+
+    def process_round(self):
+        """
+        Procesa un frame de cada cámara que tenga uno nuevo
+
+        Returns:
+            int: Frames procesados en la ronda
+        """
+        self.frame_event.clear()
+        collected = self._collect()
+        if not collected:
+            return 0
+
+        items = [source['pipeline'].prepare(frame, source['frames'], 1, timestamp)
+                 for source, frame, timestamp in collected]
+
+        # Una pasada de YOLO para todas las cámaras con la escena en movimiento
+        to_detect = [i for i, item in enumerate(items) if 'detections' not in item]
+        if to_detect:
+            detections = detect_dogs_batch(
+                [collected[i][0]['pipeline'].yolo_detector for i in to_detect],
+                [items[i]['frame'] for i in to_detect]
+            )
+            for i, dogs in zip(to_detect, detections):
+                collected[i][0]['pipeline'].set_detections(items[i], dogs)
+
+        # Y una sola clasificación de emociones con los perros de todas
+        classify_items(self.emotion_detector, items)
+
+        for (source, _, _), item in zip(collected, items):
+            source['pipeline'].deliver([item])
+
+        self.rounds += 1
+        self.frames_processed += len(items)
+        return len(items)
+
+    def run(self, should_stop=None):
+        """
+        Procesa las cámaras hasta que todas se detengan o un sink lance StopPipeline
+
+        Args:
+            should_stop (callable): Se consulta en cada ronda; True termina el bucle
+        """
+        start_time = time.time()
+        try:
+            while True:
+                if should_stop is not None and should_stop():
+                    break
+                if not self.process_round():
+                    if not any(source['camera'].alive for source in self.sources):
+                        logger.info("📷 Ninguna cámara entrega frames, terminando")
+                        break
+                    self.frame_event.wait(0.5)
+        except StopPipeline:
+            pass
+        finally:
+            elapsed = time.time() - start_time
+            if self.rounds:
+                logger.info(f"📊 Multicámara: {self.frames_processed} frames en {self.rounds} rondas "
+                            f"({self.frames_processed / self.rounds:.1f} frames por lote, "
+                            f"{self.frames_processed / max(elapsed, 1e-6):.1f} FPS en total)")
+            for source in self.sources:
+                logger.info(f"   {source['name']}: {source['frames']} frames")
+
+    def close(self):
+        """Cierra los sinks y libera todas las cámaras"""
+        for source in self.sources:
+            source['pipeline'].close()
+            source['camera'].release()
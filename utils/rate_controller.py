@@ -0,0 +1,164 @@
+"""
+Control adaptativo de la tasa de detección YOLO
+
+Mide la latencia de cada llamada a YOLO, los FPS reales del bucle y el
+movimiento de los perros, y ajusta en tiempo real cada cuántos frames se
+ejecuta YOLO y a qué resolución, para sostener unos FPS objetivo (y
+opcionalmente un presupuesto de CPU) tanto en equipos rápidos como lentos.
+"""
+
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# FPS objetivo de los bucles de cámara (0 desactiva el control adaptativo)
+DEFAULT_TARGET_FPS = float(os.getenv('DOG_TARGET_FPS', '15'))
+
+# Resoluciones de entrada de YOLO, de más barata a más precisa (múltiplos de 32)
+INPUT_SIZES = (320, 384, 448, 512, 640)
+
+
+class DetectionRateController:
+    """
+    Ajusta intervalo de detección y resolución de entrada
+
+    Con la escena sobrecargada primero se espacian las detecciones (el tracker
+    predice los frames intermedios); si los perros se mueven rápido se prefiere
+    bajar la resolución para no perderlos. Con margen sobrante se deshace en
+    orden inverso, solo si la estimación indica que se mantendrán los FPS.
+
+    Args:
+        target_fps (float): FPS que debe sostener el bucle
+        cpu_budget (float): Fracción máxima del tiempo de frame dedicada a YOLO (None = sin límite)
+        min_interval (int): Intervalo mínimo (1 = YOLO en todos los frames)
+        max_interval (int): Intervalo máximo entre detecciones
+        input_size (int): Resolución inicial de entrada
+        adjust_every (int): Frames entre decisiones
+        fast_motion (float): Desplazamiento por frame (relativo al tamaño de la caja) considerado rápido
+    """
+
+    def __init__(self, target_fps=DEFAULT_TARGET_FPS, cpu_budget=None, min_interval=1, max_interval=6,
+                 input_size=640, adjust_every=15, fast_motion=0.05):
+        self.target_fps = target_fps
+        self.cpu_budget = cpu_budget
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.adjust_every = adjust_every
+        self.fast_motion = fast_motion
+
+        self.interval = 2  # Mismo punto de partida que el antiguo frame_skip fijo
+        self.input_size = min(INPUT_SIZES, key=lambda size: abs(size - input_size))
+
+        # Medias móviles exponenciales (del periodo de frame, no de los FPS
+        # instantáneos, que sobreestiman cuando unos frames detectan y otros no)
+        self._frame_period = None
+        self.latency = None
+        self.motion = 0.0
+        self._last_frame_time = None
+        self._frames_since_adjust = 0
+
+    @staticmethod
+    def _ema(previous, value, alpha=0.2):
+        return value if previous is None else previous + alpha * (value - previous)
+
+    def record_frame(self, now=None):
+        """Registra un frame del bucle (llamar una vez por frame)"""
+        now = time.perf_counter() if now is None else now
+        if self._last_frame_time is not None and now > self._last_frame_time:
+            self._frame_period = self._ema(self._frame_period, now - self._last_frame_time, alpha=0.1)
+        self._last_frame_time = now
+
+        self._frames_since_adjust += 1
+        if self._frames_since_adjust >= self.adjust_every:
+            self._frames_since_adjust = 0
+            self._adjust()
+
+    def record_detection(self, latency, motion=None):
+        """
+        Registra una ejecución de YOLO
+
+        Args:
+            latency (float): Segundos que tardó la detección
+            motion (float): Movimiento de los perros por frame, relativo a su tamaño
+        """
+        self.latency = self._ema(self.latency, latency)
+        if motion is not None:
+            self.motion = self._ema(self.motion, motion)
+
+    @property
+    def fps(self):
+        """FPS medidos del bucle, o None si aún no hay datos"""
+        return None if self._frame_period is None else 1.0 / self._frame_period
+
+    @property
+    def detection_share(self):
+        """Fracción estimada del tiempo de frame gastada en YOLO"""
+        if self.latency is None or not self.fps:
+            return None
+        return self.latency * self.fps / self.interval
+
+    def _adjust(self):
+        if self.fps is None or self.latency is None:
+            return
+
+        overloaded = self.fps < self.target_fps * 0.9
+        headroom = self.fps > self.target_fps * 1.1
+        share = self.detection_share
+        if self.cpu_budget is not None and share is not None:
+            overloaded = overloaded or share > self.cpu_budget
+            headroom = headroom and share < self.cpu_budget * 0.7
+
+        fast = self.motion > self.fast_motion
+        size_index = INPUT_SIZES.index(self.input_size)
+        previous = (self.interval, self.input_size)
+
+        if overloaded:
+            if (fast or self.interval >= self.max_interval) and size_index > 0:
+                self.input_size = INPUT_SIZES[size_index - 1]
+            elif self.interval < self.max_interval:
+                self.interval += 1
+        elif headroom:
+            # Solo se relaja si la estimación tras el cambio sigue sobre el objetivo (evita oscilar)
+            candidates = []
+            if self.interval > self.min_interval:
+                candidates.append((self.interval - 1, self.input_size))
+            if size_index < len(INPUT_SIZES) - 1:
+                candidates.append((self.interval, INPUT_SIZES[size_index + 1]))
+            if not fast:
+                candidates.reverse()  # Sin movimiento rápido se prioriza la resolución
+            for interval, input_size in candidates:
+                if self._estimated_fps(interval, input_size) >= self.target_fps:
+                    self.interval, self.input_size = interval, input_size
+                    break
+
+        if (self.interval, self.input_size) != previous:
+            logger.info(f"⚙️ Detección ajustada: {self.describe()}")
+
+    def _estimated_fps(self, interval, input_size):
+        """FPS esperados con otra configuración (coste de YOLO proporcional al área de entrada)"""
+        other = max(self._frame_period - self.latency / self.interval, 0.0)
+        latency = self.latency * (input_size / self.input_size) ** 2
+        return 1.0 / max(other + latency / interval, 1e-6)
+
+    def current_setting(self):
+        """Configuración actual y métricas medidas (para logs y overlays)"""
+        return {
+            'interval': self.interval,
+            'input_size': self.input_size,
+            'target_fps': self.target_fps,
+            'fps': self.fps,
+            'latency_ms': None if self.latency is None else self.latency * 1000,
+            'detection_share': self.detection_share,
+            'motion': self.motion
+        }
+
+    def describe(self):
+        """Resumen corto, p. ej. 'YOLO 1/3 @ 448px | 14.7/15 FPS | 38 ms'"""
+        text = f"YOLO 1/{self.interval} @ {self.input_size}px"
+        if self.fps is not None:
+            text += f" | {self.fps:.1f}/{self.target_fps:g} FPS"
+        if self.latency is not None:
+            text += f" | {self.latency * 1000:.0f} ms"
+        return text
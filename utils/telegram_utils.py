@@ -15,9 +15,24 @@ import socket
 import tkinter as tk
 from tkinter import messagebox, ttk
 import webbrowser
+from .cam_utils import CAMERA_EMOTION_COLORS, best_dog_emotion, draw_dog_emotions
+from .model_registry import acquire_emotion_detector, acquire_yolo_detector, get_registry
+from .rate_controller import DEFAULT_TARGET_FPS
+from .motion_gate import MotionGate
+from .camera import find_camera, open_camera
+from .frame_pipeline import CameraMonitorSink, CameraSource, FramePipeline, WindowSink
 
 logger = logging.getLogger(__name__)
 
+# Enviar el video anotado tras analizar un video (0 = solo el resumen, mucho más rápido)
+DEFAULT_TELEGRAM_SEND_VIDEO = os.getenv('DOG_TELEGRAM_VIDEO', '1') != '0'
+# Video anotado para Telegram: H.264 (se previsualiza en la app), 480p y acotado en tamaño
+TELEGRAM_VIDEO_ENCODER = {'codec': 'h264', 'max_width': 854, 'max_bytes': 20 * 1024 * 1024}
+# Los celulares envían 1080p/4K: se decodifica ya reducido a este ancho
+TELEGRAM_DECODE_WIDTH = 960
+# Enviar solo los tramos con perros del video anotado (0 = el video completo)
+DEFAULT_TELEGRAM_HIGHLIGHTS = os.getenv('DOG_TELEGRAM_HIGHLIGHTS', '1') != '0'
+
 class TelegramBot:
     def __init__(self, token=None, chat_id=None):
         # Obtener token y chat_id de parámetros o variables de entorno
@@ -46,6 +61,7 @@ class TelegramBot:
         self.camera_capture = None    # Objeto de captura de cámara
         self.current_frame = None     # Frame actual para captura remota
         self.frame_lock = threading.Lock()  # Lock para acceso thread-safe al frame
+        self._probed_camera = None    # (índice, VideoCapture) abierto al buscar la cámara
         
         # Cola thread-safe para alertas
         import queue
@@ -1106,8 +1122,14 @@ class TelegramBot:
                 parse_mode='Markdown'
             )
 
+    def _store_current_frame(self, item):
+        """Guarda una copia del frame sin anotar para las capturas remotas (thread-safe)"""
+        with self.frame_lock:
+            self.current_frame = item['frame'].copy()
+
     def _realtime_analysis_worker(self, chat_id):
         """Worker que ejecuta el análisis en tiempo real usando EXACTAMENTE la misma lógica que la opción 2 de la consola"""
+        model_handles = []
         try:
             logger.info("📹 Iniciando análisis en tiempo real desde Telegram (usando lógica de consola)...")
             
@@ -1122,11 +1144,11 @@ class TelegramBot:
                 self._send_error_to_chat(chat_id, "❌ No se encontró ninguna cámara disponible")
                 return
             
-            # Inicializar componentes (exactamente como en main.py)
+            # Inicializar componentes (prestados por el registro, se cargan una sola vez)
             try:
                 logger.info("🧠 Cargando modelo de IA...")
-                from .cam_utils import EmotionDetector
-                detector = EmotionDetector("modelo/mejor_modelo_83.h5")
+                model_handles.append(acquire_emotion_detector())
+                detector = model_handles[-1].instance
                 logger.info("✅ Modelo de emociones cargado exitosamente")
             except Exception as e:
                 logger.error(f"❌ Error cargando modelo: {e}")
@@ -1135,19 +1157,17 @@ class TelegramBot:
             
             try:
                 logger.info("🐕 Inicializando detector YOLO optimizado...")
-                from .yolo_dog_detector import YoloDogDetector
-                yolo_detector = YoloDogDetector(confidence_threshold=0.60)
+                model_handles.append(acquire_yolo_detector(confidence_threshold=0.60,
+                                                           target_fps=DEFAULT_TARGET_FPS or None))
+                yolo_detector = model_handles[-1].instance
                 logger.info("✅ YOLOv8 cargado exitosamente (umbral: 60%)")
             except Exception as e:
                 logger.error(f"❌ Error cargando YOLO: {e}")
                 self._send_error_to_chat(chat_id, f"❌ Error cargando YOLO: {e}")
                 return
             
-            # Inicializar cámara (EXACTO como en main.py)
-            cap = cv2.VideoCapture(camera_index)
-            cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-            cap.set(cv2.CAP_PROP_FPS, 30)
+            # Inicializar cámara (EXACTO como en main.py: lectura del último frame en segundo plano)
+            cap = open_camera(camera_index, cap=self._take_probed_camera(camera_index))
             
             if not cap.isOpened():
                 logger.error("❌ No se pudo abrir la cámara")
@@ -1158,153 +1178,28 @@ class TelegramBot:
             logger.info("✅ Análisis en tiempo real iniciado correctamente")
             self._send_status_to_chat(chat_id, "✅ **ANÁLISIS EN TIEMPO REAL INICIADO**\n\n🖥️ **Una ventana de cámara se abrió en tu PC**\n\n🎮 **Controles:**\n• Q o ESC: Salir\n• Telegram: Control remoto")
             
-            # Variables de control (EXACTAS como en main.py)
-            emotion_history = []
-            cooldown_time = 2  # Reducido a 2 segundos para mejor responsividad
-            last_analysis_time = time.time()
-            frame_count = 0
-            
             logger.info("\n🎮 CONTROLES:")
             logger.info("  Q o ESC: Salir")
             logger.info("  Telegram: Control remoto completo")
             logger.info("\n▶️ Iniciando detección...\n")
             
-            # BUCLE PRINCIPAL - COPIA EXACTA DE run_camera_analysis en main.py
+            # Mismo motor que run_camera_analysis en main.py: detección → emociones →
+            # historial/alertas → ventana (con la escena quieta se reutiliza el último análisis)
+            monitor = CameraMonitorSink(yolo_detector, detector.labels, camera=cap,
+                                        on_emotion=self.update_emotion_history, send_alert=self.send_alert,
+                                        controls_text='Q: salir | Telegram: control remoto')
+            pipeline = FramePipeline(yolo_detector, detector,
+                                     [self._store_current_frame, monitor, WindowSink('🐕 FeeliPetAI + YOLOv8')],
+                                     motion_gate=MotionGate(), emotion_cooldown=2)  # 2 segundos entre análisis
             try:
-                while self.realtime_active and not self.realtime_stop_flag:
-                    ret, frame = cap.read()
-                    if not ret:
-                        logger.error("Error capturando frame")
-                        break
-
-                    current_time = time.time()
-                    frame_count += 1
-                    
-                    # Actualizar frame actual para captura remota (thread-safe)
-                    with self.frame_lock:
-                        self.current_frame = frame.copy()
-                    
-                    # PASO 1: Detectar perros con YOLO
-                    dog_detections = yolo_detector.detect_dogs(frame)
-                    dogs_detected = yolo_detector.is_dog_detected(dog_detections)
-                    
-                    # PASO 2: Dibujar detecciones de YOLO solamente
-                    frame = yolo_detector.draw_detections(frame, dog_detections)
-                    
-                    # PASO 3: Solo analizar emociones SI hay perros detectados
-                    if dogs_detected and current_time - last_analysis_time >= cooldown_time:
-                        try:
-                            logger.info(f"🐕 Analizando emociones... (perro detectado)")
-                            emotion, prob, preds = detector.predict_emotion(frame)
-                            
-                            # Debug: Mostrar todas las predicciones para entender el problema
-                            logger.info("📊 Análisis detallado de emociones:")
-                            for label, p in zip(detector.labels, preds):
-                                logger.info(f"  {label}: {p:.4f} ({'⭐' if p == max(preds) else ''})")
-                            logger.info(f"  🎯 Resultado final: {emotion.upper()} ({prob:.3f})")
-                            
-                            # Verificar si hay un problema con la clasificación
-                            if emotion == 'relaxed' and max(preds) < 0.6:
-                                logger.warning(f"⚠️ Confianza baja en 'relaxed' ({prob:.3f}) - Podría ser clasificación incorrecta")
-
-                            # Determinar color según emoción
-                            color = (0, 255, 0)  # Verde por defecto
-                            if emotion in ['angry', 'sad']:
-                                color = (0, 0, 255)  # Rojo para emociones negativas
-                            elif emotion == 'happy':
-                                color = (0, 255, 255)  # Amarillo para feliz
-                            
-                            # Mostrar emoción en el frame con mejor posicionamiento
-                            emotion_text = f'EMOCION: {emotion.upper()} ({prob:.2f})'
-                            if dogs_detected:
-                                # Si hay detección YOLO, mostrar cerca del rectángulo
-                                best_detection = yolo_detector.get_best_dog_region(dog_detections)
-                                if best_detection:
-                                    x, y, w, h = best_detection
-                                    cv2.putText(frame, emotion_text, (x, y + h + 30), 
-                                               cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
-                                else:
-                                    cv2.putText(frame, emotion_text, (60, 120), 
-                                               cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
-                            else:
-                                # Si no hay detección YOLO, mostrar en posición fija
-                                cv2.putText(frame, emotion_text, (60, 120), 
-                                           cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
-
-                            # Acumular historial de emociones
-                            emotion_history.append(emotion)
-                            if len(emotion_history) > 4:  # Reducido de 8 a 4 para mejor responsividad
-                                emotion_history.pop(0)
-                            
-                            # Actualizar historial en el bot
-                            self.update_emotion_history(emotion)
-
-                            # Verificar patrones preocupantes (reducido a 3 análisis negativos de 4)
-                            if len(emotion_history) >= 3 and all(e in ['sad', 'angry'] for e in emotion_history[-3:]):
-                                logger.warning(f"🚨 Patrón preocupante detectado: {emotion} repetidamente")
-                                
-                                try:
-                                    # Capturar imagen para la alerta
-                                    timestamp = int(time.time())
-                                    path = f"alerta_{emotion}_{timestamp}_{int(prob*100)}.jpg"
-                                    cv2.imwrite(path, frame)
-                                    
-                                    # Enviar alerta con recomendaciones (función que ya existe)
-                                    self.send_alert(emotion, prob, image_path=path)
-                                    
-                                    # Limpiar archivo temporal
-                                    try:
-                                        os.remove(path)
-                                    except:
-                                        pass
-                                    
-                                    emotion_history.clear()  # Reiniciar para evitar spam
-                                    logger.info("📱 Alerta enviada por Telegram")
-                                    
-                                except Exception as e:
-                                    logger.error(f"Error enviando alerta: {e}")
-
-                            last_analysis_time = current_time
-                            
-                        except Exception as e:
-                            logger.error(f"Error en análisis de emoción: {e}")
-                    
-                    elif not dogs_detected:
-                        # Solo mostrar mensaje de espera si no hay detecciones
-                        cv2.putText(frame, 'ESPERANDO DETECCION DE PERRO...', 
-                                   (60, 80), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
-                        # Limpiar historial si no hay perros por mucho tiempo
-                        if current_time - last_analysis_time > 30:  # 30 segundos sin perros
-                            if emotion_history:
-                                emotion_history.clear()
-                                logger.info("🧹 Historial limpiado - Sin perros detectados")
-
-                    # Mostrar información de estado en el frame
-                    info_y = frame.shape[0] - 100
-                    cv2.putText(frame, f'Frame: {frame_count}', (10, info_y), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
-                    cv2.putText(frame, f'Perros detectados: {len(dog_detections)}', (10, info_y + 20), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
-                    cv2.putText(frame, f'Historial emocional: {len(emotion_history)}/4', (10, info_y + 40), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
-                    
-                    # Controles para Telegram
-                    cv2.putText(frame, 'Q: salir | Telegram: control remoto', (10, info_y + 60), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
-
-                    cv2.imshow('🐕 FeeliPetAI + YOLOv8', frame)
-
-                    # Manejar teclas
-                    key = cv2.waitKey(1) & 0xFF
-                    if key == ord('q') or key == 27:  # Q o ESC
-                        logger.info("👋 Saliendo del análisis en tiempo real...")
-                        self.realtime_stop_flag = True
-                        break
-
+                pipeline.run(CameraSource(cap),
+                             should_stop=lambda: not self.realtime_active or self.realtime_stop_flag)
             except KeyboardInterrupt:
                 logger.info("⚠️ Interrupción por usuario")
             except Exception as e:
                 logger.error(f"❌ Error en bucle principal: {e}")
+            finally:
+                pipeline.close()
                 
         except Exception as e:
             logger.error(f"❌ Error en worker de análisis: {e}")
@@ -1321,6 +1216,13 @@ class TelegramBot:
                 
             except Exception as cleanup_error:
                 logger.error(f"Error en cleanup: {cleanup_error}")
+            
+            # Si falló antes de abrir la cámara, no dejarla ocupada hasta el próximo inicio
+            self._release_probed_camera()
+            
+            # Devolver los modelos al registro (siguen cargados para capturas y videos)
+            for handle in model_handles:
+                handle.release()
                 
             # Resetear estado
             self.realtime_active = False
@@ -1365,18 +1267,44 @@ class TelegramBot:
         await self._start_realtime_analysis(update, context)
 
     def _find_available_camera(self):
-        """Encuentra la primera cámara disponible"""
-        import cv2
-        for i in range(10):
-            cap = cv2.VideoCapture(i)
-            if cap.isOpened():
-                ret, frame = cap.read()
-                if ret and frame is not None:
-                    logger.info(f"✅ Cámara {i} encontrada: {frame.shape[1]}x{frame.shape[0]}")
-                    cap.release()
-                    return i
-            cap.release()
-        return None
+        """
+        Encuentra la primera cámara disponible y la deja abierta para el análisis
+        
+        Returns:
+            int: Índice de la cámara (None si no hay); el VideoCapture ya abierto
+                queda en self._probed_camera para _realtime_analysis_worker
+        """
+        with self.frame_lock:
+            probed, self._probed_camera = self._probed_camera, None
+        if probed is not None:
+            # Sigue sirviendo solo si la cámara aún entrega frames (pudo desconectarse)
+            if probed[1].isOpened() and probed[1].grab():
+                with self.frame_lock:
+                    self._probed_camera = probed
+                return probed[0]
+            logger.info(f"📷 La cámara {probed[0]} ya no responde, buscando de nuevo...")
+            probed[1].release()
+        camera_index, cap = find_camera()
+        if camera_index is not None:
+            with self.frame_lock:
+                self._probed_camera = (camera_index, cap)
+        return camera_index
+
+    def _take_probed_camera(self, camera_index):
+        """VideoCapture abierto por _find_available_camera() para camera_index (o None); se entrega una sola vez"""
+        with self.frame_lock:
+            probed, self._probed_camera = self._probed_camera, None
+        if probed is not None and probed[0] != camera_index:
+            probed[1].release()
+            return None
+        return probed[1] if probed is not None else None
+
+    def _release_probed_camera(self):
+        """Libera la cámara abierta por _find_available_camera() que nadie llegó a usar"""
+        with self.frame_lock:
+            probed, self._probed_camera = self._probed_camera, None
+        if probed is not None:
+            probed[1].release()
 
     def _send_error_to_chat(self, chat_id, message):
         """Enviar mensaje de error a un chat específico"""
@@ -1541,70 +1469,66 @@ class TelegramBot:
             
             # Procesar frame con análisis completo
             try:
-                # Cargar detectores si no están cargados
-                from .cam_utils import EmotionDetector
-                from .yolo_dog_detector import YoloDogDetector
-                
-                detector = EmotionDetector("modelo/mejor_modelo_83.h5")
-                yolo_detector = YoloDogDetector(confidence_threshold=0.60)
-                
-                # Detectar perros
-                dog_detections = yolo_detector.detect_dogs(current_frame)
-                dogs_detected = yolo_detector.is_dog_detected(dog_detections)
-                
-                # Dibujar detecciones YOLO
-                processed_frame = yolo_detector.draw_detections(current_frame, dog_detections)
+                # Pedir prestados los modelos ya cargados por el análisis en tiempo real
+                with acquire_emotion_detector() as detector, \
+                     acquire_yolo_detector(confidence_threshold=0.60) as yolo_detector:
+                    # Detectar perros (forzado: el detector prestado es nuevo y saltaría el frame)
+                    dog_detections = yolo_detector.detect_dogs(current_frame, force=True)
+                    dogs_detected = yolo_detector.is_dog_detected(dog_detections)
+                    
+                    # Clasificar cada perro sobre el frame limpio, antes de dibujar
+                    dog_emotions = []
+                    emotion_error = None
+                    if dogs_detected:
+                        try:
+                            dog_emotions = detector.predict_dog_emotions(current_frame, dog_detections)
+                        except Exception as e:
+                            emotion_error = e
+                    
+                    # Dibujar detecciones YOLO
+                    processed_frame = yolo_detector.draw_detections(current_frame, dog_detections)
+                    
+                    # Análisis de emociones si hay perros
+                    analysis_text = "🔍 **ANÁLISIS INSTANTÁNEO**\n\n"
+                    
+                    if dogs_detected:
+                        try:
+                            if emotion_error is not None:
+                                raise emotion_error
+                            
+                            # Dibujar la emoción de cada perro en el frame
+                            draw_dog_emotions(processed_frame, dog_emotions, colors=CAMERA_EMOTION_COLORS,
+                                              text_format='EMOCION: {emotion} ({confidence:.2f})')
+                            
+                            # Texto del análisis (una línea por perro)
+                            emoji_map = {"happy": "😊", "sad": "😢", "angry": "😠", "relaxed": "😌"}
+                            
+                            analysis_text += f"🐕 **Perros detectados:** {len(dog_detections)}\n"
+                            for number, result in enumerate(dog_emotions, 1):
+                                emoji = emoji_map.get(result['emotion'], "🐕")
+                                prefix = f"Perro {number} - " if len(dog_emotions) > 1 else ""
+                                analysis_text += f"{emoji} **{prefix}Emoción:** {result['emotion'].upper()}\n"
+                                analysis_text += f"📊 **Confianza:** {result['emotion_confidence']:.1%}\n"
+                            analysis_text += "\n"
+                            
+                            # Recomendaciones según el perro principal
+                            emotion = best_dog_emotion(dog_emotions)['emotion']
+                            recommendations = self.get_recommendations(emotion)
+                            if recommendations:
+                                analysis_text += "💡 **Recomendación:**\n"
+                                analysis_text += recommendations[0] if len(recommendations) > 0 else ""
                 
-                # Análisis de emociones si hay perros
-                analysis_text = "🔍 **ANÁLISIS INSTANTÁNEO**\n\n"
+                        except Exception as e:
+                            logger.error(f"Error en análisis de emoción: {e}")
+                            analysis_text += "⚠️ Error analizando emoción\n"
+                            analysis_text += f"🐕 **Perros detectados:** {len(dog_detections)}"
+                    else:
+                        analysis_text += "🔍 **Estado:** Esperando detección de perro\n"
+                        analysis_text += "💡 **Tip:** Asegúrate de que tu mascota esté visible en la cámara"
                 
-                if dogs_detected:
-                    try:
-                        emotion, prob, preds = detector.predict_emotion(processed_frame)
-                        
-                        # Determinar color y dibujar emoción en frame
-                        color = (0, 255, 0)  # Verde por defecto
-                        if emotion in ['angry', 'sad']:
-                            color = (0, 0, 255)  # Rojo para negativas
-                        elif emotion == 'happy':
-                            color = (0, 255, 255)  # Amarillo para feliz
-                        
-                        # Dibujar emoción en el frame
-                        emotion_text = f'EMOCION: {emotion.upper()} ({prob:.2f})'
-                        best_detection = yolo_detector.get_best_dog_region(dog_detections)
-                        if best_detection:
-                            x, y, w, h = best_detection
-                            cv2.putText(processed_frame, emotion_text, (x, y + h + 30), 
-                                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
-                        else:
-                            cv2.putText(processed_frame, emotion_text, (50, 120), 
-                                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
-                        
-                        # Texto del análisis
-                        emoji_map = {"happy": "😊", "sad": "😢", "angry": "😠", "relaxed": "😌"}
-                        emoji = emoji_map.get(emotion, "🐕")
-                        
-                        analysis_text += f"🐕 **Perros detectados:** {len(dog_detections)}\n"
-                        analysis_text += f"{emoji} **Emoción:** {emotion.upper()}\n"
-                        analysis_text += f"📊 **Confianza:** {prob:.1%}\n\n"
-                        
-                        # Recomendaciones
-                        recommendations = self.get_recommendations(emotion)
-                        if recommendations:
-                            analysis_text += "💡 **Recomendación:**\n"
-                            analysis_text += recommendations[0] if len(recommendations) > 0 else ""
-                        
-                    except Exception as e:
-                        logger.error(f"Error en análisis de emoción: {e}")
-                        analysis_text += "⚠️ Error analizando emoción\n"
-                        analysis_text += f"🐕 **Perros detectados:** {len(dog_detections)}"
-                else:
-                    analysis_text += "🔍 **Estado:** Esperando detección de perro\n"
-                    analysis_text += "💡 **Tip:** Asegúrate de que tu mascota esté visible en la cámara"
-                    
-                    # Dibujar mensaje en frame
-                    cv2.putText(processed_frame, 'ESPERANDO DETECCION DE PERRO...', 
-                               (50, 80), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
+                        # Dibujar mensaje en frame
+                        cv2.putText(processed_frame, 'ESPERANDO DETECCION DE PERRO...', 
+                                   (50, 80), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
                 
                 # Agregar timestamp al frame
                 timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -2426,17 +2350,15 @@ class TelegramBot:
 
     def _process_video_thread(self, video_path, chat_id, timestamp):
         """Procesar video en hilo separado"""
+        model_handles = []
         try:
-            # Importar las clases necesarias
-            from .cam_utils import EmotionDetector
-            from .yolo_dog_detector import YoloDogDetector
-            import cv2
-            
             logger.info("🧠 Cargando modelos de IA...")
             
-            # Inicializar detectores
-            detector = EmotionDetector("modelo/mejor_modelo_83.h5")
-            yolo_detector = YoloDogDetector(confidence_threshold=0.60)
+            # Pedir prestados los detectores (el registro evita recargarlos en cada video)
+            model_handles.append(acquire_emotion_detector())
+            detector = model_handles[-1].instance
+            model_handles.append(acquire_yolo_detector(confidence_threshold=0.60))
+            yolo_detector = model_handles[-1].instance
             
             # Nombre del archivo de salida
             output_filename = f"telegram_processed_{timestamp}.mp4"
@@ -2450,7 +2372,7 @@ class TelegramBot:
             )
             
             if success:
-                # Enviar video procesado y resumen
+                # Enviar video procesado (si se generó) y resumen
                 self._send_processed_video_results(output_path, chat_id, timestamp)
             else:
                 # Enviar mensaje de error
@@ -2460,6 +2382,9 @@ class TelegramBot:
             logger.error(f"❌ Error en hilo de procesamiento: {e}")
             asyncio.run(self._send_error_message(chat_id))
         finally:
+            for handle in model_handles:
+                handle.release()
+            
             # Limpiar archivos temporales
             try:
                 if os.path.exists(video_path):
@@ -2468,8 +2393,15 @@ class TelegramBot:
             except Exception as cleanup_error:
                 logger.warning(f"⚠️ Error limpiando archivo temporal: {cleanup_error}")
 
-    def _process_video_for_telegram(self, input_path, output_path, detector, yolo_detector, chat_id):
-        """Procesar video específicamente para Telegram usando procesador limpio"""
+    def _process_video_for_telegram(self, input_path, output_path, detector, yolo_detector, chat_id,
+                                    send_video=DEFAULT_TELEGRAM_SEND_VIDEO):
+        """
+        Procesar video específicamente para Telegram usando procesador limpio
+        
+        Con send_video=False solo se analiza (sin dibujar ni codificar) y el
+        usuario recibe únicamente el resumen. Con DOG_TELEGRAM_HIGHLIGHTS (por
+        defecto) el video enviado contiene solo los tramos con perros.
+        """
         try:
             logger.info("🎬 Usando procesador de video optimizado...")
             
@@ -2478,14 +2410,27 @@ class TelegramBot:
             import os
             sys.path.append(os.path.dirname(os.path.dirname(__file__)))
             
-            from procesar_video import process_video
+            from procesar_video import (DEFAULT_ANALYSIS_FPS, DEFAULT_HIGHLIGHT_PADDING,
+                                        DEFAULT_HIGHLIGHT_TIMELAPSE, DEFAULT_VIDEO_WORKERS, process_video)
+            highlights = None
+            if DEFAULT_TELEGRAM_HIGHLIGHTS:
+                highlights = {'padding': DEFAULT_HIGHLIGHT_PADDING, 'timelapse': DEFAULT_HIGHLIGHT_TIMELAPSE}
             
-            # Procesar video con el sistema limpio
+            # Procesar video con el sistema limpio (DOG_VIDEO_WORKERS > 1 reparte
+            # tramos del video entre procesos, cada uno con sus propios modelos)
             stats = process_video(
                 video_path=input_path,
                 output_path=output_path,
                 show_video=False,  # No mostrar ventana en modo Telegram
-                save_video=True    # Siempre guardar para Telegram
+                save_video=send_video,
+                emotion_detector=detector,
+                yolo_detector=yolo_detector,
+                workers=DEFAULT_VIDEO_WORKERS,
+                analysis_only=not send_video,
+                analysis_fps=DEFAULT_ANALYSIS_FPS or None,
+                encoder=TELEGRAM_VIDEO_ENCODER,
+                decode_width=TELEGRAM_DECODE_WIDTH,
+                highlights=highlights
             )
             
             if stats and stats.get('emotions_detected', 0) > 0:
@@ -2499,7 +2444,7 @@ class TelegramBot:
                     'frames_processed': stats.get('total_frames', 0),
                     'dog_detection_rate': stats.get('dog_detection_rate', 0.0),
                     'processing_speed': stats.get('fps_processed', 0.0),
-                    'output_file': stats.get('output_file', output_path)
+                    'output_file': stats.get('output_file')
                 }
                 
                 logger.info(f"✅ Video procesado exitosamente: {output_path}")
@@ -2517,7 +2462,7 @@ class TelegramBot:
                     'frames_processed': stats.get('total_frames', 0) if stats else 0,
                     'dog_detection_rate': 0.0,
                     'processing_speed': stats.get('fps_processed', 0.0) if stats else 0.0,
-                    'output_file': output_path
+                    'output_file': output_path if send_video else None
                 }
                 return True
                 
@@ -2559,9 +2504,10 @@ class TelegramBot:
             original_chat_id = self.chat_id  # Guardar el original
             self.chat_id = chat_id  # Cambiar temporalmente al chat del usuario
             
-            # Enviar video procesado
-            video_sent = self._send_video_file(chat_id, output_path)
-            logger.info(f"📹 Video enviado: {'✅ Éxito' if video_sent else '❌ Error'}")
+            # Enviar video procesado (no existe en modo solo análisis)
+            if os.path.exists(output_path):
+                video_sent = self._send_video_file(chat_id, output_path)
+                logger.info(f"📹 Video enviado: {'✅ Éxito' if video_sent else '❌ Error'}")
             
             # Verificar si tenemos estadísticas para el resumen
             if hasattr(self, '_current_video_stats'):
@@ -2654,6 +2600,7 @@ class TelegramBot:
                 files = {'video': video_file}
                 data = {
                     'chat_id': chat_id,
+                    'supports_streaming': 'true',
                     'caption': "🎬 Video Analizado\n\n✅ Análisis de emociones completado\n🐕 Detecciones YOLO superpuestas\n📊 Resumen detallado a continuación"
                 }
                 
@@ -2711,6 +2658,9 @@ class TelegramBot:
                 # Marcar como None para evitar más operaciones
                 self.application = None
             
+            # Descargar los modelos que ya no estén en uso
+            get_registry().unload_all()
+            
             # Marcar bot thread como terminado
             if self.bot_thread and self.bot_thread.is_alive():
                 try:
@@ -0,0 +1,160 @@
+"""
+Línea de tiempo por frame del análisis de un video
+
+En lugar de (o además de) un video anotado, process_video puede guardar por
+cada frame su instante, las cajas de los perros y las probabilidades de cada
+emoción. El formato se elige por la extensión:
+
+- .jsonl: una línea JSON por frame, fácil de leer o de ir procesando
+- .npz: arreglos NumPy comprimidos, más compacto para videos largos
+"""
+
+import os
+import json
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMOTION_LABELS = ('angry', 'happy', 'relaxed', 'sad')
+
+
+def default_timeline_path(video_path):
+    """Ruta por defecto de la línea de tiempo junto al video"""
+    return f"{os.path.splitext(video_path)[0]}_timeline.jsonl"
+
+
+class TimelineWriter:
+    """
+    Escribe la línea de tiempo frame a frame
+
+    Args:
+        path (str): Archivo de salida (.jsonl o .npz)
+        fps (float): FPS del video, para convertir índices de frame en segundos
+        labels (tuple): Nombres de las emociones en el orden de las probabilidades
+        box_scale (float): Factor que lleva las cajas a la resolución original del
+            video (cuando se analizó a una resolución reducida)
+    """
+
+    def __init__(self, path, fps, labels=EMOTION_LABELS, box_scale=1.0):
+        self.path = path
+        self.box_scale = box_scale
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.labels = tuple(labels)
+        self.compressed = path.lower().endswith('.npz')
+        self.frames = 0
+
+        if self.compressed:
+            # En .npz se acumula en memoria y se guarda al cerrar
+            self._frame_index = []
+            self._dog_frame = []
+            self._track_id = []
+            self._bbox = []
+            self._confidence = []
+            self._probabilities = []
+            self._file = None
+        else:
+            self._file = open(path, 'w', encoding='utf-8')
+
+    def add(self, frame_index, detections, dog_emotions):
+        """
+        Registra un frame
+
+        Args:
+            frame_index (int): Índice del frame en el video (desde 1; su instante
+                es (frame_index - 1) / fps, como CAP_PROP_POS_MSEC)
+            detections (list): Detecciones de detect_dogs()
+            dog_emotions (list): Resultados de predict_dog_emotions_frames() para el frame.
+                Los perros sin clasificar quedan sin probabilidades
+        """
+        dogs = dog_emotions if dog_emotions else [
+            {'bbox': d['bbox'], 'confidence': d['confidence'], 'track_id': d.get('track_id')}
+            for d in detections
+        ]
+        self.frames += 1
+
+        if self.compressed:
+            self._frame_index.append(frame_index)
+            for dog in dogs:
+                self._dog_frame.append(frame_index)
+                self._track_id.append(-1 if dog.get('track_id') is None else int(dog['track_id']))
+                self._bbox.append([round(v * self.box_scale) for v in dog['bbox']])
+                self._confidence.append(dog['confidence'])
+                probabilities = dog.get('probabilities')
+                self._probabilities.append(np.full(len(self.labels), np.nan) if probabilities is None
+                                           else probabilities)
+            return
+
+        record = {
+            'frame': int(frame_index),
+            'time': round((frame_index - 1) / self.fps, 3),  # El frame 1 empieza en 0 s
+            'dogs': [self._dog_record(dog) for dog in dogs]
+        }
+        self._file.write(json.dumps(record) + '\n')
+
+    def _dog_record(self, dog):
+        record = {
+            'track_id': None if dog.get('track_id') is None else int(dog['track_id']),
+            'bbox': [int(round(v * self.box_scale)) for v in dog['bbox']],
+            'confidence': round(float(dog['confidence']), 4)
+        }
+        if dog.get('probabilities') is not None:
+            record['emotion'] = dog['emotion']
+            record['probabilities'] = {label: round(float(p), 4)
+                                       for label, p in zip(self.labels, dog['probabilities'])}
+        return record
+
+    def close(self):
+        """Cierra el archivo (en .npz es cuando se escribe todo)"""
+        if not self.compressed:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            return
+
+        frame_index = np.asarray(self._frame_index, dtype=np.int64)
+        with open(self.path, 'wb') as f:
+            np.savez_compressed(
+                f,
+                fps=np.float64(self.fps),
+                labels=np.asarray(self.labels),
+                frame_index=frame_index,
+                time=((frame_index - 1) / self.fps).astype(np.float32),
+                dog_frame=np.asarray(self._dog_frame, dtype=np.int64),
+                track_id=np.asarray(self._track_id, dtype=np.int32),
+                bbox=np.asarray(self._bbox, dtype=np.int32).reshape(-1, 4),
+                confidence=np.asarray(self._confidence, dtype=np.float32),
+                probabilities=np.asarray(self._probabilities, dtype=np.float32).reshape(-1, len(self.labels))
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def merge_timelines(part_paths, output_path):
+    """
+    Une las líneas de tiempo de varios tramos consecutivos en un solo archivo
+
+    Returns:
+        bool: True si se generó output_path
+    """
+    try:
+        if output_path.lower().endswith('.npz'):
+            parts = [np.load(path) for path in part_paths]
+            merged = {key: np.concatenate([part[key] for part in parts])
+                      for key in parts[0].files if key not in ('fps', 'labels')}
+            with open(output_path, 'wb') as f:
+                np.savez_compressed(f, fps=parts[0]['fps'], labels=parts[0]['labels'], **merged)
+        else:
+            with open(output_path, 'w', encoding='utf-8') as out:
+                for path in part_paths:
+                    with open(path, encoding='utf-8') as part:
+                        for line in part:
+                            out.write(line)
+        return True
+    except Exception as e:
+        logger.error(f"❌ Error uniendo las líneas de tiempo: {e}")
+        return False
@@ -0,0 +1,398 @@
+"""
+Lectura y escritura de video en hilos propios
+
+Decodificar y codificar video no necesita al intérprete mientras OpenCV
+trabaja, así que ambos pueden solaparse con la inferencia de los modelos.
+Las colas son acotadas: si la inferencia va más lenta, el lector se detiene
+en lugar de acumular frames en memoria (y lo mismo con el escritor).
+
+Para la salida anotada se puede codificar en H.264 con ffmpeg (archivos
+varias veces más pequeños que mp4v y reproducibles en Telegram), y los
+videos de alta resolución se pueden decodificar ya reducidos con ffmpeg.
+"""
+
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import logging
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Códec del video anotado: 'mp4v' (OpenCV) o 'h264' (requiere ffmpeg)
+DEFAULT_VIDEO_CODEC = os.getenv('DOG_VIDEO_CODEC', 'mp4v')
+# Calidad H.264: CRF más alto = archivo más pequeño (18-28 es lo habitual)
+DEFAULT_VIDEO_CRF = int(os.getenv('DOG_VIDEO_CRF', '26'))
+# Preset de x264: más lento = mejor compresión con la misma calidad
+DEFAULT_VIDEO_PRESET = os.getenv('DOG_VIDEO_PRESET', 'veryfast')
+# Ancho de trabajo al decodificar videos más anchos (0 = resolución original)
+DEFAULT_DECODE_WIDTH = int(os.getenv('DOG_DECODE_WIDTH', '0'))
+
+_END = object()  # Marca de fin de cola
+
+
+class ThreadedFrameReader:
+    """
+    Decodifica un cv2.VideoCapture en segundo plano
+
+    Con step > 1 solo se decodifica uno de cada step frames: los demás se
+    saltan con cap.grab(), que avanza el video sin convertir la imagen.
+
+    Args:
+        cap: cv2.VideoCapture ya abierto (se libera en close())
+        queue_size (int): Frames decodificados que pueden esperar a la inferencia
+        step (int): Frames del video por cada frame entregado
+    """
+
+    def __init__(self, cap, queue_size=16, step=1):
+        self.cap = cap
+        self.step = max(1, int(step))
+        self.last_span = 1  # Frames del video que representa el último frame leído
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._finished = False
+        self._thread = threading.Thread(target=self._run, name="video-reader", daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        # Espera con timeout para poder abandonar si se llama a close()
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                span = 1
+                while span < self.step and self.cap.grab():
+                    span += 1
+                if not self._put((frame, span)):
+                    return
+        except Exception as e:
+            logger.error(f"❌ Error decodificando video: {e}")
+        self._put(_END)
+
+    def read(self):
+        """Igual que cap.read(): (ret, frame)"""
+        if self._finished:
+            return False, None
+        item = self._queue.get()
+        if item is _END:
+            self._finished = True
+            return False, None
+        frame, self.last_span = item
+        return True, frame
+
+    def close(self):
+        """Detiene el hilo y libera el video"""
+        self._stop.set()
+        self._thread.join()
+        self.cap.release()
+
+
+class FfmpegFrameReader:
+    """
+    Decodifica con ffmpeg directamente a una resolución de trabajo reducida
+
+    El escalado se hace dentro de ffmpeg (decodificación multihilo), así por
+    la tubería y por el resto del análisis solo viajan frames pequeños. Tiene
+    la parte de la interfaz de cv2.VideoCapture que usa el procesador
+    (read, grab, isOpened, release), así que funciona con ThreadedFrameReader.
+
+    Args:
+        path (str): Video de entrada
+        width (int): Ancho de trabajo (el alto mantiene la proporción)
+        source_size (tuple): (ancho, alto) originales del video
+        fps (float): FPS del video, para convertir start_frame en segundos
+        start_frame (int): Primer frame a decodificar
+        threads (int): Hilos de decodificación (0 = automático)
+    """
+
+    def __init__(self, path, width, source_size, fps, start_frame=0, threads=0):
+        source_width, source_height = source_size
+        self.width = min(width, source_width) // 2 * 2
+        self.height = max(2, round(source_height * self.width / source_width / 2) * 2)
+        self.scale = source_width / self.width  # Factor para llevar cajas a la resolución original
+        self._frame_bytes = self.width * self.height * 3
+        self._scratch = bytearray(self._frame_bytes)
+
+        command = ['ffmpeg', '-loglevel', 'error', '-threads', str(threads)]
+        if start_frame:
+            # -ss antes de -i: salto rápido y, al decodificar, exacto al frame
+            command += ['-ss', f"{start_frame / (fps or 30):.6f}"]
+        command += ['-i', path, '-an', '-sn', '-vf', f"scale={self.width}:{self.height}:flags=area",
+                    '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-']
+        try:
+            self._process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                             bufsize=self._frame_bytes)
+        except OSError as e:
+            logger.error(f"❌ No se pudo iniciar ffmpeg: {e}")
+            self._process = None
+
+    def _read_into(self, buffer):
+        view = memoryview(buffer)
+        filled = 0
+        while filled < self._frame_bytes:
+            count = self._process.stdout.readinto(view[filled:])
+            if not count:
+                return False
+            filled += count
+        return True
+
+    def isOpened(self):
+        return self._process is not None
+
+    def read(self):
+        """Igual que cap.read(): (ret, frame) con el frame ya reducido"""
+        if self._process is None:
+            return False, None
+        buffer = bytearray(self._frame_bytes)  # Un búfer por frame: el frame sigue vivo en las colas
+        if not self._read_into(buffer):
+            return False, None
+        return True, np.frombuffer(buffer, dtype=np.uint8).reshape(self.height, self.width, 3)
+
+    def grab(self):
+        """Avanza un frame sin crear el arreglo"""
+        return self._process is not None and self._read_into(self._scratch)
+
+    def release(self):
+        if self._process is not None:
+            self._process.kill()
+            self._process.wait()
+            self._process = None
+
+
+def open_downscaled_reader(path, width, source_size, fps, start_frame=0):
+    """
+    FfmpegFrameReader si el video es más ancho que width y ffmpeg está instalado
+
+    Returns:
+        FfmpegFrameReader o None: None si hay que decodificar con OpenCV a resolución original
+    """
+    if not width or source_size[0] <= width or not shutil.which('ffmpeg'):
+        return None
+    reader = FfmpegFrameReader(path, width, source_size, fps, start_frame=start_frame)
+    return reader if reader.isOpened() else None
+
+
+class ThreadedFrameWriter:
+    """
+    Consume elementos en orden en un hilo propio (p. ej. anotar y codificar)
+
+    Los elementos se procesan exactamente en el orden de submit(): la cola es
+    FIFO y hay un solo consumidor, así el video de salida queda ordenado.
+
+    Args:
+        process (callable): Función que recibe cada elemento
+        queue_size (int): Elementos que pueden esperar al escritor
+    """
+
+    def __init__(self, process, queue_size=16):
+        self._process = process
+        self._queue = queue.Queue(maxsize=queue_size)
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name="video-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _END:
+                return
+            if self.error is not None:
+                continue  # Seguir vaciando la cola para no bloquear al productor
+            try:
+                self._process(item)
+            except Exception as e:
+                self.error = e
+                logger.error(f"❌ Error escribiendo video: {e}")
+
+    def submit(self, item):
+        """Encola un elemento (bloquea si el escritor va atrasado)"""
+        self._queue.put(item)
+
+    def close(self):
+        """
+        Espera a que se procesen todos los elementos encolados
+
+        Raises:
+            Exception: El error del hilo escritor, si falló algún elemento
+                (el archivo de salida quedó incompleto)
+        """
+        self._queue.put(_END)
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+
+
+class FfmpegVideoWriter:
+    """
+    Escritor compatible con cv2.VideoWriter que codifica en H.264 con ffmpeg
+
+    Los frames BGR se envían sin comprimir por una tubería a un proceso
+    ffmpeg, así la codificación corre en otro proceso (y en otros núcleos).
+    Solo la salida se reduce: el análisis sigue usando los frames originales.
+
+    Args:
+        path (str): Archivo de salida (.mp4)
+        fps (float): FPS del video
+        size (tuple): (ancho, alto) de los frames que se escribirán
+        crf (int): Calidad constante de x264
+        preset (str): Preset de x264 ('ultrafast' ... 'veryslow')
+        max_width (int): Ancho máximo de la salida (None = sin reducir)
+        max_kbps (float): Tasa máxima en kbit/s para acotar el tamaño (None = solo CRF)
+    """
+
+    def __init__(self, path, fps, size, crf=DEFAULT_VIDEO_CRF, preset=DEFAULT_VIDEO_PRESET,
+                 max_width=None, max_kbps=None):
+        self.path = path
+        self.size = tuple(size)
+        self.error = None
+        command = [
+            'ffmpeg', '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f"{size[0]}x{size[1]}", '-r', f"{fps or 30}",
+            '-i', '-', '-an'
+        ]
+        if max_width and size[0] > max_width:
+            command += ['-vf', f"scale={max_width}:-2"]
+        command += ['-c:v', 'libx264', '-preset', preset, '-crf', str(crf), '-pix_fmt', 'yuv420p']
+        if max_kbps:
+            command += ['-maxrate', f"{max_kbps:.0f}k", '-bufsize', f"{max_kbps:.0f}k"]
+        # moov al inicio: Telegram y los navegadores pueden reproducir mientras descargan
+        command += ['-movflags', '+faststart', path]
+
+        try:
+            self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        except OSError as e:
+            logger.error(f"❌ No se pudo iniciar ffmpeg: {e}")
+            self._process = None
+
+    def isOpened(self):
+        return self._process is not None and self._process.poll() is None
+
+    def write(self, frame):
+        if self._process is None:
+            return
+        if (frame.shape[1], frame.shape[0]) != self.size:
+            frame = cv2.resize(frame, self.size)
+        try:
+            self._process.stdin.write(frame.tobytes())
+        except (BrokenPipeError, ValueError, OSError):
+            self.error = f"ffmpeg terminó antes de tiempo: {self._stderr()}"
+            logger.error(f"❌ {self.error}")
+            self._process = None
+
+    def _stderr(self):
+        try:
+            return self._process.stderr.read().decode(errors='replace').strip()
+        except Exception:
+            return ''
+
+    def release(self):
+        """
+        Cierra la tubería y espera a que ffmpeg termine el archivo
+
+        Raises:
+            OSError: Si ffmpeg falló (el archivo quedó incompleto o no existe)
+        """
+        if self._process is not None:
+            process, self._process = self._process, None
+            try:
+                process.stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
+            errors = process.stderr.read().decode(errors='replace').strip()
+            if process.wait() != 0:
+                self.error = f"ffmpeg no pudo codificar {self.path}: {errors}"
+                logger.error(f"❌ {self.error}")
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise OSError(error)
+
+
+def bitrate_for_size(max_bytes, duration):
+    """
+    Tasa de video en kbit/s para que duration segundos ocupen como mucho max_bytes
+
+    Returns:
+        float o None: None si la duración no se conoce
+    """
+    if not max_bytes or not duration or duration <= 0:
+        return None
+    return max_bytes * 8 / duration / 1000 * 0.9  # Margen para el contenedor y los picos de tasa
+
+
+def open_video_writer(path, fps, size, codec=DEFAULT_VIDEO_CODEC, crf=DEFAULT_VIDEO_CRF,
+                      preset=DEFAULT_VIDEO_PRESET, max_width=None, max_kbps=None):
+    """
+    Abre el escritor del video anotado
+
+    Con codec='h264' y ffmpeg instalado devuelve un FfmpegVideoWriter; si no,
+    un cv2.VideoWriter mp4v (sin reducción ni límite de tamaño).
+
+    Returns:
+        FfmpegVideoWriter o cv2.VideoWriter: Comprobar con isOpened()
+    """
+    if codec == 'h264':
+        if shutil.which('ffmpeg'):
+            return FfmpegVideoWriter(path, fps, size, crf=crf, preset=preset,
+                                     max_width=max_width, max_kbps=max_kbps)
+        logger.warning("⚠️ ffmpeg no está instalado, el video se guardará con mp4v")
+    return cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, tuple(size))
+
+
+def concat_videos(segment_paths, output_path):
+    """
+    Une varios segmentos con el mismo formato en un solo archivo
+
+    Usa ffmpeg sin recodificar (-c copy) si está instalado; si no, copia los
+    frames con OpenCV.
+
+    Returns:
+        bool: True si se generó output_path
+    """
+    if shutil.which('ffmpeg'):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as list_file:
+            for path in segment_paths:
+                list_file.write(f"file '{os.path.abspath(path)}'\n")
+        try:
+            result = subprocess.run(
+                ['ffmpeg', '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0',
+                 '-i', list_file.name, '-c', 'copy', output_path],
+                capture_output=True, text=True
+            )
+            if result.returncode == 0:
+                return True
+            logger.warning(f"⚠️ ffmpeg no pudo unir los segmentos, se usará OpenCV: {result.stderr.strip()}")
+        finally:
+            os.remove(list_file.name)
+
+    out = None
+    try:
+        for path in segment_paths:
+            cap = cv2.VideoCapture(path)
+            if out is None:
+                fps = cap.get(cv2.CAP_PROP_FPS)
+                size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+                out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                out.write(frame)
+            cap.release()
+    finally:
+        if out is not None:
+            out.release()
+    return out is not None
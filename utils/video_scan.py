@@ -0,0 +1,141 @@
+"""
+Barrido rápido de un video para encontrar los tramos con perros
+
+Primera pasada del análisis en dos pasadas: se decodifica solo un frame por
+segundo (los demás se saltan con grab()) y YOLO corre a baja resolución.
+Los tramos encontrados se guardan en un índice junto al video, así un nuevo
+análisis (p. ej. con otro modelo de emociones) no necesita repetir el barrido.
+"""
+
+import os
+import json
+import time
+import logging
+import cv2
+
+from .video_io import ThreadedFrameReader
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+
+
+def interval_index_path(video_path):
+    """Ruta del índice de tramos junto al video"""
+    return f"{os.path.splitext(video_path)[0]}_tramos.json"
+
+
+def video_signature(video_path):
+    """Tamaño y fecha de modificación: si cambian, lo guardado sobre el video ya no sirve"""
+    info = os.stat(video_path)
+    return {'size': info.st_size, 'mtime': int(info.st_mtime)}
+
+
+def load_interval_index(video_path, scan_fps=None):
+    """
+    Lee el índice de tramos si sigue siendo válido para el video
+
+    Args:
+        video_path (str): Video analizado
+        scan_fps (float): Si se indica, el índice debe haberse hecho con esa tasa
+
+    Returns:
+        dict o None: Índice guardado por save_interval_index()
+    """
+    path = interval_index_path(video_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠️ Índice de tramos ilegible, se volverá a barrer: {e}")
+        return None
+
+    if index.get('version') != INDEX_VERSION or index.get('video') != video_signature(video_path):
+        logger.info("🔄 El video cambió desde el último barrido, se volverá a barrer")
+        return None
+    if scan_fps is not None and index.get('scan_fps') != scan_fps:
+        return None
+    return index
+
+
+def save_interval_index(video_path, index):
+    """Guarda el índice de tramos junto al video"""
+    path = interval_index_path(video_path)
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2)
+        logger.info(f"🗂️ Índice de tramos guardado en: {path}")
+    except OSError as e:
+        logger.warning(f"⚠️ No se pudo guardar el índice de tramos: {e}")
+
+
+def scan_dog_intervals(video_path, yolo_detector, scan_fps=1.0, input_size=320, padding=1.0):
+    """
+    Barre el video a baja tasa y resolución y devuelve los tramos con perros
+
+    Cada frame muestreado con perro marca como presente todo el hueco hasta
+    los frames muestreados vecinos, más padding segundos a cada lado, para no
+    recortar entradas y salidas rápidas.
+
+    Args:
+        video_path (str): Video a barrer
+        yolo_detector (YoloDogDetector): Detector ya cargado (se usa detect_dogs_once)
+        scan_fps (float): Frames por segundo que se examinan
+        input_size (int): Resolución de entrada de YOLO durante el barrido
+        padding (float): Segundos extra alrededor de cada tramo
+
+    Returns:
+        dict: Índice con 'intervals' ([inicio, fin) en frames), 'fps', 'total_frames',
+            'scan_fps', 'frames_scanned' y la firma del video; None si no se pudo abrir
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        logger.error(f"❌ No se puede abrir el video: {video_path}")
+        return None
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    step = max(1, round(fps / scan_fps))
+    margin = step + int(round(padding * fps))
+
+    logger.info(f"🔎 Barriendo video: 1 de cada {step} frames a {input_size}px...")
+    start_time = time.time()
+    reader = ThreadedFrameReader(cap, step=step)
+    intervals = []
+    position = 0
+    frames_scanned = 0
+    try:
+        while True:
+            ret, frame = reader.read()
+            if not ret:
+                break
+            frames_scanned += 1
+            if len(yolo_detector.detect_dogs_once(frame, input_size=input_size)):
+                start, end = max(0, position - margin), position + margin + 1
+                if intervals and start <= intervals[-1][1]:
+                    intervals[-1][1] = end
+                else:
+                    intervals.append([start, end])
+            position += reader.last_span
+    finally:
+        reader.close()
+
+    total_frames = max(total_frames, position)
+    for interval in intervals:
+        interval[1] = min(interval[1], total_frames)
+
+    covered = sum(end - start for start, end in intervals)
+    logger.info(f"✅ Barrido en {time.time() - start_time:.1f}s: {len(intervals)} tramo(s) con perros, "
+                f"{covered}/{total_frames} frames ({covered / max(total_frames, 1):.0%})")
+    return {
+        'version': INDEX_VERSION,
+        'video': video_signature(video_path),
+        'fps': fps,
+        'total_frames': total_frames,
+        'scan_fps': scan_fps,
+        'input_size': input_size,
+        'frames_scanned': frames_scanned,
+        'intervals': intervals
+    }
@@ -0,0 +1,147 @@
+"""
+Backends de YOLOv8 exportado a ONNX, sin Ultralytics ni PyTorch
+
+El modelo se exporta una sola vez con:
+    yolo export model=yolov8n.pt format=onnx imgsz=640 opset=12
+
+y se ejecuta con onnxruntime o con cv2.dnn. El preprocesado (letterbox) y el
+NMS se hacen aquí con NumPy, quedándose solo con la clase "dog" de COCO.
+"""
+
+import logging
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def letterbox(frame, size=640, color=(114, 114, 114)):
+    """
+    Redimensiona manteniendo la proporción y rellena hasta size x size
+
+    Returns:
+        tuple: (imagen, escala, (pad_x, pad_y))
+    """
+    height, width = frame.shape[:2]
+    scale = min(size / height, size / width)
+    new_width, new_height = int(round(width * scale)), int(round(height * scale))
+    resized = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+
+    pad_x = (size - new_width) // 2
+    pad_y = (size - new_height) // 2
+    padded = cv2.copyMakeBorder(resized, pad_y, size - new_height - pad_y,
+                                pad_x, size - new_width - pad_x,
+                                cv2.BORDER_CONSTANT, value=color)
+    return padded, scale, (pad_x, pad_y)
+
+
+def nms(boxes, scores, iou_threshold):
+    """
+    Non-maximum suppression vectorizado
+
+    Args:
+        boxes (np.ndarray): Cajas (N, 4) en formato x1, y1, x2, y2
+        scores (np.ndarray): Confianzas (N,)
+        iou_threshold (float): IoU a partir del cual se descarta una caja
+
+    Returns:
+        np.ndarray: Índices conservados, ordenados por confianza
+    """
+    order = scores.argsort()[::-1]
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    keep = []
+    while order.size > 0:
+        best = order[0]
+        keep.append(best)
+        rest = order[1:]
+        xx1 = np.maximum(boxes[best, 0], boxes[rest, 0])
+        yy1 = np.maximum(boxes[best, 1], boxes[rest, 1])
+        xx2 = np.minimum(boxes[best, 2], boxes[rest, 2])
+        yy2 = np.minimum(boxes[best, 3], boxes[rest, 3])
+        intersection = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = intersection / (areas[best] + areas[rest] - intersection + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+class OnnxYoloModel:
+    """
+    YOLOv8 exportado a ONNX
+
+    Args:
+        model_path (str): Archivo .onnx exportado por Ultralytics
+        runtime (str): 'onnx' (onnxruntime) u 'opencv' (cv2.dnn)
+        input_size (int): Lado de la entrada usado al exportar
+    """
+
+    def __init__(self, model_path, runtime='onnx', input_size=640):
+        self.runtime = runtime
+        self.input_size = input_size
+        if runtime == 'onnx':
+            import onnxruntime as ort
+            self.session = ort.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+            model_input = self.session.get_inputs()[0]
+            self._input_name = model_input.name
+            # Exportado con dynamic=True: admite otras resoluciones de entrada
+            self.dynamic_input = not isinstance(model_input.shape[2], int)
+        else:
+            self.net = cv2.dnn.readNetFromONNX(model_path)
+            self.dynamic_input = False
+        logger.info(f"✅ YOLO ONNX cargado ({runtime}): {model_path}")
+
+    def _forward(self, blob):
+        if self.runtime == 'onnx':
+            return self.session.run(None, {self._input_name: blob})[0]
+        self.net.setInput(blob)
+        return self.net.forward()
+
+    def detect(self, frame, conf_threshold, iou_threshold, class_id, input_size=None):
+        """
+        Detecta una sola clase en el frame
+
+        Args:
+            input_size (int): Resolución de entrada; solo se respeta si el modelo
+                se exportó con entrada dinámica
+
+        Returns:
+            tuple: (cajas xyxy float32 (N, 4) en coordenadas del frame, confianzas (N,))
+        """
+        size = input_size if input_size and self.dynamic_input else self.input_size
+        image, scale, (pad_x, pad_y) = letterbox(frame, size)
+        blob = cv2.dnn.blobFromImage(image, 1 / 255.0, swapRB=True)
+
+        # Salida (1, 4 + 80, anchors): cx, cy, w, h y una puntuación por clase
+        output = self._forward(blob)[0]
+        scores = output[4 + class_id]
+        mask = scores >= conf_threshold
+        if not np.any(mask):
+            return np.empty((0, 4), dtype=np.float32), np.empty((0,), dtype=np.float32)
+
+        cx, cy, w, h = output[:4, mask]
+        scores = scores[mask]
+        boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+
+        keep = nms(boxes, scores, iou_threshold)
+        boxes, scores = boxes[keep], scores[keep]
+
+        # Deshacer el letterbox y recortar a los límites del frame
+        boxes[:, [0, 2]] = (boxes[:, [0, 2]] - pad_x) / scale
+        boxes[:, [1, 3]] = (boxes[:, [1, 3]] - pad_y) / scale
+        height, width = frame.shape[:2]
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, width)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, height)
+        return boxes.astype(np.float32), scores.astype(np.float32)
+
+
+YOLO_BACKENDS = ('ultralytics', 'onnx', 'opencv')
+
+
+def default_yolo_backend(weights):
+    """Backend según la extensión de los pesos (.pt → ultralytics, .onnx → onnxruntime o cv2.dnn)"""
+    if not weights.lower().endswith('.onnx'):
+        return 'ultralytics'
+    try:
+        import onnxruntime  # noqa: F401
+        return 'onnx'
+    except ImportError:
+        return 'opencv'
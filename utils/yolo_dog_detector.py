@@ -1,109 +1,291 @@
 """
 Detector de perros usando YOLOv8
-Solo detecta perros con confianza >= 75%
+Solo detecta perros (clase 16 de COCO) con confianza >= confidence_threshold
+(0.60 por defecto, el mismo que usa model_registry.acquire_yolo_detector)
+
+Con pesos .pt usa Ultralytics (PyTorch); con un .onnx exportado usa
+onnxruntime o cv2.dnn sin cargar PyTorch (ver yolo_backends.py). YOLO corre
+cada frame_skip frames; en los intermedios DogTracker predice las cajas y
+mantiene un ID por perro. Con target_fps, DetectionRateController ajusta el
+intervalo de detección y la resolución de entrada para sostener esos FPS.
 """
 
+import threading
+import time
 import cv2
 import numpy as np
-from ultralytics import YOLO
 import logging
+from .yolo_backends import OnnxYoloModel, YOLO_BACKENDS, default_yolo_backend
+from .dog_tracker import DogTracker
+from .rate_controller import DetectionRateController
 
 logger = logging.getLogger(__name__)
 
+class DogDetections:
+    """
+    Detecciones de un frame guardadas en arrays NumPy
+    
+    xyxy (N, 4) en coordenadas del frame original y scores (N,). Se comporta
+    como la antigua lista de dicts {'bbox': (x, y, w, h), 'confidence'}: admite
+    len(), bool(), iteración e índice, así que el código existente no cambia.
+    Con seguimiento activo cada dict incluye además 'track_id'.
+    """
+    
+    __slots__ = ('xyxy', 'scores', 'ids', 'boxes')
+    
+    def __init__(self, xyxy=None, scores=None, ids=None):
+        self.xyxy = np.empty((0, 4), dtype=np.float32) if xyxy is None else np.asarray(xyxy, dtype=np.float32)
+        self.scores = np.empty((0,), dtype=np.float32) if scores is None else np.asarray(scores, dtype=np.float32)
+        self.ids = None if ids is None else np.asarray(ids, dtype=np.int32)
+        # (x, y, w, h) enteros como los devolvía la versión por caja
+        corners = self.xyxy.astype(np.int32)
+        self.boxes = np.concatenate([corners[:, :2], corners[:, 2:] - corners[:, :2]], axis=1)
+    
+    @property
+    def bboxes(self):
+        """Lista de tuplas (x, y, w, h)"""
+        return [tuple(box) for box in self.boxes.tolist()]
+    
+    def best_index(self):
+        """Índice de la detección con mayor confianza, o None"""
+        return int(self.scores.argmax()) if len(self.scores) else None
+    
+    def __len__(self):
+        return len(self.scores)
+    
+    def __bool__(self):
+        return len(self.scores) > 0
+    
+    def __getitem__(self, index):
+        detection = {'bbox': tuple(self.boxes[index].tolist()), 'confidence': float(self.scores[index])}
+        if self.ids is not None:
+            detection['track_id'] = int(self.ids[index])
+        return detection
+    
+    def __iter__(self):
+        for index in range(len(self.scores)):
+            yield self[index]
+    
+    def __repr__(self):
+        return f"DogDetections({self.bboxes}, scores={[round(s, 2) for s in self.scores.tolist()]})"
+
 class YoloDogDetector:
     """
-    Detector de perros usando YOLOv8 de Ultralytics
+    Detector de perros usando YOLOv8 (Ultralytics, ONNX Runtime u OpenCV DNN)
+
+    Cada instancia tiene su propio seguimiento y control de ritmo; el modelo
+    puede ser compartido entre instancias (ver model_registry).
     """
     
-    def __init__(self, confidence_threshold=0.60):
+    def __init__(self, confidence_threshold=0.60, model=None, model_lock=None,
+                 weights='yolov8n.pt', backend=None, tracking=True, target_fps=None, input_size=640):
         """
         Inicializa el detector YOLO optimizado
         
         Args:
             confidence_threshold (float): Umbral mínimo de confianza (0.60 = 60%)
+            model: Modelo YOLO ya cargado (p. ej. prestado por model_registry).
+                Si es None se cargan los pesos indicados
+            model_lock: Lock compartido para serializar inferencias sobre model
+            weights (str): Pesos a cargar cuando model es None (.pt u .onnx)
+            backend (str): 'ultralytics', 'onnx', 'opencv' o None (según la extensión)
+            tracking (bool): Seguir a cada perro con un ID estable y predecir su
+                caja en los frames saltados
+            target_fps (float): Si se indica, el intervalo de detección y la resolución
+                se ajustan en tiempo real para sostener estos FPS
+            input_size (int): Resolución de entrada de YOLO (inicial si hay target_fps)
         """
-        self.confidence_threshold = confidence_threshold
+        self.confidence_threshold= confidence_threshold
         self.dog_class_id = 16  # Clase "dog" en COCO dataset
         self.frame_skip = 2  # Procesar cada 2 frames para mejor rendimiento
+        self.input_size = input_size
+        self.rate_controller = DetectionRateController(target_fps, input_size=input_size) if target_fps else None
         self.frame_count = 0
-        self.last_detections = []  # Cache de últimas detecciones
+        self.last_detections = DogDetections()  # Cache de últimas detecciones
+        self.model_lock = model_lock or threading.Lock()
+        self.tracker = DogTracker() if tracking else None
+        
+        self.model = model if model is not None else self.load_model(weights, backend=backend)
+        self.backend = 'ultralytics' if not isinstance(self.model, OnnxYoloModel) else self.model.runtime
+    
+    @staticmethod
+    def load_model(weights='yolov8n.pt', warmup=False, backend=None):
+        """
+        Carga el modelo YOLO (operación costosa, usar model_registry para compartirlo)
+        
+        Args:
+            weights (str): Archivo de pesos YOLO (.pt, o .onnx exportado con
+                "yolo export model=yolov8n.pt format=onnx imgsz=640 opset=12")
+            warmup (bool): Ejecutar una inferencia vacía tras cargar
+            backend (str): 'ultralytics', 'onnx', 'opencv' o None (según la extensión)
+            
+        Returns:
+            YOLO u OnnxYoloModel: Modelo cargado
+        """
+        backend = backend or default_yolo_backend(weights)
+        if backend not in YOLO_BACKENDS:
+            raise ValueError(f"Backend YOLO no soportado: {backend} (opciones: {', '.join(YOLO_BACKENDS)})")
+        
+        if backend != 'ultralytics':
+            # Modelo exportado: sin Ultralytics ni PyTorch en el proceso
+            model = OnnxYoloModel(weights, runtime=backend)
+            if warmup:
+                model.detect(np.zeros((480, 640, 3), dtype=np.uint8), 1.0, 0.45, 16)
+            return model
         
         logger.info("🔄 Cargando modelo YOLOv8 optimizado...")
         try:
+            from ultralytics import YOLO
             # Carga YOLOv8 nano (más rápido que otros modelos)
-            self.model = YOLO('yolov8n.pt')
+            model = YOLO(weights)
             # Configurar para mejor rendimiento
-            self.model.overrides['verbose'] = False
+            model.overrides['verbose'] = False
+            if warmup:
+                model(np.zeros((480, 640, 3), dtype=np.uint8), verbose=False)
             logger.info("✅ YOLOv8 nano cargado exitosamente")
+            return model
         except Exception as e:
             logger.error(f"❌ Error cargando YOLOv8: {e}")
             raise
     
-    def detect_dogs(self, frame):
+    def detect_dogs(self, frame, force=False):
         """
-        Detecta perros en el frame con optimización de rendimiento y cache
+        Detecta perros en el frame con optimización de rendimiento y seguimiento
+        
+        En los frames donde se salta YOLO devuelve las cajas predichas por el
+        tracker (no las últimas detecciones congeladas).
         
         Args:
             frame: Imagen de OpenCV (BGR)
+            force (bool): Ejecutar YOLO aunque toque saltar este frame
             
         Returns:
-            list: Lista de bounding boxes [(x, y, w, h), ...]
+            DogDetections: Perros detectados (iterable como dicts con 'bbox', 'confidence' y 'track_id')
         """
         try:
-            # Solo procesar cada N frames para mejorar rendimiento
-            self.frame_count += 1
-            if self.frame_count % self.frame_skip != 0:
-                return self.last_detections  # Retornar detecciones anteriores
-            
-            # Procesar con tamaño reducido pero manteniendo calidad
-            height, width = frame.shape[:2]
-            scale_factor = 0.7  # Aumentar a 70% del tamaño original para mejor precisión
-            new_width = int(width * scale_factor)
-            new_height = int(height * scale_factor)
-            small_frame = cv2.resize(frame, (new_width, new_height))
-            
-            # Ejecutar detección en frame pequeño con parámetros optimizados
-            results = self.model(small_frame, verbose=False, conf=self.confidence_threshold, iou=0.45)
-            
-            dog_boxes = []
-            
-            # Procesar resultados
-            for result in results:
-                boxes = result.boxes
-                if boxes is not None:
-                    for box in boxes:
-                        # Obtener clase y confianza
-                        class_id = int(box.cls[0])
-                        confidence = float(box.conf[0])
-                        
-                        # Solo procesar si es un perro y supera el umbral
-                        if class_id == self.dog_class_id and confidence >= self.confidence_threshold:
-                            # Convertir coordenadas YOLO a formato OpenCV
-                            x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                            
-                            # Escalar coordenadas de vuelta al tamaño original
-                            x1 = int(x1 / scale_factor)
-                            y1 = int(y1 / scale_factor)
-                            x2 = int(x2 / scale_factor)
-                            y2 = int(y2 / scale_factor)
-                            
-                            x, y, w, h = x1, y1, x2 - x1, y2 - y1
-                            
-                            dog_boxes.append({
-                                'bbox': (x, y, w, h),
-                                'confidence': confidence
-                            })
-                            
-                            logger.debug(f"🐕 Perro detectado: confianza {confidence:.2f}")
-            
-            # Actualizar cache
-            self.last_detections = dog_boxes
-            return dog_boxes
+            if not self._begin_frame(force):
+                return self._finish_frame(frame)
+            start = time.perf_counter()
+            boxes, scores = self._run_model(frame)
+            return self._finish_frame(frame, boxes, scores, time.perf_counter() - start)
             
         except Exception as e:
             logger.error(f"Error en detección YOLO: {e}")
             return self.last_detections  # Retornar último estado conocido
     
+    def _begin_frame(self, force=False):
+        """
+        Cuenta un frame nuevo y decide si le toca ejecutar YOLO
+        
+        Returns:
+            bool: True si hay que ejecutar el modelo en este frame
+        """
+        # Solo procesar cada N frames para mejorar rendimiento
+        self.frame_count += 1
+        controller = self.rate_controller
+        if controller is not None:
+            controller.record_frame()
+            self.frame_skip, self.input_size = controller.interval, controller.input_size
+        return force or self.frame_count % self.frame_skip == 0
+    
+    def _finish_frame(self, frame, boxes=None, scores=None, latency=None):
+        """
+        Pasa el resultado de YOLO (o None si se saltó) por el tracker y actualiza la cache
+        
+        Returns:
+            DogDetections: Perros del frame
+        """
+        if boxes is None and self.tracker is None:
+            return self.last_detections  # Retornar detecciones anteriores
+        if boxes is not None:
+            logger.debug(f"🐕 {len(scores)} perro(s) detectado(s): {[round(s, 2) for s in scores.tolist()]}")
+        
+        if self.tracker is None:
+            dog_boxes = DogDetections(boxes, scores)
+        else:
+            boxes, scores, ids = self.tracker.step(boxes, scores)
+            height, width = frame.shape[:2]
+            boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, width)
+            boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, height)
+            dog_boxes = DogDetections(boxes, scores, ids)
+        
+        controller = self.rate_controller
+        if controller is not None and latency is not None:
+            controller.record_detection(latency, self.tracker.motion() if self.tracker is not None else None)
+        
+        # Actualizar cache
+        self.last_detections = dog_boxes
+        return dog_boxes
+    
+    def detect_dogs_once(self, frame, input_size=None):
+        """
+        Ejecuta YOLO una vez, sin tracker, sin caché y sin saltar frames
+        
+        Útil para barridos sueltos sobre un video (p. ej. buscar en qué tramos
+        aparece un perro) sin alterar el estado del seguimiento.
+        
+        Args:
+            frame: Imagen de OpenCV (BGR)
+            input_size (int): Resolución de entrada de YOLO (None = la actual)
+            
+        Returns:
+            DogDetections: Perros detectados (sin track_id)
+        """
+        boxes, scores = self._run_model(frame, input_size)
+        return DogDetections(boxes, scores)
+    
+    def _run_model(self, frame, input_size=None):
+        """
+        Ejecuta YOLO sobre el frame
+        
+        Returns:
+            tuple: (cajas xyxy (N, 4) en coordenadas del frame, confianzas (N,))
+        """
+        if self.backend != 'ultralytics':
+            # El letterbox del modelo exportado ya reduce el frame a 640x640
+            with self.model_lock:
+                return self.model.detect(frame, self.confidence_threshold, 0.45, self.dog_class_id,
+                                         input_size=input_size or self.input_size)
+        
+        # La resolución de inferencia se fija con imgsz (YOLO hace su propio letterbox),
+        # en lugar de reducir el frame antes y volver a ampliarlo dentro de YOLO
+        with self.model_lock:
+            results = self.model(frame, verbose=False, conf=self.confidence_threshold, iou=0.45,
+                                 classes=[self.dog_class_id], imgsz=input_size or self.input_size)
+        
+        return self._result_arrays(results[0])
+    
+    def _run_model_batch(self, frames, input_size=None):
+        """
+        Ejecuta YOLO sobre varios frames en una sola llamada al modelo
+        
+        Ultralytics procesa la lista como un lote; el modelo ONNX exportado
+        tiene lote fijo de 1 y recorre los frames uno a uno.
+        
+        Returns:
+            list: (cajas xyxy, confianzas) por frame, en el mismo orden
+        """
+        if self.backend != 'ultralytics' or len(frames) == 1:
+            return [self._run_model(frame, input_size) for frame in frames]
+        with self.model_lock:
+            results = self.model(list(frames), verbose=False, conf=self.confidence_threshold, iou=0.45,
+                                 classes=[self.dog_class_id], imgsz=input_size or self.input_size)
+        return [self._result_arrays(result) for result in results]
+    
+    @staticmethod
+    def _result_arrays(result):
+        """Todas las cajas a NumPy de una vez, ya en coordenadas del frame original"""
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return np.empty((0, 4), dtype=np.float32), np.empty((0,), dtype=np.float32)
+        return boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy()
+    
+    def rate_status(self):
+        """Intervalo y resolución de detección actuales, para logs y overlays"""
+        if self.rate_controller is not None:
+            return self.rate_controller.describe()
+        return f"YOLO 1/{self.frame_skip} @ {self.input_size}px"
+    
     def draw_detections(self, frame, dog_detections):
         """
         Dibuja las detecciones en el frame
@@ -124,8 +306,9 @@ class YoloDogDetector:
             # Dibujar rectángulo verde para perros detectados
             cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
             
-            # Etiqueta con confianza
-            label = f"DOG: {confidence:.2f}"
+            # Etiqueta con confianza (y el ID del perro si hay seguimiento)
+            track_id = detection.get('track_id')
+            label = f"DOG #{track_id}: {confidence:.2f}" if track_id is not None else f"DOG: {confidence:.2f}"
             label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0]
             
             # Fondo para el texto
@@ -151,6 +334,9 @@ class YoloDogDetector:
         if not dog_detections:
             return None
         
+        if isinstance(dog_detections, DogDetections):
+            return dog_detections[dog_detections.best_index()]['bbox']
+        
         # Ordenar por confianza y tomar el mejor
         best_detection = max(dog_detections, key=lambda d: d['confidence'])
         return best_detection['bbox']
@@ -166,3 +352,48 @@ class YoloDogDetector:
             bool: True si hay perros detectados
         """
         return len(dog_detections) > 0
+
+
+def detect_dogs_batch(detectors, frames, force=False):
+    """
+    Detecta perros en frames de varias fuentes con una pasada de YOLO por lote
+    
+    Cada fuente tiene su propio YoloDogDetector (seguimiento, cache y tasa de
+    detección independientes) y todos comparten el modelo cargado, como los
+    que presta model_registry. Los frames a los que les toca YOLO se agrupan
+    por resolución de entrada y van juntos al modelo.
+    
+    Args:
+        detectors (list): Un YoloDogDetector por frame
+        frames (list): Frames BGR, uno por detector
+        force (bool): Ejecutar YOLO en todos aunque les toque saltar
+    
+    Returns:
+        list: DogDetections por frame, en el mismo orden
+    """
+    results = [None] * len(frames)
+    groups = {}
+    for i, (detector, frame) in enumerate(zip(detectors, frames)):
+        try:
+            if detector._begin_frame(force):
+                groups.setdefault(detector.input_size, []).append(i)
+            else:
+                results[i] = detector._finish_frame(frame)
+        except Exception as e:
+            logger.error(f"Error en detección YOLO: {e}")
+            results[i] = detector.last_detections
+    
+    for input_size, indices in groups.items():
+        first = detectors[indices[0]]
+        try:
+            start = time.perf_counter()
+            outputs = first._run_model_batch([frames[i] for i in indices], input_size)
+            latency = (time.perf_counter() - start) / len(indices)  # Costo por frame del lote
+        except Exception as e:
+            logger.error(f"Error en detección YOLO: {e}")
+            for i in indices:
+                results[i] = detectors[i].last_detections
+            continue
+        for i, (boxes, scores) in zip(indices, outputs):
+            results[i] = detectors[i]._finish_frame(frames[i], boxes, scores, latency)
+    return results